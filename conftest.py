@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(scope='session', autouse=True)
+def yatube_test_settings():
+    """Временный файл кэша и строгие бюджеты, как у manage.py test."""
+    from core.testing import isolated_settings
+    with isolated_settings():
+        yield
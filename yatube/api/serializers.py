@@ -0,0 +1,71 @@
+"""Сериализация постов с выбором полей (?fields=id,text,author).
+
+Каждое поле API знает, какие колонки ему нужны и какие связи
+подтянуть; queryset ограничивается ими через only(), поэтому клиент,
+которому нужны только id и текст, не тянет из базы остальное.
+"""
+from collections import namedtuple
+
+Field = namedtuple('Field', 'columns related getter')
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def _image_url(image):
+    return image.url if image else None
+
+
+FIELDS = {
+    'id': Field(('id',), (), lambda post: post.pk),
+    'text': Field(('text',), (), lambda post: post.text),
+    'pub_date': Field(
+        ('pub_date',), (), lambda post: _isoformat(post.pub_date)),
+    'author': Field(
+        ('author', 'author__username'), ('author',),
+        lambda post: post.author.username,
+    ),
+    'group': Field(
+        ('group', 'group__slug'), ('group',),
+        lambda post: post.group.slug if post.group_id else None,
+    ),
+    'image': Field(('image',), (), lambda post: _image_url(post.image)),
+    'comments_count': Field(
+        ('comments_count',), (), lambda post: post.comments_count),
+}
+# Без них не построить курсор страницы.
+REQUIRED_COLUMNS = ('id', 'pub_date')
+
+
+def parse_fields(value):
+    """Имена полей из ?fields=; ValueError для неизвестных."""
+    if not value:
+        return tuple(FIELDS)
+    names = tuple(dict.fromkeys(
+        name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in names if name not in FIELDS]
+    if unknown:
+        raise ValueError(f'Неизвестные поля: {", ".join(unknown)}')
+    return names
+
+
+def project(posts, fields):
+    """Ограничивает queryset колонками и связями нужных полей.
+
+    Связи, которые подтягивает исходный queryset, сбрасываются:
+    only() не даёт отложить поле и идти по нему в select_related.
+    """
+    columns = list(REQUIRED_COLUMNS)
+    related = []
+    for name in fields:
+        columns += FIELDS[name].columns
+        related += FIELDS[name].related
+    posts = posts.select_related(None)
+    if related:
+        posts = posts.select_related(*related)
+    return posts.only(*dict.fromkeys(columns))
+
+
+def serialize(post, fields):
+    return {name: FIELDS[name].getter(post) for name in fields}
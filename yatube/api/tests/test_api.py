@@ -0,0 +1,93 @@
+from http import HTTPStatus
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post, User
+
+
+@override_settings(NUMBER_OF_POSTS_IN_PAG=2)
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, group=cls.group, text=f'Пост {i}')
+            for i in range(3)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def get_all(self, url, **params):
+        """Обходит ленту по ссылкам next, возвращает все записи."""
+        results = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            data = response.json()
+            results += data['results']
+            if not data['next']:
+                return results
+            response = self.client.get(data['next'])
+
+    def test_feeds(self):
+        """Все ленты отдают посты от новых к старым по курсору."""
+        self.client.force_login(self.reader)
+        expected = [post.pk for post in reversed(self.posts)]
+        urls = (
+            reverse('api:v1:index'),
+            reverse('api:v1:group_list', args=(self.group.slug,)),
+            reverse('api:v1:profile', args=(self.user.username,)),
+            reverse('api:v1:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                results = self.get_all(url)
+                self.assertEqual([row['id'] for row in results], expected)
+                self.assertEqual(results[0], {
+                    'id': self.posts[2].pk,
+                    'text': 'Пост 2',
+                    'pub_date': self.posts[2].pub_date.isoformat(),
+                    'author': 'auth',
+                    'group': 'group',
+                    'image': None,
+                    'comments_count': 0,
+                })
+
+    def test_sparse_fieldsets(self):
+        """?fields= отдаёт только запрошенные поля и не трогает связи."""
+        url = reverse('api:v1:index')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'fields': 'id,text'})
+        self.assertEqual(
+            response.json()['results'][0],
+            {'id': self.posts[2].pk, 'text': 'Пост 2'},
+        )
+        self.assertIn('fields=id%2Ctext', response.json()['next'])
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'fields': 'author'})
+        self.assertEqual(response.json()['results'][0], {'author': 'auth'})
+        response = self.client.get(url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_post_detail(self):
+        """Пост отдаётся по id, отсутствующий — JSON с кодом 404."""
+        post = self.posts[0]
+        response = self.client.get(
+            reverse('api:v1:post_detail', args=(post.pk,)),
+            {'fields': 'text,group'},
+        )
+        self.assertEqual(response.json(), {'text': 'Пост 0', 'group': 'group'})
+        response = self.client.get(
+            reverse('api:v1:post_detail', args=(post.pk + 100,)))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertIn('detail', response.json())
+
+    def test_follow_requires_login(self):
+        """Лента подписок без авторизации отвечает 401."""
+        response = self.client.get(reverse('api:v1:follow_index'))
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
@@ -0,0 +1,95 @@
+from functools import wraps
+from http import HTTPStatus
+
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.http import urlencode
+
+from posts import queries
+from posts.models import Group, Post, User
+from posts.utils import cursor_paginator
+
+from .serializers import parse_fields, project, serialize
+
+MAX_LIMIT = 100
+
+
+def error(detail, status):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def api_view(view):
+    """Только GET, ошибки — JSON с полем detail вместо HTML-страниц."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return error('Метод не поддерживается.',
+                         HTTPStatus.METHOD_NOT_ALLOWED)
+        try:
+            fields = parse_fields(request.GET.get('fields'))
+        except ValueError as exc:
+            return error(str(exc), HTTPStatus.BAD_REQUEST)
+        try:
+            return view(request, fields, *args, **kwargs)
+        except Http404:
+            return error('Не найдено.', HTTPStatus.NOT_FOUND)
+    return wrapper
+
+
+def page_url(request, **params):
+    query = {
+        key: value for key, value in request.GET.items()
+        if key not in ('after', 'before')
+    }
+    query.update(params)
+    return request.build_absolute_uri(f'{request.path}?{urlencode(query)}')
+
+
+def feed_response(request, posts, fields, **cursor):
+    """Страница ленты по курсору: results, next и previous."""
+    try:
+        limit = int(request.GET.get('limit', settings.NUMBER_OF_POSTS_IN_PAG))
+    except ValueError:
+        return error('limit должен быть числом.', HTTPStatus.BAD_REQUEST)
+    limit = min(max(limit, 1), MAX_LIMIT)
+    page = cursor_paginator(
+        request, project(posts, fields), limit, **cursor)
+    return JsonResponse({
+        'results': [serialize(post, fields) for post in page],
+        'next': (page_url(request, after=page.next_cursor)
+                 if page.next_cursor else None),
+        'previous': (page_url(request, before=page.previous_cursor)
+                     if page.previous_cursor else None),
+    })
+
+
+@api_view
+def index(request, fields):
+    return feed_response(request, queries.index_posts(), fields)
+
+
+@api_view
+def group_posts(request, fields, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(request, queries.group_posts(group), fields)
+
+
+@api_view
+def profile(request, fields, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(request, queries.profile_posts(author), fields)
+
+
+@api_view
+def follow_index(request, fields):
+    if not request.user.is_authenticated:
+        return error('Нужна авторизация.', HTTPStatus.UNAUTHORIZED)
+    posts, cursor = queries.follow_posts(request.user)
+    return feed_response(request, posts, fields, **cursor)
+
+
+@api_view
+def post_detail(request, fields, post_id):
+    post = get_object_or_404(project(Post.objects.all(), fields), pk=post_id)
+    return JsonResponse(serialize(post, fields))
@@ -0,0 +1,221 @@
+"""ASGI-обёртка над WSGI-приложением Django.
+
+Django 2.2 не умеет асинхронных view, поэтому каждый запрос по-прежнему
+обрабатывается синхронно, но в ограниченном пуле потоков, а всё
+медленное — приём тела запроса, отдача ответа клиенту и чтение файлов
+медиа — идёт в цикле событий. Поток пула занят ровно столько, сколько
+работает view: медленный клиент держит корутину, а не воркер, и один
+процесс обслуживает сотни таких клиентов.
+
+Потоковые ответы (выгрузка) отдаются с обратным давлением: поток
+ждёт, пока клиент заберёт очередной кусок. Соединения с базой
+закрываются в том же потоке, в котором открылись, как и под WSGI.
+"""
+import asyncio
+import mimetypes
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+
+# Тело запроса больше этого пишется во временный файл.
+MAX_BODY_IN_MEMORY = 1024 * 1024
+FILE_CHUNK_SIZE = 64 * 1024
+# Сколько кусков ответа копится, пока клиент их не забрал.
+RESPONSE_QUEUE_SIZE = 8
+
+
+class AsgiHandler:
+    def __init__(self, application, threads):
+        self.application = application
+        self.threads = threads
+        self.executor = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Неизвестный тип соединения {scope["type"]}')
+
+    def pool(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.threads, thread_name_prefix='asgi')
+        return self.executor
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.pool()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.executor is not None:
+                    self.executor.shutdown(wait=True)
+                    self.executor = None
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send):
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        path = media_path(scope['path'])
+        if path is not None and scope['method'] in ('GET', 'HEAD'):
+            await self.send_file(path, scope['method'], send)
+            return
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(RESPONSE_QUEUE_SIZE)
+        cancelled = threading.Event()
+        task = loop.run_in_executor(
+            self.pool(), self.run_wsgi,
+            environ(scope, body), loop, queue, cancelled,
+        )
+        try:
+            while True:
+                message = await queue.get()
+                if message is None:
+                    break
+                await send(message)
+        except BaseException:
+            # Клиент ушёл: поток бросает ответ, а если он ждёт места в
+            # очереди, освобождаем его.
+            cancelled.set()
+            while not queue.empty():
+                queue.get_nowait()
+            raise
+        finally:
+            await task
+            body.close()
+
+    @staticmethod
+    async def read_body(receive):
+        """Тело запроса целиком; None, если клиент ушёл раньше."""
+        body = tempfile.SpooledTemporaryFile(MAX_BODY_IN_MEMORY)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                body.seek(0)
+                return body
+
+    def run_wsgi(self, environ, loop, queue, cancelled):
+        """Выполняется в пуле: вызывает Django и кладёт куски ответа
+        в очередь цикла событий."""
+        def put(message):
+            if not cancelled.is_set():
+                asyncio.run_coroutine_threadsafe(
+                    queue.put(message), loop).result()
+
+        def start_response(status, headers, exc_info=None):
+            put({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin1'),
+                             value.encode('latin1'))
+                            for name, value in headers],
+            })
+
+        response = self.application(environ, start_response)
+        try:
+            for chunk in response:
+                if cancelled.is_set():
+                    break
+                if chunk:
+                    put({'type': 'http.response.body', 'body': chunk,
+                         'more_body': True})
+            put({'type': 'http.response.body', 'body': b''})
+        finally:
+            # Сигнал request_finished и закрытие соединений с базой.
+            close = getattr(response, 'close', None)
+            if close is not None:
+                close()
+            put(None)
+
+    async def send_file(self, path, method, send):
+        loop = asyncio.get_running_loop()
+        try:
+            file = await loop.run_in_executor(self.pool(), open, path, 'rb')
+        except OSError:
+            await send_status(send, 404)
+            return
+        try:
+            size = os.fstat(file.fileno()).st_size
+            content_type = (
+                mimetypes.guess_type(path)[0] or 'application/octet-stream')
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', content_type.encode()),
+                    (b'content-length', str(size).encode()),
+                ],
+            })
+            while method == 'GET':
+                chunk = await loop.run_in_executor(
+                    self.pool(), file.read, FILE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                await send({'type': 'http.response.body', 'body': chunk,
+                            'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            file.close()
+
+
+async def send_status(send, status):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-length', b'0')]})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+def media_path(path):
+    """Файл медиа по адресу; только в режиме отладки, как в urls.py."""
+    if not settings.DEBUG or not path.startswith(settings.MEDIA_URL):
+        return None
+    try:
+        return safe_join(settings.MEDIA_ROOT, path[len(settings.MEDIA_URL):])
+    except SuspiciousFileOperation:
+        return None
+
+
+def environ(scope, body):
+    """WSGI environ из ASGI scope."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    result = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in result:
+            value = f'{result[name]},{value}'
+        result[name] = value
+    return result
@@ -0,0 +1,182 @@
+"""Замер задержек и числа запросов к базе для всех страниц сайта.
+
+Страницы берутся из urlpatterns приложений posts, users и about;
+параметры адресов подставляются из самых нагруженных объектов базы
+(группа с наибольшим числом постов, самый читаемый автор, пост с
+наибольшим числом комментариев). Каждая страница открывается через
+тестовый клиент анонимом и вошедшим пользователем, число запросов к
+базе берётся из заголовка Server-Timing. Результат — словарь, который
+пишется в JSON и сравнивается с замером другого коммита.
+"""
+import platform
+import re
+import statistics
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLPattern, reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+URLCONFS = ('posts.urls', 'users.urls', 'about.urls')
+# Страницы, которые меняют данные или сессию: их замер испортил бы
+# следующие. Выгрузка замеряется отдельно, это не страница.
+SKIP = {
+    'posts:add_comment',
+    'posts:profile_follow',
+    'posts:profile_unfollow',
+    'posts:export',
+    'users:logout',
+    'users:password_reset_confirm',
+}
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', 'HEAD'),
+            capture_output=True, text=True, check=True,
+            cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def sample_objects():
+    """Самые нагруженные объекты: на них страницы дольше всего."""
+    return {
+        'slug': Group.objects.order_by('-posts_count').first(),
+        'username': User.objects.order_by(
+            F('stats__followers_count').desc(nulls_last=True)).first(),
+        'post_id': Post.objects.order_by('-comments_count').first(),
+        'reader': User.objects.order_by(
+            F('stats__following_count').desc(nulls_last=True)).first(),
+    }
+
+
+def targets(objects):
+    """Пары (имя адреса, путь) для всех замеряемых страниц."""
+    values = {
+        'slug': objects['slug'] and objects['slug'].slug,
+        'username': objects['username'] and objects['username'].username,
+        'post_id': objects['post_id'] and objects['post_id'].pk,
+    }
+    for urlconf in URLCONFS:
+        module = __import__(urlconf, fromlist=('urlpatterns',))
+        for pattern in module.urlpatterns:
+            if not isinstance(pattern, URLPattern):
+                continue
+            name = f'{module.app_name}:{pattern.name}'
+            arguments = pattern.pattern.converters
+            if name in SKIP or any(
+                    values.get(argument) is None for argument in arguments):
+                continue
+            yield name, reverse(name, kwargs={
+                argument: values[argument] for argument in arguments})
+
+
+def percentile(samples, percent):
+    if len(samples) < 2:
+        return samples[0]
+    return statistics.quantiles(samples, n=100)[percent - 1]
+
+
+def measure(client, path, requests, warmup=1):
+    """Открывает страницу requests раз, возвращает сводку замеров."""
+    for _ in range(warmup):
+        client.get(path)
+    durations = []
+    queries = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = client.get(path)
+        durations.append((time.perf_counter() - started) * 1000)
+        match = QUERIES_RE.search(response.get('Server-Timing', ''))
+        queries.append(int(match.group(1)) if match else None)
+    return {
+        'status': response.status_code,
+        'p50_ms': round(percentile(durations, 50), 3),
+        'p95_ms': round(percentile(durations, 95), 3),
+        'p99_ms': round(percentile(durations, 99), 3),
+        'mean_ms': round(statistics.mean(durations), 3),
+        'queries': max(queries, key=lambda count: count or 0),
+    }
+
+
+def run(requests=50, warmup=1, names=None):
+    """Замеряет все страницы анонимом и вошедшим пользователем."""
+    objects = sample_objects()
+    anonymous = Client()
+    authenticated = Client()
+    if objects['reader'] is not None:
+        authenticated.force_login(objects['reader'])
+    clients = (('anonymous', anonymous), ('authenticated', authenticated))
+    results = []
+    # Замер без отладочного журнала запросов и без падения на бюджете:
+    # нас интересуют цифры, а не исключение.
+    with override_settings(DEBUG=False, QUERY_BUDGETS_STRICT=False):
+        for name, path in targets(objects):
+            if names and name not in names:
+                continue
+            for user, client in clients:
+                results.append({
+                    'name': name,
+                    'path': path,
+                    'user': user,
+                    **measure(client, path, requests, warmup),
+                })
+    return {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'requests': requests,
+        'dataset': {
+            'users': User.objects.count(),
+            'groups': Group.objects.count(),
+            'posts': Post.objects.count(),
+            'comments': Comment.objects.count(),
+            'follows': Follow.objects.count(),
+        },
+        'results': results,
+    }
+
+
+def compare(old, new, threshold=20):
+    """Строки сравнения двух замеров и список ухудшений.
+
+    Ухудшение — рост p95 больше чем на threshold процентов или любой
+    рост числа запросов к базе.
+    """
+    before = {(row['name'], row['user']): row for row in old['results']}
+    lines = []
+    regressions = []
+    for row in new['results']:
+        key = (row['name'], row['user'])
+        previous = before.get(key)
+        if previous is None:
+            lines.append(f'{row["name"]} [{row["user"]}]: новая страница')
+            continue
+        change = (
+            (row['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] * 100
+            if previous['p95_ms'] else 0.0
+        )
+        worse = change > threshold or (
+            (row['queries'] or 0) > (previous['queries'] or 0))
+        line = (
+            f'{row["name"]} [{row["user"]}]: '
+            f'p95 {previous["p95_ms"]:.1f} → {row["p95_ms"]:.1f} мс '
+            f'({change:+.0f}%), '
+            f'запросов {previous["queries"]} → {row["queries"]}'
+        )
+        lines.append(line)
+        if worse:
+            regressions.append(line)
+    return lines, regressions
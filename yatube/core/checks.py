@@ -0,0 +1,18 @@
+from django.core.checks import Tags, Warning, register
+from django.db import connections
+
+from .sqlite import check_pragmas
+
+
+@register(Tags.database)
+def sqlite_pragmas(app_configs, **kwargs):
+    """PRAGMA подключений совпадают с SQLITE_PRAGMAS
+    (manage.py check --tag database, а также перед migrate)."""
+    warnings = []
+    for connection in connections.all():
+        _, problems = check_pragmas(connection)
+        warnings += [
+            Warning(problem, obj=connection.alias, id='core.W001')
+            for problem in problems
+        ]
+    return warnings
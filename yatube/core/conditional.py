@@ -0,0 +1,73 @@
+"""Условные GET-запросы (ETag / Last-Modified) по поколениям кэша.
+
+Валидаторы страницы считаются из поколений её областей (см.
+fragment_cache), без рендеринга шаблона: поколение меняется при любой
+записи, которая может изменить страницу, включая правку и удаление,
+которых не видно по дате последнего поста.
+"""
+import hashlib
+from functools import wraps
+
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from . import fragment_cache, replicas
+
+
+def page_etag(request, scopes, extra=()):
+    """ETag страницы для пользователя с учётом адреса и CSRF-токена."""
+    if request.user.is_authenticated:
+        # В формах авторизованных есть CSRF-токен. Он выдаётся заранее,
+        # чтобы ETag первого ответа совпал с ETag следующего запроса.
+        get_token(request)
+    raw = ':'.join(str(part) for part in (
+        request.get_full_path(),
+        request.user.pk,
+        request.META.get('CSRF_COOKIE', ''),
+        *scopes,
+        *fragment_cache.get_generations(scopes),
+        *extra,
+    ))
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def conditional_page(get_scopes):
+    """Отвечает 304, если страница не менялась, не вызывая view.
+
+    get_scopes(request, *args, **kwargs) возвращает области страницы
+    и дополнительные части ETag или None, если проверку надо
+    пропустить (например, объекта нет и view ответит 404).
+
+    Last-Modified отдаётся только анонимам: дата не различает
+    пользователей, а ETag различает.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            validators = get_scopes(request, *args, **kwargs)
+            if validators is None:
+                return view(request, *args, **kwargs)
+            scopes, extra = validators
+            replicas.read_fresh(scopes)
+            etag = page_etag(request, scopes, extra)
+            last_modified = None
+            if not request.user.is_authenticated:
+                last_modified = int(fragment_cache.last_changed(scopes))
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                if last_modified is not None:
+                    response['Last-Modified'] = http_date(last_modified)
+                if request.user.is_authenticated:
+                    patch_cache_control(response, no_cache=True, private=True)
+                else:
+                    patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
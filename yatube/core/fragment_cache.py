@@ -0,0 +1,166 @@
+"""Кэш фрагментов шаблонов с поколениями.
+
+Каждый фрагмент зависит от набора областей (scopes): 'global',
+'group:<id>', 'author:<id>' и т.п. У каждой области в кэше хранится номер
+поколения, и он входит в ключ фрагмента. Запись в модель увеличивает
+поколение затронутых областей, после чего старые фрагменты просто
+перестают находиться и вытесняются по таймауту.
+"""
+import atexit
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+GENERATION_PREFIX = 'fragment_cache:generation:'
+CHANGED_PREFIX = 'fragment_cache:changed:'
+STATS_PREFIX = 'fragment_cache:stats:'
+NAMES_KEY = 'fragment_cache:names'
+
+# Попадания и промахи процесса, ещё не перенесённые в общий кэш.
+_pending = Counter()
+_pending_lock = threading.Lock()
+_flushed_at = time.monotonic()
+
+
+def scope(kind, pk=None):
+    if pk is None:
+        return kind
+    return f'{kind}:{pk}'
+
+
+def _initial_generation():
+    # Поколение, созданное заново после вытеснения, не должно совпасть
+    # с уже использованным, поэтому отсчёт начинается от текущего времени.
+    return time.time_ns()
+
+
+def get_generations(scopes):
+    keys = [GENERATION_PREFIX + name for name in scopes]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, _initial_generation(), None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def bump(*scopes):
+    """Делает недействительными все фрагменты, зависящие от областей.
+
+    Внутри транзакции поколения увеличиваются только после фиксации:
+    читатель, успевший до неё собрать фрагмент или ETag по старым
+    данным, сохранит их под поколением, которое фиксация сделает
+    устаревшим. Откаченная транзакция кэш не трогает.
+    """
+    if scopes:
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+def _bump(scopes):
+    for name in scopes:
+        key = GENERATION_PREFIX + name
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_generation(), None)
+    if scopes:
+        now = time.time()
+        cache.set_many(
+            {CHANGED_PREFIX + name: now for name in scopes}, None)
+
+
+def last_changed(scopes):
+    """Время последнего bump любой из областей, в секундах epoch.
+
+    Если отметка вытеснена, она заводится заново текущим временем:
+    все изменения до этого момента уже в прошлом, а последующие
+    запишут новую отметку.
+    """
+    keys = [CHANGED_PREFIX + name for name in scopes]
+    changed = cache.get_many(keys)
+    now = time.time()
+    for key in keys:
+        if key not in changed:
+            cache.add(key, now, None)
+            changed[key] = cache.get(key, now)
+    return max(changed.values(), default=None)
+
+
+def fragment_key(fragment_name, scopes, vary_on=()):
+    generations = get_generations(scopes)
+    raw = ':'.join(str(part) for part in (*scopes, *generations, *vary_on))
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    return f'fragment_cache:{fragment_name}:{digest}'
+
+
+def record(fragment_name, hit):
+    """Считает попадание или промах в памяти процесса.
+
+    В общий кэш счётчики уходят не чаще раза в
+    FRAGMENT_CACHE_STATS_FLUSH секунд, а не записью на каждый рендер.
+    """
+    with _pending_lock:
+        _pending[fragment_name, hit] += 1
+        if (time.monotonic() - _flushed_at
+                < settings.FRAGMENT_CACHE_STATS_FLUSH):
+            return
+    flush()
+
+
+def flush():
+    """Переносит накопленные в процессе счётчики в общий кэш."""
+    global _flushed_at
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _flushed_at = time.monotonic()
+    if not pending:
+        return
+    names = cache.get(NAMES_KEY, ())
+    missing = [name for name in dict.fromkeys(
+        name for name, _ in pending) if name not in names]
+    if missing:
+        cache.set(NAMES_KEY, (*names, *missing), None)
+    for (fragment_name, hit), count in pending.items():
+        key = f'{STATS_PREFIX}{fragment_name}:{"hits" if hit else "misses"}'
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            cache.add(key, 0, None)
+            cache.incr(key, count)
+
+
+def stats():
+    """Счётчики попаданий и промахов по именам фрагментов."""
+    flush()
+    fragment_names = cache.get(NAMES_KEY, ())
+    keys = {
+        name: (f'{STATS_PREFIX}{name}:hits', f'{STATS_PREFIX}{name}:misses')
+        for name in fragment_names
+    }
+    values = cache.get_many([key for pair in keys.values() for key in pair])
+    return {
+        name: {
+            'hits': values.get(hits, 0),
+            'misses': values.get(misses, 0),
+        }
+        for name, (hits, misses) in keys.items()
+    }
+
+
+def get_or_render(fragment_name, scopes, vary_on, render):
+    key = fragment_key(fragment_name, scopes, vary_on)
+    content = cache.get(key)
+    record(fragment_name, content is not None)
+    if content is None:
+        content = render()
+        cache.set(key, content, settings.FRAGMENT_CACHE_TIMEOUT)
+    return content
+
+
+atexit.register(flush)
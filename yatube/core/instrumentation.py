@@ -0,0 +1,126 @@
+"""Учёт SQL-запросов каждого запроса к сайту и бюджеты запросов view.
+
+Middleware считает запросы к базе, их суммарное время и самый
+медленный из них, отдаёт это в заголовке Server-Timing и пишет
+строкой JSON в лог core.sql. View объявляет бюджет декоратором
+query_budget; превышение пишется в лог, а при QUERY_BUDGETS_STRICT
+(по умолчанию в режиме отладки и в тестах) ещё и роняет запрос, так
+что N+1 ловится любым тестом, который открывает страницу.
+
+Запросы внутри unbudgeted() в бюджет не входят: их число растёт
+с данными (раскладка постов по лентам), а не с кодом страницы.
+В Server-Timing и лог они попадают как обычно.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('core.sql')
+
+SLOWEST_SQL_LENGTH = 200
+
+_state = threading.local()
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(limit):
+    """Объявляет, сколько запросов к базе может сделать view."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+@contextmanager
+def unbudgeted():
+    """Не засчитывает запросы внутри блока в бюджет view."""
+    depth = getattr(_state, 'unbudgeted', 0)
+    _state.unbudgeted = depth + 1
+    try:
+        yield
+    finally:
+        _state.unbudgeted = depth
+
+
+class QueryStats:
+    """Собирает запросы через execute_wrapper всех подключений."""
+
+    def __init__(self):
+        self.count = 0
+        self.unbudgeted = 0
+        self.duration = 0.0
+        self.slowest = 0.0
+        self.slowest_sql = ''
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            if getattr(_state, 'unbudgeted', 0):
+                self.unbudgeted += 1
+            self.duration += duration
+            if duration >= self.slowest:
+                self.slowest = duration
+                self.slowest_sql = sql[:SLOWEST_SQL_LENGTH]
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries", '
+            f'db-slowest;dur={self.slowest * 1000:.2f}'
+        )
+
+
+class SQLInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        request.query_budget = None
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        response['Server-Timing'] = stats.server_timing()
+        self.log(request, response, stats)
+        budget = request.query_budget
+        budgeted = stats.count - stats.unbudgeted
+        if budget is not None and budgeted > budget:
+            message = (
+                f'{request.path}: {budgeted} запросов к базе '
+                f'при бюджете {budget}'
+            )
+            if settings.QUERY_BUDGETS_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = getattr(view_func, 'query_budget', None)
+
+    @staticmethod
+    def log(request, response, stats):
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'queries': stats.count,
+            'unbudgeted': stats.unbudgeted,
+            'db_ms': round(stats.duration * 1000, 2),
+            'slowest_ms': round(stats.slowest * 1000, 2),
+            'slowest_sql': stats.slowest_sql,
+            'budget': request.query_budget,
+        }, ensure_ascii=False))
@@ -0,0 +1,314 @@
+"""Нагрузочный прогон WSGI-приложения несколькими процессами.
+
+Сервер — N процессов, которые принимают соединения с одного общего
+сокета и обслуживают их по одному, как синхронные воркеры gunicorn.
+Клиенты — процессы с потоками; каждый поток ведёт себя как отдельный
+посетитель, анонимный или со своей сессией, и выбирает действия по
+весам смеси либо проигрывает записанный журнал доступа. Модуль нарочно
+не импортирует моделей: и сервер, и клиенты запускаются через spawn.
+"""
+import http.client
+import multiprocessing
+import random
+import re
+import socket
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict, namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlencode, urlsplit
+from wsgiref import simple_server
+
+from django.conf import settings
+from django.db import connections
+
+from . import workers
+
+# Действие смеси: метод, адреса на выбор, нужна ли сессия и шлёт ли
+# оно форму с полем text.
+Action = namedtuple('Action', 'method paths login form')
+# Итог одного запроса; статус 0 — соединение не удалось.
+Record = namedtuple('Record', 'action status latency')
+
+LOG_LINE_RE = re.compile(
+    r'(?:\[(?P<time>[^\]]+)\].*?)?"(?P<method>[A-Z]+) (?P<path>\S+)'
+    r'(?: HTTP/[\d.]+)?"'
+)
+LOG_TIME_FORMAT = '%d/%b/%Y:%H:%M:%S %z'
+REPLAY_METHODS = ('GET', 'HEAD')
+
+
+def parse_mix(value):
+    """Веса действий из строки вида index=30,post_detail=25."""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        try:
+            mix[name.strip()] = float(weight)
+        except ValueError:
+            raise ValueError(f'Неверный вес действия: {part}')
+    return mix
+
+
+def parse_log(lines):
+    """Запросы из журнала доступа в Common/Combined Log Format.
+
+    Возвращает (смещение в секундах от первой строки или None, путь).
+    Проигрываются только GET и HEAD: тел POST в журнале нет. Строка,
+    в которой только путь, тоже годится.
+    """
+    start = None
+    for line in lines:
+        line = line.strip()
+        if line.startswith('/'):
+            yield None, line
+            continue
+        match = LOG_LINE_RE.search(line)
+        if not match or match['method'] not in REPLAY_METHODS:
+            continue
+        offset = None
+        if match['time']:
+            moment = datetime.strptime(match['time'], LOG_TIME_FORMAT)
+            start = start or moment
+            offset = (moment - start).total_seconds()
+        yield offset, match['path']
+
+
+class _QuietHandler(simple_server.WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class _SharedSocketServer(simple_server.WSGIServer):
+    """WSGIServer, который слушает уже открытый общий сокет."""
+
+    request_queue_size = 1024
+
+    def __init__(self, sock):
+        super().__init__(
+            sock.getsockname()[:2], _QuietHandler, bind_and_activate=False)
+        self.socket.close()
+        self.socket = sock
+        self.server_name, self.server_port = sock.getsockname()[:2]
+        self.setup_environ()
+
+
+def _serve(sock, database_name, caches):
+    workers._init_worker(database_name, caches)
+    from django.core.servers.basehttp import get_internal_wsgi_application
+    server = _SharedSocketServer(sock)
+    server.set_app(get_internal_wsgi_application())
+    server.serve_forever()
+
+
+@contextmanager
+def serve(count, host='127.0.0.1', port=0):
+    """Запускает count процессов сервера, отдаёт адрес (host, port)."""
+    sock = socket.create_server((host, port), backlog=1024)
+    connections.close_all()
+    context = multiprocessing.get_context('spawn')
+    processes = [
+        context.Process(
+            target=_serve,
+            args=(
+                sock, connections['default'].settings_dict['NAME'],
+                settings.CACHES,
+            ),
+            daemon=True,
+        )
+        for _ in range(count)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        yield sock.getsockname()[:2]
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+        sock.close()
+
+
+def wait_ready(target, timeout=30):
+    """Ждёт, пока сервер начнёт отвечать."""
+    address = urlsplit(target)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            connection = http.client.HTTPConnection(
+                address.hostname, address.port, timeout=5)
+            connection.request('HEAD', '/about/tech/')
+            connection.getresponse().read()
+            connection.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+class Visitor:
+    """Один посетитель: своё соединение и, если есть, своя сессия."""
+
+    def __init__(self, target, session=None):
+        address = urlsplit(target)
+        self.host = address.hostname
+        self.port = address.port
+        self.session = session
+        self.connection = None
+
+    def request(self, method, path, form=None):
+        headers = {}
+        body = None
+        if self.session:
+            headers['Cookie'] = (
+                f'sessionid={self.session["sessionid"]}; '
+                f'csrftoken={self.session["csrftoken"]}'
+            )
+        if form is not None:
+            form = dict(form, csrfmiddlewaretoken=self.session['csrftoken'])
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        for attempt in (1, 2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(
+                    self.host, self.port, timeout=60)
+            try:
+                self.connection.request(method, path, body, headers)
+                response = self.connection.getresponse()
+                response.read()
+                if response.will_close:
+                    self.close()
+                return response.status
+            except (OSError, http.client.HTTPException):
+                # Сервер мог закрыть соединение между запросами.
+                self.close()
+                if attempt == 2:
+                    return 0
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def _text(rng):
+    return f'Нагрузочный текст {rng.getrandbits(32):08x}'
+
+
+def _mix_visitor(visitor, actions, weights, stop, rng, records):
+    names = list(actions)
+    while not stop():
+        name = rng.choices(names, weights)[0]
+        action = actions[name]
+        form = {'text': _text(rng)} if action.form else None
+        started = time.perf_counter()
+        status = visitor.request(
+            action.method, rng.choice(action.paths), form)
+        records.append(Record(name, status, time.perf_counter() - started))
+
+
+def _replay_visitor(visitor, entries, lock, speed, start, stop, records):
+    while not stop():
+        with lock:
+            entry = next(entries, None)
+        if entry is None:
+            return
+        offset, path = entry
+        if speed and offset is not None:
+            delay = start + offset / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        started = time.perf_counter()
+        status = visitor.request('GET', path)
+        records.append(
+            Record('replay', status, time.perf_counter() - started))
+
+
+def run_clients(target, visitors, duration, mix=None, actions=None,
+                replay=None, speed=0, seed=0):
+    """Гоняет посетителей потоками в этом процессе, отдаёт записи.
+
+    visitors — список сессий (None для анонимов), по потоку на каждую.
+    С replay потоки делят между собой строки журнала, иначе выбирают
+    действия из actions по весам mix: анонимы — только те, что не
+    требуют входа.
+    """
+    records = []
+    start = time.monotonic()
+    deadline = start + duration if duration else None
+
+    def stop():
+        return deadline is not None and time.monotonic() >= deadline
+
+    entries = iter(replay or ())
+    lock = threading.Lock()
+    threads = []
+    for number, session in enumerate(visitors):
+        visitor = Visitor(target, session)
+        if replay is not None:
+            args = (visitor, entries, lock, speed, start, stop, records)
+            run = _replay_visitor
+        else:
+            allowed = {
+                name: action for name, action in actions.items()
+                if mix.get(name) and (session or not action.login)
+            }
+            if not allowed:
+                continue
+            weights = [mix[name] for name in allowed]
+            args = (visitor, allowed, weights, stop,
+                    random.Random(f'{seed}-{number}'), records)
+            run = _mix_visitor
+        threads.append(threading.Thread(target=run, args=args, daemon=True))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return records
+
+
+def _percentiles(latencies):
+    if len(latencies) < 2:
+        cuts = latencies * 99
+    else:
+        cuts = statistics.quantiles(latencies, n=100)
+    return {
+        f'p{percent}_ms': round(cuts[percent - 1] * 1000, 3)
+        for percent in (50, 95, 99)
+    }
+
+
+def summarize(records, elapsed):
+    """Пропускная способность и перцентили, всего и по действиям.
+
+    Ошибкой считается обрыв соединения и ответ 5xx; 4xx бывают и
+    законными (отписка от того, на кого не подписан), их видно в statuses.
+    """
+    by_action = defaultdict(list)
+    for record in records:
+        by_action[record.action].append(record)
+
+    def block(group):
+        statuses = Counter(record.status for record in group)
+        return {
+            'requests': len(group),
+            'errors': sum(count for status, count in statuses.items()
+                          if status == 0 or status >= 500),
+            'rps': round(len(group) / elapsed, 1) if elapsed else 0.0,
+            **_percentiles([record.latency for record in group]),
+            'statuses': {str(status): count
+                         for status, count in sorted(statuses.items())},
+        }
+
+    if not records:
+        return {'elapsed_s': round(elapsed, 3), 'requests': 0, 'actions': {}}
+    return {
+        'elapsed_s': round(elapsed, 3),
+        **block(records),
+        'actions': {name: block(group)
+                    for name, group in sorted(by_action.items())},
+    }
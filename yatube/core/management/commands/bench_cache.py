@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache import SQLiteCache
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает SQLiteCache с LocMemCache и FileBasedCache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ops', type=int, default=5000)
+        parser.add_argument('--value-size', type=int, default=2048)
+
+    def handle(self, *args, ops, value_size, **options):
+        directory = tempfile.mkdtemp()
+        backends = (
+            ('locmem', LocMemCache('bench', {})),
+            ('filebased', FileBasedCache(
+                os.path.join(directory, 'files'), {})),
+            ('sqlite', SQLiteCache(
+                os.path.join(directory, 'cache.sqlite3'), {})),
+        )
+        value = 'x' * value_size
+        keys = [f'key{index}' for index in range(ops)]
+        try:
+            self.stdout.write(
+                f'{"backend":<10} {"set":>10} {"get":>10} '
+                f'{"get_many":>10} {"incr":>10}  (ключей/с)'
+            )
+            for name, cache in backends:
+                results = (
+                    self.measure(lambda: [cache.set(key, value)
+                                          for key in keys]),
+                    self.measure(lambda: [cache.get(key) for key in keys]),
+                    self.measure(lambda: [
+                        cache.get_many(keys[start:start + 10])
+                        for start in range(0, ops, 10)
+                    ]),
+                    self.incr(cache, ops),
+                )
+                self.stdout.write(f'{name:<10} ' + ' '.join(
+                    f'{ops / seconds:>10.0f}' for seconds in results))
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    @staticmethod
+    def measure(run):
+        started = time.perf_counter()
+        run()
+        return time.perf_counter() - started
+
+    def incr(self, cache, ops):
+        cache.set('counter', 0)
+        return self.measure(lambda: [cache.incr('counter')
+                                     for _ in range(ops)])
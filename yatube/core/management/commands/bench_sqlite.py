@@ -0,0 +1,142 @@
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+def _connect(path, pragmas):
+    # Как у Django по умолчанию: autocommit и ожидание блокировки 5 с.
+    connection = sqlite3.connect(path, timeout=5, isolation_level=None)
+    for name, value in pragmas.items():
+        connection.execute(f'PRAGMA {name} = {value}')
+    return connection
+
+
+def _work(path, pragmas, role, rows, duration, seed, results):
+    """Читатель или писатель: крутится duration секунд, отдаёт
+    (роль, операций, ошибок, задержки)."""
+    connection = _connect(path, pragmas)
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        key = rng.randrange(1, rows)
+        started = time.perf_counter()
+        try:
+            if role == 'read':
+                connection.execute(
+                    'SELECT text FROM item WHERE id = ?', (key,)).fetchone()
+                connection.execute(
+                    'SELECT count(*), max(counter) FROM item '
+                    'WHERE id BETWEEN ? AND ?', (key, key + 200)).fetchone()
+            else:
+                connection.execute('BEGIN IMMEDIATE')
+                connection.execute(
+                    'INSERT INTO item (text, counter) VALUES (?, 0)',
+                    ('x' * 200,))
+                connection.execute(
+                    'UPDATE item SET counter = counter + 1 WHERE id = ?',
+                    (key,))
+                connection.execute('COMMIT')
+        except sqlite3.OperationalError:
+            errors += 1
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+            continue
+        latencies.append(time.perf_counter() - started)
+    connection.close()
+    results.put((role, len(latencies), errors, latencies))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает одновременные чтение и запись в SQLite с журналом '
+        'по умолчанию и с PRAGMA из SQLITE_PRAGMAS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=5)
+        parser.add_argument('--rows', type=int, default=100000)
+
+    def handle(self, *args, readers, writers, duration, rows, **options):
+        directory = tempfile.mkdtemp()
+        modes = (
+            ('default', {}),
+            ('production', settings.SQLITE_PRAGMAS),
+        )
+        try:
+            self.stdout.write(
+                f'{"режим":<12} {"чтений/с":>10} {"записей/с":>10} '
+                f'{"ошибок":>7} {"p99 чтения":>11} {"p99 записи":>11} (мс)'
+            )
+            for name, pragmas in modes:
+                path = os.path.join(directory, f'{name}.sqlite3')
+                self.prepare(path, pragmas, rows)
+                results = self.run(
+                    path, pragmas, readers, writers, rows, duration)
+                self.stdout.write(f'{name:<12} ' + self.format(
+                    results, duration))
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    @staticmethod
+    def prepare(path, pragmas, rows):
+        connection = _connect(path, pragmas)
+        connection.execute(
+            'CREATE TABLE item (id INTEGER PRIMARY KEY, text TEXT, '
+            'counter INTEGER NOT NULL)')
+        connection.execute('BEGIN')
+        connection.executemany(
+            'INSERT INTO item (text, counter) VALUES (?, 0)',
+            (('x' * 200,) for _ in range(rows)))
+        connection.execute('COMMIT')
+        connection.close()
+
+    @staticmethod
+    def run(path, pragmas, readers, writers, rows, duration):
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        processes = [
+            context.Process(target=_work, args=(
+                path, pragmas, role, rows, duration, number, results))
+            for number, role in enumerate(
+                ['read'] * readers + ['write'] * writers)
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        return collected
+
+    @staticmethod
+    def format(results, duration):
+        totals = {}
+        errors = 0
+        for role, count, failed, latencies in results:
+            total = totals.setdefault(role, [0, []])
+            total[0] += count
+            total[1] += latencies
+            errors += failed
+
+        def p99(latencies):
+            if len(latencies) < 2:
+                return 0.0
+            return statistics.quantiles(latencies, n=100)[98] * 1000
+
+        reads = totals.get('read', [0, []])
+        writes = totals.get('write', [0, []])
+        return (
+            f'{reads[0] / duration:>10.0f} {writes[0] / duration:>10.0f} '
+            f'{errors:>7} {p99(reads[1]):>11.2f} {p99(writes[1]):>11.2f}'
+        )
@@ -0,0 +1,68 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет p50/p95/p99 и число запросов к базе для страниц posts, '
+        'users и about, пишет результат в JSON и сравнивает с прошлым.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=1)
+        parser.add_argument(
+            '--url',
+            action='append',
+            dest='names',
+            help='Замерить только эту страницу (имя адреса, posts:index).',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для результата в JSON; по умолчанию stdout.',
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON прошлого замера; ухудшения завершают команду ошибкой.',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=20,
+            help='Допустимый рост p95 в процентах.',
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должно быть не меньше 1')
+        results = benchmark.run(
+            options['requests'], options['warmup'], options['names'])
+        report = json.dumps(results, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report + '\n')
+        else:
+            self.stdout.write(report)
+        for row in results['results']:
+            self.stderr.write(
+                f'{row["name"]:<32} {row["user"]:<14} {row["status"]} '
+                f'p50 {row["p50_ms"]:>8.1f}  p95 {row["p95_ms"]:>8.1f}  '
+                f'p99 {row["p99_ms"]:>8.1f} мс  запросов {row["queries"]}'
+            )
+        if not options['compare']:
+            return
+        try:
+            with open(options['compare'], encoding='utf-8') as file:
+                previous = json.load(file)
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        lines, regressions = benchmark.compare(
+            previous, results, options['threshold'])
+        for line in lines:
+            self.stderr.write(line)
+        if regressions:
+            raise CommandError(
+                f'Ухудшений: {len(regressions)}\n' + '\n'.join(regressions))
@@ -0,0 +1,201 @@
+import json
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from core import loadtest
+from posts.models import Group, Post, User
+
+DEFAULT_MIX = (
+    'index=30,group=10,profile=15,post_detail=25,'
+    'follow_index=8,create=2,comment=6,follow=4'
+)
+SAMPLE_SIZE = 500
+CSRF_ALLOWED_CHARS = (
+    'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789')
+
+
+def build_actions():
+    """Действия смеси с адресами на самых читаемых объектах."""
+    posts = list(Post.objects.order_by(
+        '-pub_date').values_list('pk', flat=True)[:SAMPLE_SIZE])
+    slugs = list(Group.objects.order_by(
+        '-posts_count').values_list('slug', flat=True)[:SAMPLE_SIZE])
+    usernames = list(User.objects.order_by(
+        '-stats__followers_count').values_list(
+            'username', flat=True)[:SAMPLE_SIZE])
+    if not posts or not usernames:
+        raise CommandError('В базе нет постов: сначала seed_bench')
+    actions = {
+        'index': loadtest.Action(
+            'GET', ['/', '/?page=2'], False, False),
+        'group': loadtest.Action('GET', [
+            reverse('posts:group_list', args=(slug,)) for slug in slugs
+        ], False, False),
+        'profile': loadtest.Action('GET', [
+            reverse('posts:profile', args=(username,))
+            for username in usernames
+        ], False, False),
+        'post_detail': loadtest.Action('GET', [
+            reverse('posts:post_detail', args=(pk,)) for pk in posts
+        ], False, False),
+        'follow_index': loadtest.Action(
+            'GET', [reverse('posts:follow_index')], True, False),
+        'create': loadtest.Action(
+            'POST', [reverse('posts:post_create')], True, True),
+        'comment': loadtest.Action('POST', [
+            reverse('posts:add_comment', args=(pk,)) for pk in posts
+        ], True, True),
+        'follow': loadtest.Action('GET', [
+            reverse(name, args=(username,))
+            for username in usernames
+            for name in ('posts:profile_follow', 'posts:profile_unfollow')
+        ], True, False),
+    }
+    return {name: action for name, action in actions.items() if action.paths}
+
+
+def create_sessions(count):
+    """Сессии случайных пользователей для вошедших посетителей.
+
+    CSRF-токен — любая строка допустимой длины: Django сверяет токен
+    формы с токеном из cookie, а не с выданным им самим.
+    """
+    sessions = []
+    for user in User.objects.filter(is_active=True).order_by('?')[:count]:
+        client = Client()
+        client.force_login(user)
+        sessions.append({
+            'sessionid': client.session.session_key,
+            'csrftoken': get_random_string(64, CSRF_ALLOWED_CHARS),
+        })
+    return sessions
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает сайт в N процессах и нагружает его смесью запросов '
+        'анонимов и вошедших пользователей или журналом доступа; '
+        'пишет пропускную способность и перцентили задержек.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument(
+            '--target',
+            help='Адрес уже запущенного сервера; тогда свой не стартует.',
+        )
+        parser.add_argument('--clients', type=int, default=32)
+        parser.add_argument(
+            '--client-processes',
+            type=int,
+            default=multiprocessing.cpu_count(),
+        )
+        parser.add_argument('--duration', type=float, default=30)
+        parser.add_argument(
+            '--logged-in',
+            type=float,
+            default=0.5,
+            help='Доля вошедших посетителей.',
+        )
+        parser.add_argument('--mix', default=DEFAULT_MIX)
+        parser.add_argument(
+            '--replay',
+            help='Журнал доступа: проиграть его GET-запросы.',
+        )
+        parser.add_argument(
+            '--speed',
+            type=float,
+            default=0,
+            help='Ускорение проигрывания по времени журнала; 0 — без пауз.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Файл для итогов в JSON.')
+
+    def handle(self, *args, **options):
+        try:
+            mix = loadtest.parse_mix(options['mix'])
+        except ValueError as error:
+            raise CommandError(error)
+        replay = None
+        actions = None
+        if options['replay']:
+            with open(options['replay'], encoding='utf-8') as file:
+                replay = list(loadtest.parse_log(file))
+        else:
+            actions = build_actions()
+        clients = options['clients']
+        logged_in = round(clients * options['logged_in'])
+        sessions = create_sessions(logged_in) if logged_in else []
+        visitors = sessions + [None] * (clients - len(sessions))
+        server = (
+            nullcontext(None) if options['target']
+            else loadtest.serve(options['workers']))
+        try:
+            with server as address:
+                target = options['target'] or 'http://{}:{}'.format(*address)
+                loadtest.wait_ready(target)
+                started = time.monotonic()
+                records = self.run(
+                    target, visitors, options, mix, actions, replay)
+                elapsed = time.monotonic() - started
+        finally:
+            Session.objects.filter(session_key__in=[
+                session['sessionid'] for session in sessions]).delete()
+        summary = loadtest.summarize(records, elapsed)
+        summary['clients'] = clients
+        summary['workers'] = None if options['target'] else options['workers']
+        self.report(summary)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(summary, file, ensure_ascii=False, indent=2)
+
+    def run(self, target, visitors, options, mix, actions, replay):
+        """Делит посетителей и строки журнала между процессами."""
+        processes = max(1, min(options['client_processes'], len(visitors)))
+        jobs = []
+        step = math.ceil(len(visitors) / processes)
+        for number in range(processes):
+            jobs.append(dict(
+                target=target,
+                visitors=visitors[number * step:(number + 1) * step],
+                duration=0 if replay is not None else options['duration'],
+                mix=mix,
+                actions=actions,
+                replay=replay[number::processes] if replay else replay,
+                speed=options['speed'],
+                seed=f'{options["seed"]}-{number}',
+            ))
+        if processes == 1:
+            return loadtest.run_clients(**jobs[0])
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context('spawn'),
+        ) as pool:
+            futures = [pool.submit(loadtest.run_clients, **job)
+                       for job in jobs]
+            return [record for future in futures
+                    for record in future.result()]
+
+    def report(self, summary):
+        if not summary['requests']:
+            self.stdout.write('Ни одного запроса')
+            return
+        self.stdout.write(
+            f'{"действие":<14} {"запросов":>9} {"ошибок":>7} {"rps":>8} '
+            f'{"p50":>8} {"p95":>8} {"p99":>8}  (мс)'
+        )
+        for name, row in (*summary['actions'].items(), ('всего', summary)):
+            self.stdout.write(
+                f'{name:<14} {row["requests"]:>9} {row["errors"]:>7} '
+                f'{row["rps"]:>8.1f} {row["p50_ms"]:>8.1f} '
+                f'{row["p95_ms"]:>8.1f} {row["p99_ms"]:>8.1f}'
+            )
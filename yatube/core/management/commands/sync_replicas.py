@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.replicas import copy_database, mark_synced
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет SQLite-реплики из DATABASE_REPLICAS копией основной '
+        'базы. Локальная замена потоковой репликации.'
+    )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                'Реплик нет: задайте их число в YATUBE_REPLICAS')
+        source = connections['default'].settings_dict['NAME']
+        for alias in settings.DATABASE_REPLICAS:
+            target = connections[alias].settings_dict['NAME']
+            # Реплика открывается как file:<путь>?mode=ro.
+            path = target[len('file:'):].split('?')[0]
+            # Момент до начала копии: всё, что изменилось раньше, в ней.
+            started = time.time()
+            copy_database(source, path)
+            mark_synced(alias, started)
+            connections[alias].close()
+            self.stdout.write(f'{alias}: {path}')
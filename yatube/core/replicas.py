@@ -0,0 +1,134 @@
+"""Чтение с реплик и чтение своих записей.
+
+ReplicaRouter отправляет чтения моделей posts (ленты, посты,
+комментарии, подписки) на случайную реплику из DATABASE_REPLICAS,
+а запись и всё прочее — пользователи, сессии, админка — на основную
+базу. Чтение внутри транзакции основной базы тоже идёт на неё: так
+view, которые пишут, видят то, что сами прочитали.
+
+Реплика отстаёт от основной базы, поэтому пользователь, который
+что-то записал, READ_YOUR_WRITES_SECONDS секунд читает только с
+основной базы и сразу видит свой пост или комментарий. Отметка
+хранится в общем кэше и видна всем воркерам.
+
+Запрос читает с одной реплики от начала до конца. Страница, области
+которой (см. fragment_cache) менялись после снимка этой реплики,
+читается с основной базы: иначе устаревший фрагмент или ETag попал бы
+в кэш под новым поколением и пережил бы обновление реплики. Без реплик
+роутер ничего не меняет.
+"""
+import os
+import random
+import sqlite3
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from . import fragment_cache
+
+REPLICATED_APPS = ('posts',)
+PIN_KEY = 'primary-pin:{}'
+SYNCED_KEY = 'replica-synced:{}'
+
+_state = threading.local()
+
+
+def _pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def _in_request():
+    return getattr(_state, 'in_request', False)
+
+
+def note_write():
+    """Всё, что запрос прочитает после записи, — с основной базы."""
+    if _in_request():
+        _state.pinned = _state.wrote = True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (not replicas
+                or model._meta.app_label not in REPLICATED_APPS
+                or _pinned()
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return getattr(_state, 'replica', None) or random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        note_write()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и на основной базе.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaMiddleware:
+    """Закрепляет за основной базой тех, кто недавно писал."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Без реплик не трогаем request.user: это лишний запрос сессии.
+        user_id = request.user.pk if settings.DATABASE_REPLICAS else None
+        _state.pinned = bool(
+            user_id and cache.get(PIN_KEY.format(user_id)))
+        _state.wrote = False
+        _state.in_request = True
+        _state.replica = (
+            random.choice(settings.DATABASE_REPLICAS)
+            if settings.DATABASE_REPLICAS else None)
+        try:
+            response = self.get_response(request)
+            if _state.wrote and user_id:
+                cache.set(PIN_KEY.format(user_id), True,
+                          settings.READ_YOUR_WRITES_SECONDS)
+            return response
+        finally:
+            _state.pinned = _state.wrote = _state.in_request = False
+            _state.replica = None
+
+
+def read_fresh(scopes):
+    """Переводит запрос на основную базу, если снимок его реплики
+    старше последнего изменения областей scopes."""
+    replica = getattr(_state, 'replica', None)
+    if replica is None or _pinned():
+        return
+    synced = cache.get(SYNCED_KEY.format(replica))
+    if synced is None or synced < fragment_cache.last_changed(scopes):
+        _state.pinned = True
+
+
+def mark_synced(alias, moment):
+    """Запоминает, по состоянию на какой момент снята реплика."""
+    cache.set(SYNCED_KEY.format(alias), moment, None)
+
+
+def copy_database(source, target):
+    """Согласованная копия SQLite-файла через backup API.
+
+    Копия собирается рядом и подменяет реплику переименованием, так
+    что читатели видят либо старый снимок, либо новый. Копия хранится
+    в обычном журнале, без WAL: у файла, который целиком подменяют,
+    не должно оставаться файла -wal от прежнего снимка.
+    """
+    temporary = f'{target}.tmp'
+    origin = sqlite3.connect(source)
+    copy = sqlite3.connect(temporary)
+    try:
+        origin.backup(copy)
+        copy.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        copy.close()
+        origin.close()
+    os.replace(temporary, target)
@@ -0,0 +1,69 @@
+"""Настройки SQLite для работы под нагрузкой.
+
+При создании каждого подключения к SQLite выполняются PRAGMA из
+settings.SQLITE_PRAGMAS. В режиме WAL читатели не ждут писателя и
+писатель не ждёт читателей, synchronous=NORMAL в WAL не теряет
+целостность при сбое процесса, mmap и большой кэш страниц снимают
+лишние чтения с диска, а busy_timeout заставляет писателей ждать
+друг друга вместо немедленного database is locked.
+
+Подключения живут CONN_MAX_AGE секунд, так что PRAGMA выполняются
+один раз на поток воркера, а не на каждый запрос. Для базы в памяти
+(тесты) journal_mode и mmap_size не применяются: SQLite их там
+не поддерживает.
+"""
+from django.conf import settings
+
+# Эти PRAGMA не имеют смысла для базы в памяти.
+FILE_ONLY = ('journal_mode', 'mmap_size')
+
+
+def _expected(connection):
+    pragmas = dict(settings.SQLITE_PRAGMAS)
+    if connection.is_in_memory_db():
+        for name in FILE_ONLY:
+            pragmas.pop(name, None)
+    if connection.alias in settings.DATABASE_REPLICAS:
+        # Реплики открываются только на чтение и подменяются целиком
+        # (см. core.replicas.copy_database): журнал у них обычный.
+        pragmas.pop('journal_mode', None)
+    return pragmas
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """Обработчик connection_created.
+
+    PRAGMA идут мимо курсоров Django, прямо в подключение sqlite3:
+    иначе они попали бы в счётчик запросов и бюджет первого запроса
+    потока.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in _expected(connection).items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def _normalize(name, value):
+    value = str(value).lower()
+    if name == 'synchronous':
+        return {'0': 'off', '1': 'normal', '2': 'full', '3': 'extra'}.get(
+            value, value)
+    if name == 'temp_store':
+        return {'0': 'default', '1': 'file', '2': 'memory'}.get(value, value)
+    return value
+
+
+def check_pragmas(connection):
+    """Фактические значения PRAGMA и список расхождений с настройками."""
+    if connection.vendor != 'sqlite':
+        return {}, []
+    connection.ensure_connection()
+    actual = {}
+    problems = []
+    for name, value in _expected(connection).items():
+        actual[name] = connection.connection.execute(
+            f'PRAGMA {name}').fetchone()[0]
+        if _normalize(name, actual[name]) != _normalize(name, value):
+            problems.append(
+                f'PRAGMA {name} = {actual[name]}, ожидалось {value}')
+    return actual, problems
@@ -0,0 +1,49 @@
+from django import template
+
+from core import fragment_cache, replicas
+
+register = template.Library()
+
+
+class GenerationCacheNode(template.Node):
+    def __init__(self, nodelist, fragment_name, scopes, vary_on):
+        self.nodelist = nodelist
+        self.fragment_name = fragment_name
+        self.scopes = scopes
+        self.vary_on = vary_on
+
+    def render(self, context):
+        scopes = self.scopes.resolve(context)
+        if isinstance(scopes, str):
+            scopes = (scopes,)
+        replicas.read_fresh(scopes)
+        return fragment_cache.get_or_render(
+            self.fragment_name,
+            scopes,
+            [var.resolve(context) for var in self.vary_on],
+            lambda: self.nodelist.render(context),
+        )
+
+
+@register.tag('generation_cache')
+def do_generation_cache(parser, token):
+    """Кэширует фрагмент до записи в любую из областей.
+
+    {% generation_cache "index" cache_scopes page_obj.number %}
+        ...
+    {% endgeneration_cache %}
+    """
+    nodelist = parser.parse(('endgeneration_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f'{tokens[0]} принимает имя фрагмента и области кэша.'
+        )
+    fragment_name = tokens[1].strip('\'"')
+    return GenerationCacheNode(
+        nodelist,
+        fragment_name,
+        parser.compile_filter(tokens[2]),
+        [parser.compile_filter(token) for token in tokens[3:]],
+    )
@@ -0,0 +1,48 @@
+"""Настройки, с которыми идут тесты.
+
+Кэш общий для всех воркеров хоста и лежит в SQLite-файле (core.cache),
+а тесты его чистят. Поэтому на время прогона CACHES подменяется на
+файл во временном каталоге; пулы процессов (core.workers) передают
+настройку кэша своим воркерам. Бюджеты запросов в тестах строгие
+независимо от DEBUG: превышение роняет запрос (core.instrumentation).
+"""
+import copy
+import os
+import shutil
+import tempfile
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from . import fragment_cache
+
+
+@contextmanager
+def isolated_settings():
+    """Временный файл кэша и строгие бюджеты до выхода из блока."""
+    directory = tempfile.mkdtemp(prefix='yatube-cache-')
+    caches = copy.deepcopy(settings.CACHES)
+    caches['default']['LOCATION'] = os.path.join(directory, 'cache.sqlite3')
+    try:
+        with override_settings(CACHES=caches, QUERY_BUDGETS_STRICT=True):
+            try:
+                yield
+            finally:
+                # Иначе накопленные счётчики фрагментов уйдут при выходе
+                # процесса уже в файл кэша разработки.
+                fragment_cache.flush()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        self._settings = ExitStack()
+        self._settings.enter_context(isolated_settings())
+        super().setup_test_environment(**kwargs)
+
+    def teardown_test_environment(self, **kwargs):
+        super().teardown_test_environment(**kwargs)
+        self._settings.close()
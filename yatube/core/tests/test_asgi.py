@@ -0,0 +1,159 @@
+import asyncio
+import os
+import tempfile
+import threading
+
+from django.core.wsgi import get_wsgi_application
+from django.test import SimpleTestCase, TransactionTestCase
+from django.test.utils import override_settings
+
+from posts.models import Post, User
+
+from ..asgi import AsgiHandler
+
+
+def scope(path, method='GET', headers=(), query_string=b''):
+    return {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query_string,
+        'headers': [(name.encode(), value.encode())
+                    for name, value in headers],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 5000),
+    }
+
+
+async def call(app, scope, chunks=(b'',), send_hook=None):
+    """Один запрос к ASGI-приложению: (статус, заголовки, тело)."""
+    messages = [{'type': 'http.request', 'body': chunk, 'more_body': True}
+                for chunk in chunks]
+    messages[-1]['more_body'] = False
+    response = {'body': b''}
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        if send_hook is not None:
+            await send_hook(message)
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+            response['headers'] = dict(message['headers'])
+        else:
+            response['body'] += message['body']
+
+    await app(scope, receive, send)
+    return response['status'], response['headers'], response['body']
+
+
+def echo(environ, start_response):
+    """WSGI-приложение, которое возвращает тело и часть environ."""
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [
+        environ['wsgi.input'].read(),
+        f'|{environ["PATH_INFO"]}|{environ["QUERY_STRING"]}'
+        f'|{environ.get("HTTP_X_TAG")}|{environ.get("CONTENT_TYPE")}'
+        .encode('latin1'),
+    ]
+
+
+class AsgiHandlerTests(SimpleTestCase):
+    def test_environ_and_body(self):
+        """Тело собирается из кусков, заголовки и путь попадают в environ."""
+        status, _, body = asyncio.run(call(
+            AsgiHandler(echo, 1),
+            scope('/путь/', 'POST', headers=(
+                ('X-Tag', 'a'), ('x-tag', 'b'),
+                ('Content-Type', 'text/plain'),
+            ), query_string=b'page=2'),
+            chunks=(b'abc', b'def'),
+        ))
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            body.decode('utf-8'), 'abcdef|/путь/|page=2|a,b|text/plain')
+
+    def test_slow_client_does_not_hold_thread(self):
+        """Пока медленный клиент не забрал ответ, единственный поток
+        пула уже обслуживает следующий запрос."""
+        app = AsgiHandler(echo, 1)
+
+        async def scenario():
+            release = asyncio.Event()
+
+            async def slow(message):
+                await release.wait()
+
+            slow_request = asyncio.ensure_future(
+                call(app, scope('/slow/'), send_hook=slow))
+            await asyncio.sleep(0.05)
+            status, _, _ = await asyncio.wait_for(
+                call(app, scope('/fast/')), timeout=5)
+            self.assertFalse(slow_request.done())
+            release.set()
+            await slow_request
+            return status
+
+        self.assertEqual(asyncio.run(scenario()), 200)
+
+    def test_disconnect_stops_streaming(self):
+        """Ушедший клиент останавливает отдачу потокового ответа."""
+        produced = []
+        closed = threading.Event()
+
+        def stream(environ, start_response):
+            start_response('200 OK', [])
+            try:
+                for number in range(1000):
+                    produced.append(number)
+                    yield b'x' * 1024
+            finally:
+                closed.set()
+
+        async def broken(message):
+            if message['type'] == 'http.response.body':
+                raise OSError('клиент ушёл')
+
+        with self.assertRaises(OSError):
+            asyncio.run(call(
+                AsgiHandler(stream, 1), scope('/'), send_hook=broken))
+        self.assertTrue(closed.is_set())
+        self.assertLess(len(produced), 1000)
+
+    def test_media_files(self):
+        """Медиа в режиме отладки отдаётся из цикла событий кусками,
+        выход за MEDIA_ROOT уходит в Django."""
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'file.txt'), 'wb') as file:
+                file.write(b'y' * 200000)
+            with override_settings(DEBUG=True, MEDIA_ROOT=directory):
+                status, headers, body = asyncio.run(call(
+                    AsgiHandler(echo, 1), scope('/media/file.txt')))
+                self.assertEqual(status, 200)
+                self.assertEqual(headers[b'content-type'], b'text/plain')
+                self.assertEqual(body, b'y' * 200000)
+                _, _, body = asyncio.run(call(
+                    AsgiHandler(echo, 1), scope('/media/../secret')))
+                self.assertTrue(body.endswith(b'|/media/../secret||None|None'))
+
+
+class AsgiDjangoTests(TransactionTestCase):
+    def test_django_pages(self):
+        """Страницы сайта через ASGI-вход: view в потоке пула."""
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(author=author, text='Пост через ASGI')
+        app = AsgiHandler(get_wsgi_application(), 2)
+
+        async def pages():
+            return await asyncio.gather(
+                call(app, scope('/')),
+                call(app, scope(f'/posts/{post.pk}/')),
+                call(app, scope('/about/tech/')),
+            )
+
+        results = asyncio.run(pages())
+        self.assertEqual([status for status, _, _ in results],
+                         [200, 200, 200])
+        self.assertIn('Пост через ASGI', results[1][2].decode())
+        self.assertIn(b'server-timing', results[0][1])
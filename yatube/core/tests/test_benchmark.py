@@ -0,0 +1,83 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Group, Post, User
+
+from .. import benchmark
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост')
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def test_targets(self):
+        """Замеряются страницы всех трёх приложений, кроме меняющих
+        данные, с подставленными параметрами."""
+        names = dict(benchmark.targets(benchmark.sample_objects()))
+        self.assertEqual(names['posts:group_list'], '/group/group/')
+        self.assertEqual(names['posts:profile'], '/profile/author/')
+        self.assertEqual(
+            names['posts:post_detail'], f'/posts/{self.post.pk}/')
+        self.assertIn('users:login', names)
+        self.assertIn('about:tech', names)
+        self.assertFalse(benchmark.SKIP & set(names))
+
+    def test_command_writes_json(self):
+        """Команда пишет перцентили и число запросов по каждой
+        странице для анонима и вошедшего пользователя."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.json')
+            call_command(
+                'bench_urls', requests=3, url=['posts:index', 'about:tech'],
+                output=path, stderr=StringIO())
+            with open(path, encoding='utf-8') as file:
+                report = json.load(file)
+        self.assertEqual(report['dataset']['posts'], 1)
+        self.assertEqual(len(report['results']), 4)
+        index = report['results'][0]
+        self.assertEqual(index['name'], 'posts:index')
+        self.assertEqual(index['status'], 200)
+        self.assertGreater(index['queries'], 0)
+        self.assertLessEqual(index['p50_ms'], index['p99_ms'])
+
+    def test_compare(self):
+        """Рост числа запросов — ухудшение, даже если время то же."""
+        row = {'name': 'posts:index', 'user': 'anonymous',
+               'p95_ms': 10.0, 'queries': 4}
+        old = {'results': [row]}
+        new = {'results': [dict(row, queries=5)]}
+        lines, regressions = benchmark.compare(old, new)
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(regressions, lines)
+        _, regressions = benchmark.compare(
+            old, {'results': [dict(row, p95_ms=11.0)]})
+        self.assertEqual(regressions, [])
+
+    def test_compare_fails_command(self):
+        """С --compare ухудшения завершают команду ошибкой."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'old.json')
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump({'results': [{
+                    'name': 'about:tech', 'user': 'anonymous',
+                    'p95_ms': 0.001, 'queries': 0,
+                }]}, file)
+            with self.assertRaises(CommandError):
+                call_command(
+                    'bench_urls', requests=2, url=['about:tech'],
+                    compare=path, stdout=StringIO(), stderr=StringIO())
@@ -0,0 +1,43 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from posts.models import Post, User
+
+from ..fragment_cache import (NAMES_KEY, flush, get_or_render, last_changed,
+                              record, scope, stats)
+
+
+class StatsTests(SimpleTestCase):
+    @override_settings(FRAGMENT_CACHE_STATS_FLUSH=60)
+    def test_counted_in_process(self):
+        """Попадания копятся в процессе и не пишутся в общий кэш на
+        каждый рендер."""
+        flush()
+        cache.clear()
+        for hit in (True, True, False):
+            record('index', hit)
+        self.assertIsNone(cache.get(NAMES_KEY))
+        self.assertEqual(stats()['index'], {'hits': 2, 'misses': 1})
+
+
+class BumpOrderingTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+
+    def test_bump_after_commit(self):
+        """Фрагмент и отметка времени, собранные между записью и
+        фиксацией, после фиксации устаревают."""
+        scopes = [scope('global')]
+        with transaction.atomic():
+            Post.objects.create(author=self.user, text='Новый пост')
+            # Параллельный читатель ещё видит данные до записи.
+            get_or_render('index', scopes, (), lambda: 'до записи')
+            changed = last_changed(scopes)
+            self.assertEqual(
+                get_or_render('index', scopes, (), lambda: 'после'),
+                'до записи')
+        self.assertEqual(
+            get_or_render('index', scopes, (), lambda: 'после'), 'после')
+        self.assertGreater(last_changed(scopes), changed)
@@ -0,0 +1,68 @@
+import json
+
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from ..instrumentation import (QueryBudgetExceeded,
+                               SQLInstrumentationMiddleware, query_budget,
+                               unbudgeted)
+
+
+@query_budget(1)
+def two_queries(request):
+    User.objects.count()
+    User.objects.exists()
+    return HttpResponse()
+
+
+@query_budget(1)
+def fan_out(request):
+    User.objects.count()
+    with unbudgeted():
+        User.objects.exists()
+        User.objects.exists()
+    return HttpResponse()
+
+
+class InstrumentationTests(TestCase):
+    def handle(self, view):
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+        middleware = SQLInstrumentationMiddleware(get_response)
+        return middleware(RequestFactory().get('/page/'))
+
+    @override_settings(QUERY_BUDGETS_STRICT=False)
+    def test_server_timing_and_log(self):
+        """Число запросов уходит в Server-Timing и в лог строкой JSON."""
+        with self.assertLogs('core.sql', 'INFO') as logs:
+            response = self.handle(two_queries)
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="2 queries", db-slowest;dur=[\d.]+$',
+        )
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], '/page/')
+        self.assertEqual(record['queries'], 2)
+        self.assertEqual(record['budget'], 1)
+        self.assertIn('SELECT', record['slowest_sql'])
+        self.assertIn('/page/: 2 запросов к базе при бюджете 1',
+                      logs.output[1])
+
+    @override_settings(QUERY_BUDGETS_STRICT=True)
+    def test_strict_budget(self):
+        """В строгом режиме превышение бюджета роняет запрос."""
+        with self.assertRaises(QueryBudgetExceeded):
+            self.handle(two_queries)
+        self.handle(query_budget(2)(lambda request: two_queries(request)))
+
+    @override_settings(QUERY_BUDGETS_STRICT=True)
+    def test_unbudgeted_queries(self):
+        """Запросы внутри unbudgeted() не входят в бюджет, но видны
+        в логе."""
+        with self.assertLogs('core.sql', 'INFO') as logs:
+            self.handle(fan_out)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['queries'], 3)
+        self.assertEqual(record['unbudgeted'], 2)
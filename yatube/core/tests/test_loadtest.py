@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.test import LiveServerTestCase, SimpleTestCase
+
+from posts.models import Comment, Follow, Post, User
+
+from .. import loadtest
+
+
+class LoadTestParsingTests(SimpleTestCase):
+    def test_parse_log(self):
+        """Из журнала берутся GET и HEAD со смещением по времени."""
+        lines = [
+            '127.0.0.1 - - [10/Oct/2026:13:55:36 +0000] '
+            '"GET / HTTP/1.1" 200 2326',
+            '127.0.0.1 - - [10/Oct/2026:13:55:38 +0000] '
+            '"POST /create/ HTTP/1.1" 302 0',
+            '127.0.0.1 - - [10/Oct/2026:13:55:40 +0000] '
+            '"HEAD /group/slug/?page=2 HTTP/1.1" 200 0 "-" "curl"',
+            '/posts/1/',
+            'мусор',
+        ]
+        self.assertEqual(list(loadtest.parse_log(lines)), [
+            (0.0, '/'), (4.0, '/group/slug/?page=2'), (None, '/posts/1/'),
+        ])
+
+    def test_parse_mix(self):
+        self.assertEqual(
+            loadtest.parse_mix('index=3, post_detail=1.5'),
+            {'index': 3.0, 'post_detail': 1.5},
+        )
+        with self.assertRaises(ValueError):
+            loadtest.parse_mix('index')
+
+    def test_summarize(self):
+        """Ошибки — обрывы и 5xx, 4xx видны только в статусах."""
+        records = [loadtest.Record('index', 200, 0.01 * n)
+                   for n in range(1, 101)]
+        records += [loadtest.Record('follow', 404, 0.5),
+                    loadtest.Record('follow', 500, 0.5),
+                    loadtest.Record('follow', 0, 0.5)]
+        summary = loadtest.summarize(records, 2.0)
+        self.assertEqual(summary['requests'], 103)
+        self.assertEqual(summary['errors'], 2)
+        self.assertEqual(summary['rps'], 51.5)
+        index = summary['actions']['index']
+        self.assertAlmostEqual(index['p50_ms'], 505, delta=10)
+        self.assertEqual(summary['actions']['follow']['statuses'],
+                         {'0': 1, '404': 1, '500': 1})
+
+
+class LoadTestCommandTests(LiveServerTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+
+    def load(self, **options):
+        # Один посетитель: живой сервер тестов делит между потоками одно
+        # подключение к базе в памяти и параллельных запросов не держит.
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'result.json')
+            call_command(
+                'load_test', target=self.live_server_url, clients=1,
+                client_processes=1, output=path, stdout=StringIO(),
+                **options)
+            with open(path, encoding='utf-8') as file:
+                return json.load(file)
+
+    def test_mix(self):
+        """Вошедший посетитель пишет комментарии, сессии потом удаляются."""
+        summary = self.load(duration=1, logged_in=1,
+                            mix='post_detail=1,comment=1')
+        self.assertEqual(summary['errors'], 0)
+        self.assertGreater(summary['actions']['post_detail']['requests'], 0)
+        self.assertEqual(summary['actions']['comment']['statuses'].keys(),
+                         {'302'})
+        self.assertTrue(Comment.objects.filter(post=self.post).exists())
+        self.assertFalse(Session.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+
+    def test_replay(self):
+        """Журнал проигрывается целиком, по запросу на строку."""
+        with tempfile.NamedTemporaryFile('w', suffix='.log') as log:
+            log.write(f'/\n/posts/{self.post.pk}/\n/profile/author/\n')
+            log.flush()
+            summary = self.load(replay=log.name, logged_in=0)
+        self.assertEqual(summary['requests'], 3)
+        self.assertEqual(summary['actions']['replay']['statuses'],
+                         {'200': 3})
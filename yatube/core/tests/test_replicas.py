@@ -0,0 +1,113 @@
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import router, transaction
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from posts.models import Comment, Post, User
+
+from .. import fragment_cache, replicas
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTests(SimpleTestCase):
+    databases = {'default'}
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def request(self, user_id, view):
+        """Прогоняет запрос пользователя через middleware; view
+        получает запрос и возвращает то, что нужно проверить."""
+        result = {}
+        request = self.factory.get('/')
+        request.user = User(pk=user_id)
+
+        def get_response(request):
+            result['value'] = view(request)
+            return None
+
+        replicas.ReplicaMiddleware(get_response)(request)
+        return result['value']
+
+    def test_routing(self):
+        """Ленты и комментарии — с реплики, пользователи и сессии —
+        с основной базы, запись и транзакция — тоже."""
+        self.assertEqual(Post.objects.all().db, 'replica1')
+        self.assertEqual(Comment.objects.all().db, 'replica1')
+        self.assertEqual(User.objects.all().db, 'default')
+        self.assertEqual(Session.objects.all().db, 'default')
+        self.assertEqual(router.db_for_write(Post), 'default')
+        with transaction.atomic():
+            self.assertEqual(Post.objects.all().db, 'default')
+
+    def test_read_your_writes(self):
+        """После записи автор читает с основной базы и в этом запросе,
+        и в следующих, пока не истечёт окно; другие — с реплики."""
+        def write(request):
+            before = Post.objects.all().db
+            replicas.ReplicaRouter().db_for_write(Post)
+            return before, Post.objects.all().db
+
+        def read(request):
+            return Post.objects.all().db
+
+        self.assertEqual(self.request(1, write), ('replica1', 'default'))
+        self.assertEqual(self.request(1, read), 'default')
+        self.assertEqual(self.request(2, read), 'replica1')
+        cache.delete(replicas.PIN_KEY.format(1))
+        self.assertEqual(self.request(1, read), 'replica1')
+
+    def test_stale_replica_pages_read_primary(self):
+        """Страница, изменившаяся после снимка реплики, читается
+        с основной базы."""
+        def page(request):
+            replicas.read_fresh(['global'])
+            return Post.objects.all().db
+
+        self.assertEqual(self.request(1, page), 'default')
+        fragment_cache.bump('global')
+        replicas.mark_synced('replica1', time.time())
+        self.assertEqual(self.request(1, page), 'replica1')
+        time.sleep(0.01)
+        fragment_cache.bump('global')
+        self.assertEqual(self.request(1, page), 'default')
+
+    def test_writes_outside_requests_do_not_pin(self):
+        replicas.ReplicaRouter().db_for_write(Post)
+        self.assertEqual(Post.objects.all().db, 'replica1')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        """Без реплик middleware не трогает request.user."""
+        request = self.factory.get('/')
+        replicas.ReplicaMiddleware(lambda request: 'ok')(request)
+        self.assertEqual(Post.objects.all().db, 'default')
+
+
+class CopyDatabaseTests(SimpleTestCase):
+    def test_copy(self):
+        """Копия WAL-базы согласована и хранится в обычном журнале."""
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'db.sqlite3')
+            target = os.path.join(directory, 'replica.sqlite3')
+            connection = sqlite3.connect(source)
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+            connection.executemany(
+                'INSERT INTO item VALUES (?)', ((n,) for n in range(100)))
+            connection.commit()
+            replicas.copy_database(source, target)
+            connection.close()
+            copy = sqlite3.connect(target)
+            self.assertEqual(
+                copy.execute('SELECT count(*) FROM item').fetchone(), (100,))
+            self.assertEqual(
+                copy.execute('PRAGMA journal_mode').fetchone(), ('delete',))
+            copy.close()
+            self.assertFalse(os.path.exists(f'{target}.tmp'))
@@ -0,0 +1,75 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..checks import sqlite_pragmas
+from ..sqlite import check_pragmas
+
+
+class SQLitePragmaTests(TestCase):
+    def test_file_database(self):
+        """Новое подключение к файлу получает WAL и остальные PRAGMA."""
+        with tempfile.TemporaryDirectory() as directory:
+            database = DatabaseWrapper(
+                {**connection.settings_dict,
+                 'NAME': os.path.join(directory, 'db.sqlite3')},
+                alias='file',
+            )
+            try:
+                pragmas, problems = check_pragmas(database)
+            finally:
+                database.close()
+        self.assertEqual(problems, [])
+        self.assertEqual(pragmas['journal_mode'], 'wal')
+        self.assertEqual(pragmas['synchronous'], 1)
+        self.assertEqual(pragmas['mmap_size'], 256 * 1024 * 1024)
+
+    def test_memory_database(self):
+        """В базе тестов в памяти нет WAL, остальное применено."""
+        pragmas, problems = check_pragmas(connection)
+        self.assertEqual(problems, [])
+        self.assertNotIn('journal_mode', pragmas)
+        self.assertEqual(pragmas['busy_timeout'], 5000)
+
+    def test_pragmas_are_not_counted(self):
+        """PRAGMA нового подключения не попадают в счётчик запросов."""
+        with tempfile.TemporaryDirectory() as directory:
+            database = DatabaseWrapper(
+                {**connection.settings_dict,
+                 'NAME': os.path.join(directory, 'db.sqlite3')},
+                alias='file',
+            )
+            database.force_debug_cursor = True
+            try:
+                database.ensure_connection()
+                self.assertEqual(len(database.queries), 0)
+            finally:
+                database.close()
+
+    def test_health(self):
+        """Проверка здоровья отвечает 503 и пишет расхождения."""
+        url = reverse('health')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'ok')
+        with override_settings(SQLITE_PRAGMAS={'busy_timeout': 1}):
+            response = self.client.get(url)
+            self.assertEqual(len(sqlite_pragmas(None)), 1)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['problems'],
+                         ['PRAGMA busy_timeout = 5000, ожидалось 1'])
+
+    def test_benchmark(self):
+        """Замер сравнивает оба режима."""
+        out = StringIO()
+        call_command('bench_sqlite', readers=1, writers=1, duration=0.2,
+                     rows=100, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split()[0] for line in lines[1:]],
+                         ['default', 'production'])
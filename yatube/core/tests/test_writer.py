@@ -0,0 +1,118 @@
+import threading
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from posts.models import Group, User
+
+from ..fragment_cache import bump, get_generations
+from ..instrumentation import QueryStats
+from ..writer import Writer
+
+
+class WriterTests(TransactionTestCase):
+    def setUp(self):
+        self.writer = Writer()
+
+    def submit_all(self, functions):
+        """Отправляет функции из отдельных потоков, пока писатель
+        занят, и возвращает результаты или исключения по порядку."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        blocker = threading.Thread(target=self.writer.submit, args=(block,))
+        blocker.start()
+        started.wait(5)
+        results = [None] * len(functions)
+
+        def run(number, function):
+            try:
+                results[number] = self.writer.submit(function)
+            except Exception as error:
+                results[number] = error
+
+        threads = [threading.Thread(target=run, args=pair)
+                   for pair in enumerate(functions)]
+        for thread in threads:
+            thread.start()
+        while self.writer.queue.qsize() < len(functions):
+            threading.Event().wait(0.01)
+        release.set()
+        for thread in threads + [blocker]:
+            thread.join(5)
+        return results
+
+    def test_group_commit(self):
+        """Записи, накопившиеся за время чужой транзакции, фиксируются
+        одной пачкой, и каждый запрос получает свой результат."""
+        results = self.submit_all([
+            lambda number=number: User.objects.create(
+                username=f'user{number}').username
+            for number in range(5)
+        ])
+        self.assertEqual(results, [f'user{number}' for number in range(5)])
+        self.assertEqual(User.objects.count(), 5)
+        stats = self.writer.stats()
+        self.assertEqual(stats['batches'], 2)
+        self.assertEqual(stats['jobs'], 6)
+        self.assertEqual(stats['mean_batch_size'], 3)
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertEqual(stats['max_queue_depth'], 5)
+
+    def test_failure_is_isolated(self):
+        """Ошибка одной записи откатывает только её и возвращается
+        тому, кто её отправил."""
+        results = self.submit_all([
+            lambda: Group.objects.create(title='Первая', slug='same'),
+            lambda: Group.objects.create(title='Вторая', slug='same'),
+            lambda: Group.objects.create(title='Третья', slug='other'),
+        ])
+        self.assertIsInstance(results[1], IntegrityError)
+        self.assertEqual(
+            sorted(Group.objects.values_list('title', flat=True)),
+            ['Первая', 'Третья'])
+        self.assertEqual(self.writer.stats()['failed'], 1)
+
+    def test_side_effects_after_commit(self):
+        """Поколения кэша меняются после фиксации пачки и только для
+        записей, которые не откатились."""
+        cache.clear()
+        before = get_generations(['kept', 'rolled-back'])
+
+        def failing():
+            bump('rolled-back')
+            raise ValueError
+
+        results = self.submit_all([lambda: bump('kept'), failing])
+        self.assertIsInstance(results[1], ValueError)
+        after = get_generations(['kept', 'rolled-back'])
+        self.assertNotEqual(after[0], before[0])
+        self.assertEqual(after[1], before[1])
+
+    def test_queries_counted_for_caller(self):
+        """Запросы записи попадают в счётчик отправившего запроса."""
+        stats = QueryStats()
+        with transaction.get_connection().execute_wrapper(stats):
+            self.writer.submit(User.objects.create, username='author')
+        self.assertGreaterEqual(stats.count, 1)
+        self.assertIsNot(threading.current_thread(), self.writer.thread)
+        self.assertTrue(User.objects.filter(username='author').exists())
+
+
+class WriterStatsViewTests(TestCase):
+    def test_staff_only(self):
+        """Метрики писателя видны только персоналу."""
+        url = reverse('writer_stats')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        client = Client()
+        client.force_login(User.objects.create_user(
+            username='admin', is_staff=True))
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('commit_ms', response.json())
@@ -1,4 +1,11 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import DatabaseError, connection
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.views.decorators.cache import never_cache
+
+from . import fragment_cache, writer
+from .sqlite import check_pragmas
 
 
 def page_not_found(request, exception):
@@ -7,3 +14,32 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def fragment_cache_stats(request):
+    return JsonResponse(fragment_cache.stats())
+
+
+@staff_member_required
+def writer_stats(request):
+    return JsonResponse(writer.stats())
+
+
+@never_cache
+def health(request):
+    """Проверка для балансировщика: база отвечает и настроена как надо."""
+    try:
+        pragmas, problems = check_pragmas(connection)
+    except DatabaseError as error:
+        pragmas, problems = {}, [str(error)]
+    return JsonResponse(
+        {
+            'status': 'degraded' if problems else 'ok',
+            'database': connection.vendor,
+            'pragmas': pragmas,
+            'problems': problems,
+        },
+        status=503 if problems else 200,
+        json_dumps_params={'ensure_ascii': False},
+    )
@@ -0,0 +1,56 @@
+"""Пулы процессов для фоновой работы внутри веб-воркера.
+
+Модуль нарочно не импортирует моделей: дочерний процесс запускается
+через spawn и сначала выполняет _init_worker, который поднимает Django.
+"""
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_pools = {}
+
+
+def _init_worker(database_name, caches):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    import django
+    django.setup()
+    # Воркер работает с той же базой и тем же файлом кэша, что и
+    # породивший его процесс, даже если их поменяли после загрузки
+    # настроек (так делают тесты).
+    connections['default'].settings_dict['NAME'] = database_name
+    settings.CACHES = caches
+
+
+def process_pool(workers):
+    """Новый пул процессов с настроенным Django."""
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(
+            connections['default'].settings_dict['NAME'], settings.CACHES),
+    )
+
+
+def submit(name, workers, fn, *args, **kwargs):
+    """Отправляет задачу в общий для процесса пул с именем name.
+
+    Сломанный пул (например, воркер упал) пересоздаётся при следующей
+    задаче, а текущая задача теряется с записью в лог.
+    """
+    pool = _pools.get(name)
+    if pool is None:
+        pool = _pools[name] = process_pool(workers)
+    try:
+        return pool.submit(fn, *args, **kwargs)
+    except BrokenProcessPool:
+        logger.exception('Пул процессов %s сломан и будет пересоздан', name)
+        del _pools[name]
+        return None
@@ -0,0 +1,178 @@
+"""Один писатель на процесс с групповой фиксацией.
+
+SQLite пропускает одного писателя за раз, и view, каждая из которых
+открывает свою транзакцию, стоят в очереди на блокировку файла базы
+внутри busy_timeout, а каждая фиксация — отдельный fsync. Поэтому
+записи из view отправляются сюда: submit кладёт функцию в очередь
+и ждёт её результата, а поток-писатель забирает всё, что успело
+накопиться, и выполняет пачку в одной транзакции — одна блокировка
+и одна фиксация на всю пачку. Каждая функция идёт в своей точке
+сохранения, так что ошибка одной откатывает только её, а остальные
+фиксируются. Результат или исключение функции возвращаются в
+ожидающий запрос только после фиксации.
+
+Запросы функции к базе считаются в бюджет и Server-Timing того
+запроса, который её отправил: писатель подключает к своему
+подключению execute_wrapper отправителя. Если отправитель уже внутри
+транзакции (тесты, вложенный вызов) или WRITE_QUEUE выключен, функция
+выполняется на месте. Между процессами писатели по-прежнему
+договариваются через блокировку SQLite и busy_timeout, но
+соревнуются за неё уже пачками, а не отдельными запросами.
+"""
+import os
+import queue
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from . import replicas
+
+# Сколько последних пачек учитывается в перцентилях метрик.
+LATENCY_WINDOW = 1024
+
+
+class Job:
+    __slots__ = ('function', 'args', 'kwargs', 'wrappers', 'future',
+                 'enqueued')
+
+    def __init__(self, function, args, kwargs, wrappers):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.wrappers = wrappers
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+    def run(self, connection):
+        with ExitStack() as stack:
+            for wrapper in self.wrappers:
+                stack.enter_context(connection.execute_wrapper(wrapper))
+            with transaction.atomic():
+                return self.function(*self.args, **self.kwargs)
+
+
+class Writer:
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.pid = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.batches = 0
+        self.jobs = 0
+        self.failed = 0
+        self.max_depth = 0
+        self.commit_latencies = deque(maxlen=LATENCY_WINDOW)
+        self.wait_latencies = deque(maxlen=LATENCY_WINDOW)
+        self.batch_sizes = deque(maxlen=LATENCY_WINDOW)
+
+    def submit(self, function, *args, **kwargs):
+        """Выполняет function в транзакции писателя и возвращает её
+        результат после фиксации."""
+        connection = connections[DEFAULT_DB_ALIAS]
+        if (not settings.WRITE_QUEUE
+                or connection.in_atomic_block
+                or threading.current_thread() is self.thread):
+            with transaction.atomic():
+                return function(*args, **kwargs)
+        self.start()
+        job = Job(function, args, kwargs, list(connection.execute_wrappers))
+        self.queue.put(job)
+        with self.lock:
+            self.max_depth = max(self.max_depth, self.queue.qsize())
+        result = job.future.result(timeout=settings.WRITE_QUEUE_TIMEOUT)
+        # Запись прошла в другом потоке: роутер реплик о ней не знает.
+        replicas.note_write()
+        return result
+
+    def start(self):
+        # После fork потока-писателя в дочернем процессе нет.
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid != os.getpid():
+                self.queue = queue.Queue()
+                self.thread = threading.Thread(
+                    target=self.loop, name='yatube-writer', daemon=True)
+                self.thread.start()
+                self.pid = os.getpid()
+
+    def loop(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < settings.WRITE_QUEUE_MAX_BATCH:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self.commit(batch)
+
+    def commit(self, batch):
+        connection = connections[DEFAULT_DB_ALIAS]
+        started = time.perf_counter()
+        outcomes = []
+        try:
+            with transaction.atomic():
+                for job in batch:
+                    try:
+                        outcomes.append((job.run(connection), None))
+                    except Exception as error:
+                        outcomes.append((None, error))
+        except Exception as error:
+            # Не удалась сама фиксация: не записалось ничего.
+            outcomes = [(None, error)] * len(batch)
+        finally:
+            connection.close_if_unusable_or_obsolete()
+        finished = time.perf_counter()
+        with self.lock:
+            self.batches += 1
+            self.jobs += len(batch)
+            self.failed += sum(error is not None for _, error in outcomes)
+            self.commit_latencies.append(finished - started)
+            self.batch_sizes.append(len(batch))
+            self.wait_latencies.extend(
+                started - job.enqueued for job in batch)
+        for job, (result, error) in zip(batch, outcomes):
+            if error is None:
+                job.future.set_result(result)
+            else:
+                job.future.set_exception(error)
+
+    def stats(self):
+        """Метрики писателя этого процесса; задержки в миллисекундах."""
+        def percentiles(values):
+            values = list(values)
+            if len(values) < 2:
+                value = values[0] * 1000 if values else 0.0
+                return {'p50': round(value, 2), 'p99': round(value, 2)}
+            cuts = statistics.quantiles(values, n=100)
+            return {'p50': round(cuts[49] * 1000, 2),
+                    'p99': round(cuts[98] * 1000, 2)}
+
+        with self.lock:
+            sizes = list(self.batch_sizes)
+            return {
+                'pid': os.getpid(),
+                'queue_depth': self.queue.qsize(),
+                'max_queue_depth': self.max_depth,
+                'batches': self.batches,
+                'jobs': self.jobs,
+                'failed': self.failed,
+                'mean_batch_size': round(
+                    sum(sizes) / len(sizes), 2) if sizes else 0.0,
+                'commit_ms': percentiles(self.commit_latencies),
+                'wait_ms': percentiles(self.wait_latencies),
+            }
+
+
+writer = Writer()
+submit = writer.submit
+stats = writer.stats
@@ -0,0 +1,146 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются атомарным UPDATE ... SET x = x + delta в том же
+транзакционном блоке, что и сама запись. Расхождения, если они всё же
+появились, чинит команда recount_counters.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, F
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def _bump(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def _add_many(model, field, deltas):
+    """Прибавляет к счётчику записей {pk: delta, ...}: по одному UPDATE
+    на каждое различное значение delta."""
+    by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(pk)
+    for delta, pks in by_delta.items():
+        _bump(model.objects.filter(pk__in=pks), field, delta)
+
+
+def ensure_user_stats(user_ids):
+    """Создаёт пересчётом недостающие записи счётчиков пользователей.
+
+    Вызывается до пачечной вставки: пересчёт видит строки без неё, и
+    следующий add_user_stats ничего не посчитает дважды.
+    """
+    user_ids = set(user_ids)
+    user_ids -= set(UserStats.objects.filter(
+        pk__in=user_ids).values_list('pk', flat=True))
+    if user_ids:
+        recount_users(user_ids)
+
+
+def add_user_stats(field, deltas):
+    """Пачечный change_user_stats для {user_id: delta, ...}."""
+    _add_many(UserStats, field, deltas)
+
+
+def add_group_posts(deltas):
+    _add_many(Group, 'posts_count', deltas)
+
+
+def add_post_comments(deltas):
+    _add_many(Post, 'comments_count', deltas)
+
+
+def change_user_stats(user_id, field, delta):
+    if _bump(UserStats.objects.filter(pk=user_id), field, delta):
+        return
+    if delta > 0 and not UserStats.objects.filter(pk=user_id).exists():
+        recount_users([user_id])
+
+
+def change_group_posts(group_id, delta):
+    if group_id is not None:
+        _bump(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def change_post_comments(post_id, delta):
+    _bump(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def stats_for(user):
+    """Счётчики пользователя; недостающая запись создаётся пересчётом."""
+    stats = getattr(user, 'stats', None)
+    if stats is None:
+        recount_users([user.pk])
+        stats = UserStats.objects.get(pk=user.pk)
+    return stats
+
+
+def _count_by(queryset, field):
+    return dict(
+        queryset.order_by().values(field)
+        .annotate(n=Count('pk')).values_list(field, 'n')
+    )
+
+
+def recount_users(user_ids):
+    """Пересчитывает счётчики пользователей, возвращает число исправлений."""
+    user_ids = list(user_ids)
+    actual = {
+        'posts_count': _count_by(
+            Post.objects.filter(author__in=user_ids), 'author'),
+        'followers_count': _count_by(
+            Follow.objects.filter(author__in=user_ids), 'author'),
+        'following_count': _count_by(
+            Follow.objects.filter(user__in=user_ids), 'user'),
+    }
+    existing = UserStats.objects.in_bulk(user_ids)
+    fixed = 0
+    for user_id in user_ids:
+        values = {
+            field: counts.get(user_id, 0)
+            for field, counts in actual.items()
+        }
+        stats = existing.get(user_id)
+        if stats is None:
+            UserStats.objects.create(user_id=user_id, **values)
+            fixed += 1
+            continue
+        if any(getattr(stats, field) != value
+               for field, value in values.items()):
+            UserStats.objects.filter(pk=user_id).update(**values)
+            fixed += 1
+    return fixed
+
+
+def _recount_column(model, ids, field, related, related_field):
+    counts = _count_by(
+        related.objects.filter(**{f'{related_field}__in': ids}),
+        related_field,
+    )
+    fixed = 0
+    for pk, value in model.objects.filter(
+        pk__in=ids
+    ).values_list('pk', field):
+        if value != counts.get(pk, 0):
+            model.objects.filter(pk=pk).update(**{field: counts.get(pk, 0)})
+            fixed += 1
+    return fixed
+
+
+def recount_groups(group_ids):
+    return _recount_column(Group, group_ids, 'posts_count', Post, 'group')
+
+
+def recount_posts(post_ids):
+    return _recount_column(Post, post_ids, 'comments_count', Comment, 'post')
+
+
+RECOUNTERS = (
+    (User, recount_users),
+    (Group, recount_groups),
+    (Post, recount_posts),
+)
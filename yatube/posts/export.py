@@ -0,0 +1,112 @@
+"""Потоковая выгрузка постов и комментариев в JSONL или CSV.
+
+Строки читаются пачками по первичному ключу (WHERE id > последний
+ORDER BY id LIMIT n), поэтому память не растёт с размером таблицы, а
+каждый запрос идёт по индексу. Колонки совпадают с форматом
+import_content, выгрузку можно загрузить обратно.
+"""
+import csv
+import json
+import zlib
+
+from .models import Comment, Post
+
+CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+
+COLUMNS = {
+    'posts': (Post, {
+        'id': 'id',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'text': 'text',
+        'image': 'image',
+        'pub_date': 'pub_date',
+        'comments_count': 'comments_count',
+    }),
+    'comments': (Comment, {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    }),
+}
+KINDS = tuple(COLUMNS)
+FORMATS = ('jsonl', 'csv')
+
+
+def iter_rows(kind, chunk_size=CHUNK_SIZE):
+    """Строки таблицы словарями, пачками по chunk_size."""
+    model, columns = COLUMNS[kind]
+    names = tuple(columns)
+    last_pk = 0
+    while True:
+        chunk = list(
+            model.objects.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values_list(*columns.values())[:chunk_size]
+        )
+        for values in chunk:
+            row = dict(zip(names, values))
+            for name, value in row.items():
+                if hasattr(value, 'isoformat'):
+                    row[name] = value.isoformat()
+            yield row
+        if len(chunk) < chunk_size:
+            return
+        last_pk = chunk[-1][0]
+
+
+class _Line:
+    """Буфер для csv.writer, который просто возвращает записанное."""
+
+    def write(self, value):
+        return value
+
+
+def encode(rows, kind, file_format):
+    """Строки в текст выбранного формата, по строке за раз."""
+    if file_format == 'jsonl':
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + '\n'
+        return
+    writer = csv.writer(_Line())
+    yield writer.writerow(COLUMNS[kind][1])
+    for row in rows:
+        yield writer.writerow(row.values())
+
+
+def buffered(lines, size=BUFFER_SIZE):
+    """Склеивает строки в куски байтов примерно по size символов."""
+    buffer = []
+    length = 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(buffer).encode()
+            buffer = []
+            length = 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def compress(chunks, level=6):
+    """Сжимает поток байтов в gzip на лету."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(kind, file_format='jsonl', gzip=False,
+                  chunk_size=CHUNK_SIZE):
+    """Выгрузка таблицы kind потоком байтов."""
+    stream = buffered(
+        encode(iter_rows(kind, chunk_size), kind, file_format))
+    if gzip:
+        return compress(stream)
+    return stream
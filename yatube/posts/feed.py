@@ -0,0 +1,221 @@
+"""Материализованная лента подписок (fan-out on write).
+
+При публикации поста он раскладывается в ленты всех подписчиков автора,
+при подписке лента дозаполняется постами автора, при отписке — чистится.
+Авторы, у которых подписчиков больше FEED_FANOUT_MAX_FOLLOWERS, в ленты
+не раскладываются: их посты подтягиваются при чтении. Число подписчиков
+берётся из UserStats. Когда автор пересекает порог, ленты приводятся
+в порядок: при подписке его посты убираются из лент, при отписке
+раскладываются по лентам всех оставшихся подписчиков.
+
+Число запросов раскладки растёт с числом подписчиков и постов, поэтому
+они не входят в бюджет запросов view (core.instrumentation).
+"""
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+
+from core.instrumentation import unbudgeted
+
+from . import follow_graph
+from .models import FeedItem, Follow, Post, UserStats
+
+BATCH_SIZE = 1000
+# Колонки курсорной пагинации ленты: по записям ленты или по самим постам.
+FEED_ITEMS_CURSOR = {'field': 'feed_items__pub_date',
+                     'key': 'feed_items__post__id'}
+POSTS_CURSOR = {'field': 'pub_date', 'key': 'pk'}
+
+
+def _bulk_insert(items):
+    """Вставляет записи ленты пачками, не собирая их все в памяти."""
+    items = iter(items)
+    batch = list(islice(items, BATCH_SIZE))
+    while batch:
+        FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(items, BATCH_SIZE))
+
+
+def followers_count(author):
+    """Число подписчиков из денормализованного счётчика."""
+    return UserStats.objects.filter(pk=author).values_list(
+        'followers_count', flat=True).first() or 0
+
+
+def is_celebrity(author):
+    """Автор слишком популярен для раскладки постов по лентам."""
+    return followers_count(author) > settings.FEED_FANOUT_MAX_FOLLOWERS
+
+
+def _crossed(before, after):
+    """Число подписчиков перешло порог раскладки снизу вверх."""
+    return before <= settings.FEED_FANOUT_MAX_FOLLOWERS < after
+
+
+def _celebrities(authors):
+    """Подзапрос: те из authors, чьи посты подтягиваются при чтении."""
+    return UserStats.objects.filter(
+        user__in=authors,
+        followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+    ).values('user')
+
+
+def celebrities_followed_by(user):
+    graph = follow_graph.current()
+    if graph is not None:
+        return [
+            author_id for author_id in graph.followed(user.pk)
+            if graph.followers_count(author_id)
+            > settings.FEED_FANOUT_MAX_FOLLOWERS
+        ]
+    return Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+    ).values_list('author', flat=True)
+
+
+@unbudgeted()
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author=post.author_id
+    ).values_list('user', flat=True)
+    _bulk_insert(
+        FeedItem(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+@unbudgeted()
+def fan_out_posts(posts):
+    """Раскладывает пачку новых постов [(id, author_id, pub_date), ...]
+    по лентам."""
+    by_author = defaultdict(list)
+    for post_id, author_id, pub_date in posts:
+        by_author[author_id].append((post_id, pub_date))
+    followers = Follow.objects.filter(
+        author__in=list(by_author)
+    ).exclude(
+        author__in=_celebrities(list(by_author))
+    ).values_list('author', 'user')
+    _bulk_insert(
+        FeedItem(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for author_id, user_id in followers.iterator()
+        for post_id, pub_date in by_author[author_id]
+    )
+
+
+@unbudgeted()
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика уже опубликованные посты автора.
+
+    Если эта подписка сделала автора популярным, его посты убираются из
+    всех лент: теперь они подтягиваются при чтении.
+    """
+    followers = followers_count(author_id)
+    if _crossed(followers - 1, followers):
+        FeedItem.objects.filter(post__author=author_id).delete()
+    if followers > settings.FEED_FANOUT_MAX_FOLLOWERS:
+        return
+    posts = Post.objects.filter(
+        author=author_id
+    ).values_list('pk', 'pub_date')
+    _bulk_insert(
+        FeedItem(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+@unbudgeted()
+def followers_added(deltas):
+    """Убирает из лент посты авторов, которых пачка подписок
+    {author_id: прирост} сделала популярными.
+
+    Вызывается после обновления счётчиков: прирост за пачку может
+    перескочить порог, поэтому сравнивается число до и после.
+    """
+    counts = UserStats.objects.filter(
+        user__in=list(deltas),
+        followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+    ).values_list('user', 'followers_count')
+    crossed = [
+        author_id for author_id, followers in counts
+        if _crossed(followers - deltas[author_id], followers)
+    ]
+    if crossed:
+        FeedItem.objects.filter(post__author__in=crossed).delete()
+
+
+@unbudgeted()
+def backfill_pairs(pairs):
+    """Дозаполняет ленты пачкой новых подписок [(user_id, author_id), ...]
+    одним запросом к постам вместо трёх запросов на подписку."""
+    by_author = defaultdict(list)
+    for user_id, author_id in pairs:
+        by_author[author_id].append(user_id)
+    posts = Post.objects.filter(
+        author__in=list(by_author)
+    ).exclude(
+        author__in=_celebrities(list(by_author))
+    ).values_list('author', 'pk', 'pub_date')
+    _bulk_insert(
+        FeedItem(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for author_id, post_id, pub_date in posts.iterator()
+        for user_id in by_author[author_id]
+    )
+
+
+@unbudgeted()
+def backfill_followers(author_id):
+    """Раскладывает все посты автора по лентам всех его подписчиков."""
+    followers = list(Follow.objects.filter(
+        author=author_id
+    ).values_list('user', flat=True))
+    posts = Post.objects.filter(
+        author=author_id
+    ).values_list('pk', 'pub_date')
+    _bulk_insert(
+        FeedItem(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts.iterator()
+        for user_id in followers
+    )
+
+
+@unbudgeted()
+def trim(user, author):
+    """Убирает из ленты подписчика посты автора после отписки.
+
+    Если отписка опустила число подписчиков автора до порога, его посты
+    больше не подтягиваются при чтении, и ленты остальных подписчиков
+    дозаполняются.
+    """
+    FeedItem.objects.filter(user=user, post__author=author).delete()
+    followers = followers_count(author)
+    if _crossed(followers, followers + 1):
+        backfill_followers(author)
+
+
+def feed_posts(user):
+    """Посты ленты подписок пользователя.
+
+    Без популярных авторов лента упорядочена по колонкам записей ленты,
+    и страница читается одним проходом по индексу (user, -pub_date,
+    -post). С популярными авторами к записям ленты добавляются их посты,
+    и порядок берётся из самих постов.
+
+    Возвращает queryset и колонки курсора для пагинации по ключу.
+    """
+    celebrities = list(celebrities_followed_by(user))
+    if not celebrities:
+        posts = Post.objects.filter(feed_items__user=user).order_by(
+            '-feed_items__pub_date', '-feed_items__post__id')
+        return posts, FEED_ITEMS_CURSOR
+    posts = Post.objects.filter(
+        Q(pk__in=FeedItem.objects.filter(user=user).values('post'))
+        | Q(author__in=celebrities)
+    )
+    return posts, POSTS_CURSOR
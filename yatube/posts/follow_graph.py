@@ -0,0 +1,341 @@
+"""Граф подписок в памяти процесса.
+
+Таблица posts_follow загружается в два CSR-массива: для каждого
+пользователя — отрезок отсортированных id тех, на кого он подписан, и
+отрезок тех, кто подписан на него. Смещения и id — array('I'), 4 байта
+на число, так что 10 млн подписок занимают около 80 МБ на оба
+направления. Число подписок и подписчиков — разность двух смещений,
+проверка подписки — двоичный поиск в отрезке.
+
+CSR не меняется после загрузки: подписки и отписки ложатся поверх него
+множествами added/removed по пользователям. Когда таких изменений
+набирается больше десятой части графа, он перечитывается из базы.
+
+Изменения применяются после фиксации транзакции и пишутся в общий кэш
+журналом с номерами, так что остальные процессы догоняют граф,
+читая из кэша только недостающие записи. Применение идемпотентно:
+повтор записи журнала ничего не портит. Если записи журнала
+пропали из кэша, граф перечитывается целиком.
+
+Граф загружается в фоне при первом обращении. Пока он не готов, и
+внутри транзакции, которая может видеть свои же незафиксированные
+подписки, current() возвращает None, и вызывающий код идёт в SQL.
+"""
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from itertools import accumulate, chain
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .models import Follow, User
+
+TYPECODE = 'I'
+SEQ_KEY = 'follow-graph:seq'
+DELTA_KEY = 'follow-graph:delta:{}'
+# Сколько живут записи журнала в кэше.
+DELTA_TIMEOUT = 60 * 60
+# Сколько ждать пропущенную запись журнала, прежде чем перечитать граф:
+# номер уже выдан, а саму запись другой процесс ещё не положил.
+GAP_SECONDS = 5
+# Доля изменений поверх CSR, после которой граф перечитывается.
+COMPACT_RATIO = 0.1
+COMPACT_MIN = 10000
+# Сколько ждать перед новой попыткой, если граф не загрузился.
+RETRY_SECONDS = 60
+FOLLOW = 1
+UNFOLLOW = 0
+# Запись журнала «перечитать граф» — после массового импорта подписок.
+RELOAD = 2
+
+
+def _offsets(sources, size):
+    """Смещения CSR по отсортированным id начал рёбер."""
+    counts = Counter(sources)
+    return array(TYPECODE, accumulate(
+        (counts.get(node, 0) for node in range(size)), initial=0))
+
+
+def _transpose(offsets, targets, size):
+    """Обратное направление: CSR тех, кто ссылается на каждую вершину."""
+    in_offsets = _offsets(targets, size)
+    position = array(TYPECODE, in_offsets)
+    sources = array(TYPECODE, bytes(len(targets) * position.itemsize))
+    for source in range(size):
+        for index in range(offsets[source], offsets[source + 1]):
+            target = targets[index]
+            sources[position[target]] = source
+            position[target] += 1
+    return in_offsets, sources
+
+
+class Adjacency:
+    """Одно направление графа: CSR и изменения поверх него."""
+
+    def __init__(self, offsets, targets, lock=None):
+        self.offsets = offsets
+        self.targets = targets
+        self.added = defaultdict(set)
+        self.removed = defaultdict(set)
+        # Под ней меняются added/removed и копируются для обхода.
+        self.lock = lock or threading.Lock()
+
+    def _base(self, node):
+        if node + 1 >= len(self.offsets):
+            return 0, 0
+        return self.offsets[node], self.offsets[node + 1]
+
+    def _in_base(self, node, other):
+        start, end = self._base(node)
+        position = bisect_left(self.targets, other, start, end)
+        return position < end and self.targets[position] == other
+
+    def degree(self, node):
+        start, end = self._base(node)
+        return (end - start + len(self.added.get(node, ()))
+                - len(self.removed.get(node, ())))
+
+    def contains(self, node, other):
+        if other in self.added.get(node, ()):
+            return True
+        return (other not in self.removed.get(node, ())
+                and self._in_base(node, other))
+
+    def neighbours(self, node):
+        """Соседи вершины. Изменения поверх CSR копируются под
+        блокировкой: журнал может применяться во время обхода."""
+        start, end = self._base(node)
+        with self.lock:
+            added = tuple(self.added.get(node, ()))
+            removed = frozenset(self.removed.get(node, ()))
+        base = self.targets[start:end]
+        if removed:
+            base = (other for other in base if other not in removed)
+        return chain(base, added)
+
+    def add(self, node, other):
+        """Возвращает, изменилось ли что-нибудь."""
+        if self._in_base(node, other):
+            if other not in self.removed.get(node, ()):
+                return False
+            self.removed[node].discard(other)
+            return True
+        if other in self.added.get(node, ()):
+            return False
+        self.added[node].add(other)
+        return True
+
+    def remove(self, node, other):
+        if self._in_base(node, other):
+            if other in self.removed.get(node, ()):
+                return False
+            self.removed[node].add(other)
+            return True
+        if other not in self.added.get(node, ()):
+            return False
+        self.added[node].discard(other)
+        return True
+
+    def nbytes(self):
+        return (self.offsets.itemsize * len(self.offsets)
+                + self.targets.itemsize * len(self.targets))
+
+
+class FollowGraph:
+    def __init__(self, users, authors, size):
+        """users и authors — параллельные массивы подписок,
+        отсортированных по (user, author); size — больше любого id."""
+        out_offsets = _offsets(users, size)
+        self.lock = threading.Lock()
+        self.following = Adjacency(out_offsets, authors, self.lock)
+        self.followers = Adjacency(
+            *_transpose(out_offsets, authors, size), self.lock)
+        self.edges = len(authors)
+        self.changes = 0
+
+    def following_count(self, user_id):
+        return self.following.degree(user_id)
+
+    def followers_count(self, user_id):
+        return self.followers.degree(user_id)
+
+    def followed(self, user_id):
+        """id авторов, на которых подписан user_id."""
+        return self.following.neighbours(user_id)
+
+    def followers_of(self, user_id):
+        return self.followers.neighbours(user_id)
+
+    def is_following(self, user_id, author_id):
+        return self.following.contains(user_id, author_id)
+
+    def apply(self, operation, user_id, author_id):
+        with self.lock:
+            if operation == FOLLOW:
+                changed = self.following.add(user_id, author_id)
+                self.followers.add(author_id, user_id)
+                self.edges += changed
+            else:
+                changed = self.following.remove(user_id, author_id)
+                self.followers.remove(author_id, user_id)
+                self.edges -= changed
+            self.changes += changed
+
+    def needs_compaction(self):
+        return self.changes > max(COMPACT_MIN, self.edges * COMPACT_RATIO)
+
+    def nbytes(self):
+        return self.following.nbytes() + self.followers.nbytes()
+
+    @classmethod
+    def from_database(cls, using=DEFAULT_DB_ALIAS):
+        size = (User.objects.using(using).order_by('-pk').values_list(
+            'pk', flat=True).first() or 0) + 1
+        users = array(TYPECODE)
+        authors = array(TYPECODE)
+        rows = Follow.objects.using(using).order_by(
+            'user_id', 'author_id').values_list('user_id', 'author_id')
+        for user_id, author_id in rows.iterator(chunk_size=10000):
+            users.append(user_id)
+            authors.append(author_id)
+        return cls(users, authors, size)
+
+
+class _Service:
+    """Граф процесса, его номер в журнале и фоновая загрузка."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.graph = None
+        self.seq = 0
+        self.loading = False
+        self.gap_since = None
+        self.retry_at = 0
+
+    def load(self):
+        """Читает граф из базы; номер журнала берётся до чтения, так что
+        изменения, попавшие и в граф, и в журнал, просто повторятся."""
+        seq = _current_seq()
+        graph = FollowGraph.from_database()
+        with self.lock:
+            self.graph, self.seq, self.gap_since = graph, seq, None
+            self.loading = False
+        return graph
+
+    def load_in_background(self):
+        with self.lock:
+            if self.loading or time.monotonic() < self.retry_at:
+                return
+            self.loading = True
+
+        def run():
+            try:
+                self.load()
+            except Exception:
+                self.retry_at = time.monotonic() + RETRY_SECONDS
+                raise
+            finally:
+                self.loading = False
+                connections.close_all()
+
+        threading.Thread(
+            target=run, name='follow-graph', daemon=True).start()
+
+    def sync(self):
+        latest = _current_seq()
+        if latest == self.seq:
+            return
+        if latest < self.seq:
+            # Кэш очищали: журналу больше нельзя верить.
+            self.load_in_background()
+            return
+        numbers = range(self.seq + 1, latest + 1)
+        deltas = cache.get_many([DELTA_KEY.format(n) for n in numbers])
+        with self.lock:
+            for number in numbers:
+                if number <= self.seq:
+                    # Эти записи уже применил другой поток.
+                    continue
+                delta = deltas.get(DELTA_KEY.format(number))
+                if delta is None:
+                    self._gap()
+                    return
+                if delta[0] == RELOAD:
+                    self.load_in_background()
+                    return
+                self.graph.apply(*delta)
+                self.seq = number
+                self.gap_since = None
+        if self.graph.needs_compaction():
+            self.load_in_background()
+
+    def _gap(self):
+        now = time.monotonic()
+        if self.gap_since is None:
+            self.gap_since = now
+        elif now - self.gap_since > GAP_SECONDS:
+            self.load_in_background()
+
+    def current(self):
+        if (not settings.FOLLOW_GRAPH
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return None
+        if self.graph is None:
+            self.load_in_background()
+            return None
+        self.sync()
+        return self.graph
+
+    def apply(self, operation, user_id, author_id):
+        if self.graph is not None:
+            with self.lock:
+                self.graph.apply(operation, user_id, author_id)
+
+
+_service = _Service()
+current = _service.current
+load = _service.load
+
+
+def _current_seq():
+    seq = cache.get(SEQ_KEY)
+    if seq is None:
+        cache.add(SEQ_KEY, 0, None)
+        seq = cache.get(SEQ_KEY, 0)
+    return seq
+
+
+def _publish(deltas):
+    try:
+        last = cache.incr(SEQ_KEY, len(deltas))
+    except ValueError:
+        cache.add(SEQ_KEY, 0, None)
+        last = cache.incr(SEQ_KEY, len(deltas))
+    first = last - len(deltas) + 1
+    cache.set_many({
+        DELTA_KEY.format(number): delta
+        for number, delta in enumerate(deltas, start=first)
+    }, DELTA_TIMEOUT)
+    for delta in deltas:
+        if delta[0] != RELOAD:
+            _service.apply(*delta)
+
+
+def record(operation, user_id, author_id):
+    """Подписка или отписка: в граф процесса и в журнал после фиксации."""
+    record_many(operation, [(user_id, author_id)])
+
+
+def record_many(operation, pairs):
+    """Пачка подписок или отписок; большая пачка перечитывает граф."""
+    if len(pairs) > COMPACT_MIN:
+        deltas = [(RELOAD,)]
+    else:
+        deltas = [(operation, user_id, author_id)
+                  for user_id, author_id in pairs]
+    if deltas:
+        transaction.on_commit(lambda: _publish(deltas))
@@ -0,0 +1,261 @@
+"""Массовая загрузка постов, комментариев и подписок.
+
+Строки вставляются через bulk_create, поэтому сигналы моделей не
+срабатывают. Всё, что они делают при обычном сохранении (счётчики,
+ленты подписок, поисковый индекс, миниатюры, поколения кэша), импорт
+повторяет сам, пачкой на каждый фрагмент, в той же транзакции.
+"""
+import csv
+import json
+from collections import Counter
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.fragment_cache import bump, scope
+
+from . import (counters, feed, follow_graph, following, search, suggestions,
+               thumbnails)
+from .models import Comment, Follow, Group, Post, User
+
+KINDS = ('posts', 'comments', 'follows')
+
+
+class ContentImportError(Exception):
+    pass
+
+
+def read_rows(path, file_format):
+    """Построчно читает JSONL или CSV, не загружая файл целиком."""
+    with open(path, encoding='utf-8', newline='') as file:
+        if file_format == 'csv':
+            yield from csv.DictReader(file)
+            return
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                raise ContentImportError(f'Строка {number}: {error}')
+
+
+def parse_date(value):
+    """Дата из ISO-строки; без часового пояса считается текущим."""
+    if not value:
+        return timezone.now()
+    date = parse_datetime(value)
+    if date is None:
+        raise ContentImportError(f'Неверная дата: {value}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def parse_id(value):
+    """Положительный id из строки файла или None."""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+@contextmanager
+def relaxed_durability():
+    """Отключает fsync SQLite на время загрузки.
+
+    Сбой питания во время импорта может испортить базу, поэтому режим
+    включается только явно и только для SQLite. Внутри транзакции
+    SQLite не меняет synchronous, и тогда всё остаётся как было.
+    """
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA synchronous')
+        synchronous = cursor.fetchone()[0]
+        cursor.execute('PRAGMA cache_size')
+        cache_size = cursor.fetchone()[0]
+        cursor.execute('PRAGMA synchronous = OFF')
+        cursor.execute('PRAGMA cache_size = -262144')
+        cursor.execute('PRAGMA temp_store = MEMORY')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA synchronous = {int(synchronous)}')
+            cursor.execute(f'PRAGMA cache_size = {int(cache_size)}')
+
+
+@contextmanager
+def keep_dates(*fields):
+    """Не даёт auto_now_add затереть даты из файла при bulk_create."""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now_add in saved:
+            field.auto_now_add = auto_now_add
+
+
+class Lookup:
+    """Словарь ключ → id, целиком в памяти.
+
+    Загружается одним запросом; недостающие записи создаются пачкой,
+    если передан create, иначе строки с ними пропускаются.
+    """
+
+    def __init__(self, model, field, create=None):
+        self.model = model
+        self.field = field
+        self.create = create
+        self.ids = dict(model.objects.values_list(field, 'pk').iterator())
+
+    def resolve(self, keys):
+        missing = {key for key in keys if key and key not in self.ids}
+        if not missing or self.create is None:
+            return
+        self.model.objects.bulk_create(
+            [self.create(key) for key in missing], ignore_conflicts=True)
+        self.ids.update(self.model.objects.filter(
+            **{f'{self.field}__in': missing}
+        ).values_list(self.field, 'pk'))
+
+    def get(self, key):
+        return self.ids.get(key)
+
+
+class Importer:
+    """Загружает фрагменты строк одного вида; каждый — одна транзакция."""
+
+    def __init__(self, kind, create_missing=False, batch_size=None):
+        if kind not in KINDS:
+            raise ContentImportError(f'Неизвестный вид данных: {kind}')
+        self.kind = kind
+        self.batch_size = batch_size
+        self.users = Lookup(
+            User, 'username',
+            (lambda username: User(
+                username=username, password=make_password(None)))
+            if create_missing else None,
+        )
+        if kind == 'posts':
+            self.groups = Lookup(
+                Group, 'slug',
+                (lambda slug: Group(slug=slug, title=slug, description=''))
+                if create_missing else None,
+            )
+
+    def import_chunk(self, rows):
+        """Вставляет фрагмент, возвращает (загружено, пропущено)."""
+        with transaction.atomic():
+            self.users.resolve(
+                row.get(key) for row in rows for key in ('author', 'user'))
+            return getattr(self, f'_import_{self.kind}')(rows)
+
+    def _import_posts(self, rows):
+        self.groups.resolve(row.get('group') for row in rows)
+        posts = []
+        for row in rows:
+            author_id = self.users.get(row.get('author'))
+            group_id = self.groups.get(row.get('group') or None)
+            if author_id is None or (row.get('group') and group_id is None):
+                continue
+            posts.append(Post(
+                pk=row.get('id') or None,
+                author_id=author_id,
+                group_id=group_id,
+                text=row.get('text', ''),
+                image=row.get('image') or '',
+                pub_date=parse_date(row.get('pub_date')),
+            ))
+        counters.ensure_user_stats(post.author_id for post in posts)
+        last_pk = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+        with keep_dates(Post._meta.get_field('pub_date')):
+            Post.objects.bulk_create(posts, batch_size=self.batch_size)
+        # SQLite не возвращает id из bulk_create: новые посты — это
+        # заданные в файле id и всё, что появилось после last_pk.
+        new = Post.objects.filter(
+            pk__gt=last_pk
+        ) | Post.objects.filter(pk__in=[post.pk for post in posts if post.pk])
+        new = list(new.values_list('pk', 'author_id', 'group_id', 'text',
+                                   'image', 'pub_date'))
+        authors = Counter(author_id for _, author_id, *_ in new)
+        groups = Counter(group_id for _, _, group_id, *_ in new if group_id)
+        counters.add_user_stats('posts_count', authors)
+        counters.add_group_posts(groups)
+        feed.fan_out_posts(
+            (pk, author_id, pub_date) for pk, author_id, *_, pub_date in new)
+        search.index_posts([(pk, text) for pk, _, _, text, *_ in new])
+        images = [pk for pk, *_, image, _ in new if image]
+        if images:
+            transaction.on_commit(lambda: thumbnails.schedule(images))
+        bump(
+            scope('global'),
+            *(scope('author', author_id) for author_id in authors),
+            *(scope('group', group_id) for group_id in groups),
+        )
+        return len(posts), len(rows) - len(posts)
+
+    def _import_comments(self, rows):
+        requested = [parse_id(row.get('post')) for row in rows]
+        post_ids = set(Post.objects.filter(
+            pk__in={post_id for post_id in requested if post_id}
+        ).values_list('pk', flat=True))
+        comments = []
+        for row, post_id in zip(rows, requested):
+            author_id = self.users.get(row.get('author'))
+            if author_id is None or post_id not in post_ids:
+                continue
+            comments.append(Comment(
+                post_id=post_id,
+                author_id=author_id,
+                text=row.get('text', ''),
+                created=parse_date(row.get('created')),
+            ))
+        with keep_dates(Comment._meta.get_field('created')):
+            Comment.objects.bulk_create(comments, batch_size=self.batch_size)
+        touched = Counter(comment.post_id for comment in comments)
+        counters.add_post_comments(touched)
+        bump(*(scope('post', post_id) for post_id in touched))
+        return len(comments), len(rows) - len(comments)
+
+    def _import_follows(self, rows):
+        pairs = set()
+        for row in rows:
+            user_id = self.users.get(row.get('user'))
+            author_id = self.users.get(row.get('author'))
+            if user_id is not None and author_id not in (None, user_id):
+                pairs.add((user_id, author_id))
+        loaded = len(pairs)
+        # Уже существующие подписки не меняют ни счётчики, ни ленты.
+        pairs -= set(Follow.objects.filter(
+            user__in={user_id for user_id, _ in pairs},
+            author__in={author_id for _, author_id in pairs},
+        ).values_list('user', 'author'))
+        counters.ensure_user_stats(
+            user_id for pair in pairs for user_id in pair)
+        Follow.objects.bulk_create(
+            [Follow(user_id=user_id, author_id=author_id)
+             for user_id, author_id in pairs],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        counters.add_user_stats(
+            'following_count', Counter(user_id for user_id, _ in pairs))
+        followers = Counter(author_id for _, author_id in pairs)
+        counters.add_user_stats('followers_count', followers)
+        feed.followers_added(followers)
+        feed.backfill_pairs(pairs)
+        following.invalidate(*{user_id for user_id, _ in pairs})
+        follow_graph.record_many(follow_graph.FOLLOW, list(pairs))
+        suggestions.mark_changed(*{user_id for user_id, _ in pairs})
+        bump(*(scope('follows', user_id) for user_id, _ in pairs))
+        return loaded, len(rows) - loaded
@@ -0,0 +1,110 @@
+import random
+import time
+from array import array
+from itertools import accumulate
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from posts import feed
+from posts.follow_graph import TYPECODE, FollowGraph
+from posts.models import User
+
+
+def synthetic_edges(users, edges, skew, seed):
+    """Подписки с распределением Ципфа по авторам, отсортированные
+    по (user, author), как их отдаёт база."""
+    rng = random.Random(seed)
+    weights = list(accumulate(
+        1 / rank ** skew for rank in range(1, users + 1)))
+    ranks = list(range(users))
+    rng.shuffle(ranks)
+    sources = array(TYPECODE)
+    targets = array(TYPECODE)
+    mean = edges / users
+    for user_id in range(users):
+        count = min(round(rng.expovariate(1 / mean)), users - 1)
+        authors = set()
+        while len(authors) < count:
+            authors.update(ranks[rank] for rank in rng.choices(
+                range(users), cum_weights=weights, k=count - len(authors)))
+            authors.discard(user_id)
+        authors = sorted(authors)
+        sources.extend([user_id] * len(authors))
+        targets.extend(authors)
+    return sources, targets
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет граф подписок в памяти: загрузку, память, число '
+        'подписчиков, проверку подписки и обход соседей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000000)
+        parser.add_argument('--edges', type=int, default=10000000)
+        parser.add_argument('--skew', type=float, default=1.1)
+        parser.add_argument('--queries', type=int, default=1000000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--from-db', action='store_true',
+            help='Граф из текущей базы и сравнение ленты с SQL.')
+
+    def handle(self, *args, users, edges, skew, queries, seed, from_db,
+               **options):
+        started = time.perf_counter()
+        if from_db:
+            graph = FollowGraph.from_database()
+            users = len(graph.following.offsets) - 1
+            self.report('загрузка из базы', time.perf_counter() - started)
+        else:
+            sources, targets = synthetic_edges(users, edges, skew, seed)
+            self.report('генерация', time.perf_counter() - started)
+            started = time.perf_counter()
+            graph = FollowGraph(sources, targets, users)
+            del sources
+            self.report('сборка CSR', time.perf_counter() - started)
+        self.stdout.write(
+            f'подписок: {graph.edges}, пользователей: {users}, '
+            f'массивы: {graph.nbytes() / 2 ** 20:.1f} МБ')
+
+        rng = random.Random(seed)
+        sample = [rng.randrange(users) for _ in range(queries)]
+        self.measure('число подписчиков и подписок', queries, lambda: [
+            graph.followers_count(user_id) + graph.following_count(user_id)
+            for user_id in sample])
+        self.measure('проверка подписки', queries, lambda: [
+            graph.is_following(user_id, author_id)
+            for user_id, author_id in zip(sample, reversed(sample))])
+        popular = sorted(
+            range(users), key=graph.followers_count, reverse=True)[:100]
+        total = sum(graph.followers_count(user_id) for user_id in popular)
+        self.measure('обход подписчиков 100 популярных', total, lambda: [
+            sum(1 for _ in graph.followers_of(user_id))
+            for user_id in popular])
+        readers = sample[:10000]
+        threshold = settings.FEED_FANOUT_MAX_FOLLOWERS
+        self.measure('популярные авторы в ленте', len(readers), lambda: [
+            [author_id for author_id in graph.followed(user_id)
+             if graph.followers_count(author_id) > threshold]
+            for user_id in readers])
+        if from_db:
+            readers = list(User.objects.order_by('?').values_list(
+                'pk', flat=True)[:200])
+            with override_settings(FOLLOW_GRAPH=False):
+                self.measure('то же через SQL', len(readers), lambda: [
+                    list(feed.celebrities_followed_by(User(pk=user_id)))
+                    for user_id in readers])
+
+    def report(self, name, seconds):
+        self.stdout.write(f'{name}: {seconds:.2f} с')
+
+    def measure(self, name, operations, function):
+        started = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - started
+        self.stdout.write(
+            f'{name}: {operations / seconds:,.0f} в секунду, '
+            f'{seconds / operations * 1e6:.2f} мкс')
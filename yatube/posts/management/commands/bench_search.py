@@ -0,0 +1,88 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from faker import Faker
+
+from posts.search import CREATE_FTS_TABLE, FTS_TABLE, match_expression
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск LIKE и FTS5 на синтетической таблице постов '
+        'во временной базе SQLite.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--queries', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, posts, queries, seed, **options):
+        random.seed(seed)
+        fake = Faker('ru_RU')
+        fake.seed_instance(seed)
+        vocabulary = list({fake.word() for _ in range(20000)})
+        with tempfile.TemporaryDirectory() as directory:
+            connection = sqlite3.connect(
+                os.path.join(directory, 'bench.sqlite3'))
+            connection.execute(
+                'CREATE TABLE posts_post (id INTEGER PRIMARY KEY, text TEXT)')
+            connection.execute(CREATE_FTS_TABLE)
+            started = time.perf_counter()
+            batch = []
+            for pk in range(1, posts + 1):
+                text = ' '.join(random.choices(
+                    vocabulary, k=random.randint(5, 60)))
+                batch.append((pk, text))
+                if len(batch) == 10000 or pk == posts:
+                    connection.executemany(
+                        'INSERT INTO posts_post VALUES (?, ?)', batch)
+                    connection.executemany(
+                        f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                        f'VALUES (?, ?)',
+                        batch,
+                    )
+                    connection.commit()
+                    batch = []
+            self.stdout.write(
+                f'Постов: {posts}, заполнение: '
+                f'{time.perf_counter() - started:.1f} с'
+            )
+            words = random.sample(vocabulary, queries)
+            cases = (
+                ('LIKE, число совпадений',
+                 'SELECT count(*) FROM posts_post WHERE text LIKE ?',
+                 lambda word: f'%{word}%'),
+                ('FTS5, число совпадений',
+                 f'SELECT count(*) FROM {FTS_TABLE} '
+                 f'WHERE {FTS_TABLE} MATCH ?',
+                 match_expression),
+                ('LIKE, первые 10 новых',
+                 'SELECT id FROM posts_post WHERE text LIKE ? '
+                 'ORDER BY id DESC LIMIT 10',
+                 lambda word: f'%{word}%'),
+                ('FTS5, первые 10 по рангу',
+                 f'SELECT rowid FROM {FTS_TABLE} '
+                 f'WHERE {FTS_TABLE} MATCH ? ORDER BY rank LIMIT 10',
+                 match_expression),
+            )
+            for name, sql, param in cases:
+                timings = self.measure(connection, words, sql, param)
+                self.stdout.write(
+                    f'{name}: медиана {statistics.median(timings):.2f} мс, '
+                    f'максимум {max(timings):.2f} мс'
+                )
+
+    @staticmethod
+    def measure(connection, words, sql, param):
+        timings = []
+        for word in words:
+            started = time.perf_counter()
+            connection.execute(sql, (param(word),)).fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
@@ -0,0 +1,58 @@
+from functools import partial
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.workers import process_pool
+from posts import suggestions
+from posts.follow_graph import FollowGraph
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает рекомендации «кого почитать» для пользователей, чьи '
+        'подписки изменились, в нескольких процессах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=2,
+            help='Число процессов; 0 — всё в текущем процессе.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            dest='everything',
+            help='Пересчитать всех, а не только устаревших.',
+        )
+
+    def handle(self, *args, workers, chunk_size, everything, **options):
+        suggestions.create_missing()
+        users = iter(list(suggestions.pending(everything)))
+        chunks = iter(lambda: list(islice(users, chunk_size)), [])
+        # Хранится с запасом: уже прочитанные авторы отсеиваются при показе.
+        count = settings.FOLLOW_SUGGESTIONS * 2
+        compute = partial(
+            suggestions.compute,
+            popular=suggestions.popular_authors(count),
+            count=count,
+        )
+        done = 0
+        if workers:
+            with process_pool(workers) as pool:
+                for results in pool.map(compute, chunks):
+                    suggestions.save(results)
+                    done += len(results)
+                    self.stdout.write(f'Пользователей: {done}')
+        else:
+            compute = partial(compute, graph=FollowGraph.from_database())
+            for chunk in chunks:
+                results = compute(chunk)
+                suggestions.save(results)
+                done += len(results)
+                self.stdout.write(f'Пользователей: {done}')
+        self.stdout.write(self.style.SUCCESS(f'Готово, пользователей: {done}'))
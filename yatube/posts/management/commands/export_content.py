@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.export import CHUNK_SIZE, FORMATS, KINDS, export_stream
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты или комментарии в JSONL/CSV потоком, '
+        'при необходимости сжимая gzip.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Файл для выгрузки; «-» — стандартный вывод.',
+        )
+        parser.add_argument('--kind', choices=KINDS, required=True)
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Сколько строк читать из базы одним запросом.',
+        )
+
+    def handle(self, *args, path, kind, chunk_size, **options):
+        stream = export_stream(
+            kind, options['format'], options['gzip'], chunk_size)
+        if path == '-':
+            self.write(stream, sys.stdout.buffer)
+            return
+        with open(path, 'wb') as file:
+            written = self.write(stream, file)
+        self.stderr.write(f'Записано байт: {written}')
+
+    @staticmethod
+    def write(stream, file):
+        written = 0
+        for chunk in stream:
+            file.write(chunk)
+            written += len(chunk)
+        return written
@@ -0,0 +1,44 @@
+from functools import partial
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.workers import process_pool
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры картинок постов в нескольких процессах.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.THUMBNAIL_WORKERS,
+            help='Число процессов; 0 — всё в текущем процессе.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=100)
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать уже существующие миниатюры.',
+        )
+
+    def handle(self, *args, workers, chunk_size, force, **options):
+        post_ids = Post.objects.exclude(image='').order_by('pk').values_list(
+            'pk', flat=True).iterator()
+        chunks = iter(lambda: list(islice(post_ids, chunk_size)), [])
+        generate = partial(thumbnails.generate, force=force)
+        done = 0
+        if workers:
+            with process_pool(workers) as pool:
+                for count in pool.map(generate, chunks):
+                    done += count
+                    self.stdout.write(f'Обработано постов: {done}')
+        else:
+            for chunk in chunks:
+                done += generate(chunk)
+                self.stdout.write(f'Обработано постов: {done}')
+        self.stdout.write(self.style.SUCCESS(f'Готово, постов: {done}'))
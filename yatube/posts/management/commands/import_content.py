@@ -0,0 +1,106 @@
+import json
+import os
+import time
+from contextlib import nullcontext
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import (KINDS, ContentImportError, Importer, read_rows,
+                            relaxed_durability)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты, комментарии или подписки из JSONL/CSV пачками. '
+        'Прерванную загрузку можно продолжить с контрольной точки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--kind', choices=KINDS, required=True)
+        parser.add_argument(
+            '--format',
+            choices=('jsonl', 'csv'),
+            help='По умолчанию определяется по расширению файла.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            help='Сколько строк загружать в одной транзакции.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Строк в одном INSERT; по умолчанию предел базы.',
+        )
+        parser.add_argument(
+            '--create-missing',
+            action='store_true',
+            help='Создавать неизвестных авторов и группы вместо пропуска.',
+        )
+        parser.add_argument(
+            '--fast',
+            action='store_true',
+            help='Отключить fsync SQLite на время загрузки.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки; по умолчанию <path>.checkpoint.',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Начать сначала, не глядя на контрольную точку.',
+        )
+
+    def handle(self, *args, path, kind, chunk_size, batch_size, **options):
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl')
+        checkpoint = options['checkpoint'] or f'{path}.checkpoint'
+        done = 0 if options['restart'] else self.load_checkpoint(checkpoint)
+        if done:
+            self.stdout.write(f'Продолжаем со строки {done + 1}')
+        try:
+            importer = Importer(kind, options['create_missing'], batch_size)
+            rows = islice(read_rows(path, file_format), done, None)
+            durability = (
+                relaxed_durability() if options['fast'] else nullcontext())
+            imported = skipped = 0
+            started = time.perf_counter()
+            with durability:
+                for chunk in iter(lambda: list(islice(rows, chunk_size)), []):
+                    loaded, missed = importer.import_chunk(chunk)
+                    imported += loaded
+                    skipped += missed
+                    done += len(chunk)
+                    self.save_checkpoint(checkpoint, done)
+                    rate = (imported + skipped) / (
+                        time.perf_counter() - started)
+                    self.stdout.write(
+                        f'Строк: {done}, загружено: {imported}, '
+                        f'пропущено: {skipped}, {rate:.0f} строк/с'
+                    )
+        except (ContentImportError, OSError) as error:
+            raise CommandError(error)
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: загружено {imported}, пропущено {skipped}'))
+
+    @staticmethod
+    def load_checkpoint(checkpoint):
+        try:
+            with open(checkpoint) as file:
+                return json.load(file)['rows']
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def save_checkpoint(checkpoint, rows):
+        """Пишет число загруженных строк атомарно, через переименование."""
+        temporary = f'{checkpoint}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump({'rows': rows}, file)
+        os.replace(temporary, checkpoint)
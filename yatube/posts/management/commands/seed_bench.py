@@ -0,0 +1,148 @@
+import datetime as dt
+import random
+import time
+from itertools import accumulate, islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+
+from posts.importer import Importer, relaxed_durability
+from posts.models import Post
+
+USERNAME = 'bench{}'
+GROUP_SLUG = 'bench-group-{}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими данными для нагрузочных замеров: '
+        'популярность авторов по закону Ципфа, число комментариев к '
+        'посту — с тяжёлым хвостом. Данные грузятся через import_content, '
+        'поэтому счётчики, ленты и поисковый индекс согласованы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=5_000_000)
+        parser.add_argument('--comments', type=int, default=20_000_000)
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=20,
+            help='Среднее число подписок пользователя.',
+        )
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.1,
+            help='Показатель закона Ципфа для популярности авторов.',
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--chunk-size', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.random = random.Random(options['seed'])
+        fake = Faker('ru_RU')
+        fake.seed_instance(options['seed'])
+        self.vocabulary = list({fake.word() for _ in range(2000)})
+        # Вес автора i пропорционален 1 / i^skew: немногие авторы
+        # собирают большую часть подписчиков и пишут больше всех.
+        self.author_weights = list(accumulate(
+            1 / rank ** options['skew']
+            for rank in range(1, options['users'] + 1)
+        ))
+        self.end = timezone.now()
+        self.start = self.end - dt.timedelta(days=options['days'])
+        with relaxed_durability():
+            self.create_users()
+            self.load('follows', self.follows())
+            self.load('posts', self.posts())
+            self.load('comments', self.comments())
+
+    def create_users(self):
+        # Пользователи создаются все сразу, а не по ходу подписок и
+        # постов: те, кто ничего не пишет, тоже должны существовать.
+        users = Importer('follows', create_missing=True).users
+        names = (USERNAME.format(user) for user in range(
+            self.options['users']))
+        chunk_size = self.options['chunk_size']
+        for chunk in iter(lambda: list(islice(names, chunk_size)), []):
+            with transaction.atomic():
+                users.resolve(chunk)
+        self.stdout.write(f'users: {len(users.ids)}')
+
+    def load(self, kind, rows):
+        """Грузит строки фрагментами через Importer и пишет скорость."""
+        importer = Importer(kind, create_missing=True)
+        chunk_size = self.options['chunk_size']
+        done = 0
+        started = time.perf_counter()
+        for chunk in iter(lambda: list(islice(rows, chunk_size)), []):
+            loaded, _ = importer.import_chunk(chunk)
+            done += loaded
+            self.stdout.write(
+                f'{kind}: {done}, '
+                f'{done / (time.perf_counter() - started):.0f} строк/с'
+            )
+
+    def author(self):
+        return self.random.choices(
+            range(self.options['users']), cum_weights=self.author_weights)[0]
+
+    def text(self, low, high):
+        return ' '.join(
+            self.random.choices(self.vocabulary, k=self.random.randint(
+                low, high))).capitalize()
+
+    def follows(self):
+        # Число подписок у пользователя распределено экспоненциально
+        # со средним --follows, а на кого подписываться — по Ципфу.
+        for user in range(self.options['users']):
+            count = int(self.random.expovariate(1 / self.options['follows']))
+            for author in {self.author() for _ in range(count)} - {user}:
+                yield {
+                    'user': USERNAME.format(user),
+                    'author': USERNAME.format(author),
+                }
+
+    def posts(self):
+        total = self.options['posts']
+        span = self.end - self.start
+        for index in range(total):
+            group = self.random.randrange(self.options['groups'] * 2)
+            yield {
+                'author': USERNAME.format(self.author()),
+                'group': (GROUP_SLUG.format(group)
+                          if group < self.options['groups'] else None),
+                'text': self.text(5, 60),
+                'pub_date': (self.start + span * index / total).isoformat(),
+            }
+
+    def comments(self):
+        """Комментарии к постам: число на пост — Парето со средним,
+        дающим в сумме примерно --comments."""
+        alpha = 1.5
+        mean = self.options['comments'] / max(self.options['posts'], 1)
+        posts = Post.objects.filter(
+            author__username__startswith=USERNAME.format('')
+        ).order_by('pk').values_list('pk', 'pub_date')
+        for post_id, pub_date in posts.iterator():
+            count = int(
+                mean * (alpha - 1) * (self.random.paretovariate(alpha) - 1))
+            for _ in range(count):
+                created = min(
+                    pub_date + dt.timedelta(
+                        hours=self.random.expovariate(1 / 12)),
+                    self.end,
+                )
+                yield {
+                    'post': post_id,
+                    'author': USERNAME.format(self.author()),
+                    'text': self.text(2, 25),
+                    'created': created.isoformat(),
+                }
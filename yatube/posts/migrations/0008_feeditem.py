@@ -0,0 +1,60 @@
+# Generated by Django 2.2.16 on 2026-10-18 01:52
+
+from itertools import islice
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_feed(apps, schema_editor):
+    """Раскладывает посты по лентам подписчиков одним проходом.
+
+    Авторы, у которых подписчиков больше FEED_FANOUT_MAX_FOLLOWERS,
+    пропускаются: их посты подтягиваются при чтении.
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    FeedItem = apps.get_model('posts', 'FeedItem')
+    authors = Follow.objects.values('author').annotate(
+        followers=models.Count('pk')
+    ).filter(
+        followers__lte=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).values('author')
+    items = (
+        FeedItem(user_id=user_id, post_id=post_id)
+        for user_id, post_id in Follow.objects.filter(
+            author__in=authors, author__posts__isnull=False,
+        ).values_list('user', 'author__posts').iterator()
+    )
+    batch = list(islice(items, 1000))
+    while batch:
+        FeedItem.objects.bulk_create(batch)
+        batch = list(islice(items, 1000))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0007_auto_20230417_0847'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to=settings.AUTH_USER_MODEL, verbose_name='подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='feeditem',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='%(app_label)s_%(class)s_unique_item'),
+        ),
+        migrations.RunPython(fill_feed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 2.2.16 on 2026-10-18 01:53
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    UserStats = apps.get_model('posts', 'UserStats')
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    UserStats.objects.bulk_create(
+        [UserStats(
+            user_id=user.pk,
+            posts_count=user.posts_n,
+            followers_count=user.followers_n,
+            following_count=user.following_n,
+        ) for user in User.objects.annotate(
+            posts_n=Count('posts', distinct=True),
+            followers_n=Count('following', distinct=True),
+            following_n=Count('follower', distinct=True),
+        )],
+        batch_size=1000,
+    )
+    for group in Group.objects.annotate(n=Count('posts')):
+        Group.objects.filter(pk=group.pk).update(posts_count=group.n)
+    for post in Post.objects.annotate(n=Count('comments')).order_by():
+        Post.objects.filter(pk=post.pk).update(comments_count=post.n)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0008_feeditem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Количество постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Количество подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Количество подписок')),
+            ],
+            options={
+                'verbose_name': 'Счётчики пользователя',
+                'verbose_name_plural': 'Счётчики пользователей',
+            },
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество постов'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations, OperationalError
+
+# Схема и заполнение индекса записаны здесь, а не берутся из
+# posts.search: миграция не должна меняться вместе с кодом приложения.
+FTS_TABLE = 'posts_post_fts'
+CREATE_FTS_TABLE = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+    f"USING fts5(text, tokenize = 'unicode61 remove_diacritics 2')"
+)
+FILL_FTS_TABLE = (
+    f'INSERT INTO {FTS_TABLE} (rowid, text) SELECT id, text FROM posts_post'
+)
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(CREATE_FTS_TABLE)
+    except OperationalError:
+        # SQLite собран без FTS5: поиск будет работать через LIKE.
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(FILL_FTS_TABLE)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -4,7 +4,29 @@ from django.db import models
 User = get_user_model()
 
 
-class Group(models.Model):
+class CountersMixin:
+    """Не перезаписывает счётчики при сохранении загруженного объекта.
+
+    Счётчики меняются только UPDATE ... SET x = x + 1, а значение в
+    памяти может устареть, пока объект редактируют.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class Group(CountersMixin, models.Model):
     title = models.CharField(
         'Название группы',
         max_length=200,
@@ -14,6 +36,13 @@ class Group(models.Model):
         unique=True,
     )
     description = models.TextField('Описание')
+    posts_count = models.PositiveIntegerField(
+        'Количество постов',
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ('posts_count',)
 
     class Meta:
         verbose_name = 'Группа'
@@ -23,7 +52,7 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
+class Post(CountersMixin, models.Model):
     text = models.TextField(
         'Текст поста',
         help_text='Введите текст поста',
@@ -53,11 +82,32 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True,
     )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ('comments_count',)
 
     class Meta:
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         ordering = ('-pub_date', )
+        indexes = [
+            models.Index(
+                name='post_pub_date_idx',
+                fields=['-pub_date', '-id'],
+            ),
+            models.Index(
+                name='post_author_pub_date_idx',
+                fields=['author', '-pub_date', '-id'],
+            ),
+            models.Index(
+                name='post_group_pub_date_idx',
+                fields=['group', '-pub_date', '-id'],
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -89,6 +139,12 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ('-created', )
+        indexes = [
+            models.Index(
+                name='comment_post_created_idx',
+                fields=['post', '-created', '-id'],
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -121,6 +177,130 @@ class Follow(models.Model):
                 fields=['user', 'author'],
             ),
         ]
+        indexes = [
+            models.Index(
+                name='follow_author_user_idx',
+                fields=['author', 'user'],
+            ),
+        ]
 
     def __str__(self):
         return f'Пользователь {self.user} подписан на автора {self.author}'
+
+
+class FeedItem(models.Model):
+    """Запись материализованной ленты подписок: пост в ленте подписчика."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='подписчик',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Пост',
+    )
+    # Копия Post.pub_date: лента читается одним проходом по индексу
+    # (user, -pub_date, -post) без сортировки по чужой таблице.
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                name='%(app_label)s_%(class)s_unique_item',
+                fields=['user', 'post'],
+            ),
+        ]
+        indexes = [
+            models.Index(
+                name='feeditem_user_pub_date_idx',
+                fields=['user', '-pub_date', '-post'],
+            ),
+        ]
+
+    def __str__(self):
+        return f'Пост {self.post_id} в ленте {self.user_id}'
+
+
+class UserStats(models.Model):
+    """Денормализованные счётчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField('Количество постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        'Количество подписок',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self):
+        return f'Счётчики {self.user}'
+
+
+class FollowSuggestion(models.Model):
+    """Кого почитать: готовые рекомендации авторов для пользователя.
+
+    authors — упакованный массив id (array('I').tobytes()) в порядке
+    убывания веса. Подписки и отписки увеличивают version; рекомендации
+    посчитаны для computed_version и устарели, если она меньше.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='follow_suggestion',
+        verbose_name='Пользователь',
+    )
+    authors = models.BinaryField('Авторы', default=b'')
+    version = models.PositiveIntegerField('Версия подписок', default=1)
+    computed_version = models.PositiveIntegerField(
+        'Версия рекомендаций',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Рекомендации авторов'
+        verbose_name_plural = 'Рекомендации авторов'
+
+    def __str__(self):
+        return f'Рекомендации для {self.user_id}'
+
+
+class TrendingPost(models.Model):
+    """Оценка поста в «Популярном»: затухающая сумма событий.
+
+    score — оценка на момент updated (секунды Unix); к текущему моменту
+    она пересчитывается умножением на 0.5 за каждый период полураспада.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Пост',
+    )
+    score = models.FloatField('Оценка', db_index=True)
+    updated = models.FloatField('Момент оценки')
+
+    class Meta:
+        verbose_name = 'Популярный пост'
+        verbose_name_plural = 'Популярные посты'
+
+    def __str__(self):
+        return f'Пост {self.post_id}: {self.score:.2f}'
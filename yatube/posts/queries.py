@@ -0,0 +1,21 @@
+"""Выборки постов для лент; общие для HTML-страниц и API."""
+from .feed import feed_posts
+from .models import Post
+
+
+def index_posts():
+    return Post.objects.select_related('author', 'group').all()
+
+
+def group_posts(group):
+    return group.posts.select_related('author').all()
+
+
+def profile_posts(author):
+    return author.posts.select_related('group').all()
+
+
+def follow_posts(user):
+    """Лента подписок и колонки её курсора, см. feed.feed_posts."""
+    posts, cursor = feed_posts(user)
+    return posts.select_related('author', 'group'), cursor
@@ -0,0 +1,178 @@
+"""Полнотекстовый поиск по постам через SQLite FTS5.
+
+Индекс posts_post_fts хранит копию текста поста с rowid = id поста и
+обновляется сигналами при сохранении и удалении. На базах без FTS5
+поиск откатывается на LIKE по тексту.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+CREATE_FTS_TABLE = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+    f"USING fts5(text, tokenize = 'unicode61 remove_diacritics 2')"
+)
+WORD_RE = re.compile(r'\w+')
+BATCH_SIZE = 1000
+
+_available = {}
+
+
+def fts_available(using=connection):
+    """Есть ли в базе индекс FTS5; результат запоминается для базы
+    до следующих миграций (см. forget_fts)."""
+    if using.vendor != 'sqlite':
+        return False
+    name = using.settings_dict['NAME']
+    if name not in _available:
+        with using.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master "
+                "WHERE type = 'table' AND name = %s",
+                [FTS_TABLE],
+            )
+            _available[name] = cursor.fetchone() is not None
+    return _available[name]
+
+
+def forget_fts(using=connection):
+    """Забывает, есть ли индекс: миграции могли его создать."""
+    _available.pop(using.settings_dict['NAME'], None)
+
+
+def match_expression(query):
+    """Переводит ввод пользователя в безопасное выражение MATCH.
+
+    Все слова обязательны, последнее ищется как префикс.
+    """
+    words = WORD_RE.findall(query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def index_post(post_id, text):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+            [post_id, text],
+        )
+
+
+def index_posts(rows, using=connection):
+    """Добавляет в индекс новые посты пачкой [(id, text), ...]."""
+    if not fts_available(using):
+        return
+    with using.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(post_id,) for post_id, _ in rows],
+        )
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+            rows,
+        )
+
+
+def unindex_post(post_id):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild_index(using=connection):
+    """Заполняет индекс заново по всем постам, пачками."""
+    with using.cursor() as cursor:
+        cursor.execute(CREATE_FTS_TABLE)
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        last_pk = 0
+        while True:
+            cursor.execute(
+                'SELECT id, text FROM posts_post WHERE id > %s '
+                'ORDER BY id LIMIT %s',
+                [last_pk, BATCH_SIZE],
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                rows,
+            )
+            last_pk = rows[-1][0]
+
+
+class SearchResults:
+    """Ранжированная выдача поиска для django.core.paginator.Paginator.
+
+    Считает совпадения и достаёт только нужный срез идентификаторов,
+    посты страницы загружаются одним запросом.
+    """
+
+    def __init__(self, expression, posts=None):
+        self.expression = expression
+        self.posts = posts if posts is not None else Post.objects.all()
+
+    def count(self):
+        if self.expression is None:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s',
+                [self.expression],
+            )
+            return cursor.fetchone()[0]
+
+    def ids(self, offset, limit):
+        if self.expression is None:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY rank, rowid DESC LIMIT %s OFFSET %s',
+                [self.expression, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        ids = self.ids(start, index.stop - start)
+        posts = self.posts.in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+def search_posts(query, posts=None):
+    """Посты по запросу: SearchResults на FTS5 или queryset с LIKE."""
+    if fts_available():
+        return SearchResults(match_expression(query), posts)
+    return filter_posts(
+        posts if posts is not None else Post.objects.all(), query)
+
+
+def filter_posts(posts, query):
+    """Сужает queryset постов до найденных по запросу."""
+    expression = match_expression(query)
+    if expression is None:
+        return posts.none()
+    if not fts_available():
+        return posts.filter(text__icontains=query.strip())
+    return posts.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [expression],
+    ))
@@ -0,0 +1,169 @@
+from django.db import connections, transaction
+from django.db.models.signals import (post_delete, post_migrate, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from core.fragment_cache import bump, scope
+
+from . import (counters, feed, follow_graph, following, search, suggestions,
+               thumbnails, trending)
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+# Поля пользователя, которые видны на страницах.
+USER_DISPLAY_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+def bump_post_scopes(post, *group_ids):
+    bump(
+        scope('global'),
+        scope('author', post.author_id),
+        scope('post', post.pk),
+        *(scope('group', group_id)
+          for group_id in {post.group_id, *group_ids}
+          if group_id is not None),
+    )
+
+
+def bump_user_scopes(user_id):
+    """Имя пользователя есть на карточках его постов и в комментариях."""
+    groups = Post.objects.filter(
+        author=user_id, group__isnull=False
+    ).order_by().values_list('group', flat=True).distinct()
+    commented = Comment.objects.filter(
+        author=user_id
+    ).order_by().values_list('post', flat=True).distinct()
+    bump(
+        scope('global'),
+        scope('author', user_id),
+        *(scope('group', group_id) for group_id in groups),
+        *(scope('post', post_id) for post_id in commented),
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, update_fields=None,
+               **kwargs):
+    if raw:
+        return
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+    elif update_fields is None or USER_DISPLAY_FIELDS & set(update_fields):
+        bump_user_scopes(instance.pk)
+
+
+@receiver(pre_save, sender=Post)
+def post_before_save(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._origin = Post.objects.filter(
+            pk=instance.pk
+        ).values('author_id', 'group_id', 'image', 'text').first()
+
+
+def schedule_thumbnail(post, origin=None):
+    if post.image and (origin is None or origin['image'] != post.image):
+        transaction.on_commit(lambda: thumbnails.schedule([post.pk]))
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.change_user_stats(instance.author_id, 'posts_count', 1)
+        counters.change_group_posts(instance.group_id, 1)
+        feed.fan_out_post(instance)
+        bump_post_scopes(instance)
+        schedule_thumbnail(instance)
+        search.index_post(instance.pk, instance.text)
+        trending.record(instance.pk, trending.POST_WEIGHT)
+        return
+    origin = getattr(instance, '_origin', None)
+    if origin is None:
+        bump_post_scopes(instance)
+        schedule_thumbnail(instance)
+        search.index_post(instance.pk, instance.text)
+        return
+    bump_post_scopes(instance, origin['group_id'])
+    schedule_thumbnail(instance, origin)
+    if origin['text'] != instance.text:
+        search.index_post(instance.pk, instance.text)
+    if origin['author_id'] != instance.author_id:
+        bump(scope('author', origin['author_id']))
+        counters.change_user_stats(origin['author_id'], 'posts_count', -1)
+        counters.change_user_stats(instance.author_id, 'posts_count', 1)
+    if origin['group_id'] != instance.group_id:
+        counters.change_group_posts(origin['group_id'], -1)
+        counters.change_group_posts(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change_user_stats(instance.author_id, 'posts_count', -1)
+    counters.change_group_posts(instance.group_id, -1)
+    bump_post_scopes(instance)
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.change_post_comments(instance.post_id, 1)
+        trending.record(instance.post_id, trending.COMMENT_WEIGHT)
+    bump(scope('post', instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_post_comments(instance.post_id, -1)
+    bump(scope('post', instance.post_id))
+
+
+@receiver(post_migrate)
+def migrated(sender, using, **kwargs):
+    search.forget_fts(connections[using])
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    """Название группы есть на карточках её постов в профилях авторов.
+
+    При удалении авторы собираются до того, как у постов обнулится
+    группа.
+    """
+    if not raw:
+        authors = Post.objects.filter(
+            group=instance.pk
+        ).order_by().values_list('author', flat=True).distinct()
+        bump(
+            scope('global'),
+            scope('group', instance.pk),
+            *(scope('author', author_id) for author_id in authors),
+        )
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user_stats(instance.user_id, 'following_count', 1)
+        counters.change_user_stats(instance.author_id, 'followers_count', 1)
+        feed.backfill(instance.user_id, instance.author_id)
+        following.invalidate(instance.user_id)
+        follow_graph.record(
+            follow_graph.FOLLOW, instance.user_id, instance.author_id)
+        suggestions.mark_changed(instance.user_id)
+        bump(scope('follows', instance.user_id))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_user_stats(instance.user_id, 'following_count', -1)
+    counters.change_user_stats(instance.author_id, 'followers_count', -1)
+    feed.trim(instance.user_id, instance.author_id)
+    following.invalidate(instance.user_id)
+    follow_graph.record(
+        follow_graph.UNFOLLOW, instance.user_id, instance.author_id)
+    suggestions.mark_changed(instance.user_id)
+    bump(scope('follows', instance.user_id))
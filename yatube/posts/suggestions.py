@@ -0,0 +1,137 @@
+"""Рекомендации «кого почитать», посчитанные заранее.
+
+Вес автора для пользователя — сколько авторов из его подписок сами
+подписаны на этого автора (друзья друзей). Считать это SQL-запросом на
+каждой странице слишком дорого, поэтому команда build_suggestions
+считает его по CSR-массивам графа подписок (см. follow_graph): строка
+квадрата матрицы смежности складывается из отрезков массива подписок,
+уже прочитанные авторы отсекаются двоичным поиском по отсортированному
+отрезку пользователя. Пользователи делятся на пачки по процессам, каждый
+процесс один раз загружает граф.
+
+Результат — FollowSuggestion: одна строка на пользователя с упакованным
+массивом id. Страница читает её по первичному ключу. Подписка и отписка
+увеличивают version строки, и следующий запуск команды пересчитывает
+только такие строки.
+"""
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .follow_graph import TYPECODE, FollowGraph
+from .following import followed_ids
+from .models import FollowSuggestion, User, UserStats
+
+_graph = None
+
+
+def _graph_for_worker():
+    """Граф процесса-воркера; загружается один раз на процесс."""
+    global _graph
+    if _graph is None:
+        _graph = FollowGraph.from_database()
+    return _graph
+
+
+def _contains(ids, value):
+    position = bisect_left(ids, value)
+    return position < len(ids) and ids[position] == value
+
+
+def top_authors(graph, user_id, popular, count):
+    """count авторов с наибольшим весом; недостающих добирает из
+    самых читаемых."""
+    followed = array(TYPECODE, sorted(graph.followed(user_id)))
+    weights = Counter()
+    for author_id in followed:
+        weights.update(graph.followed(author_id))
+    candidates = (
+        (weight, author_id) for author_id, weight in weights.items()
+        if author_id != user_id and not _contains(followed, author_id)
+    )
+    best = [author_id for _, author_id in heapq.nlargest(
+        count, candidates, key=lambda item: (item[0], -item[1]))]
+    chosen = set(best)
+    for author_id in popular:
+        if len(best) >= count:
+            break
+        if (author_id != user_id and author_id not in chosen
+                and not _contains(followed, author_id)):
+            best.append(author_id)
+            chosen.add(author_id)
+    return array(TYPECODE, best)
+
+
+def popular_authors(count):
+    return list(UserStats.objects.filter(followers_count__gt=0).order_by(
+        '-followers_count', 'user_id').values_list('user_id', flat=True)[
+        :count])
+
+
+def compute(users, popular, count, graph=None):
+    """Считает рекомендации пачки [(user_id, version), ...]; возвращает
+    [(user_id, version, authors), ...]. Без graph берётся граф воркера."""
+    if graph is None:
+        graph = _graph_for_worker()
+    return [
+        (user_id, version,
+         top_authors(graph, user_id, popular, count).tobytes())
+        for user_id, version in users
+    ]
+
+
+def save(results):
+    """Записывает рекомендации; version не трогается, так что подписка
+    во время расчёта оставит строку устаревшей до следующего запуска."""
+    FollowSuggestion.objects.bulk_update([
+        FollowSuggestion(
+            user_id=user_id, authors=authors, computed_version=version)
+        for user_id, version, authors in results
+    ], ['authors', 'computed_version'])
+
+
+def create_missing(batch_size=1000):
+    """Строки для пользователей, у которых их ещё нет: после этого их
+    подписки увеличивают version."""
+    missing = User.objects.filter(
+        follow_suggestion__isnull=True).values_list('pk', flat=True)
+    FollowSuggestion.objects.bulk_create(
+        [FollowSuggestion(user_id=user_id) for user_id in missing],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+
+
+def pending(everything=False):
+    """[(user_id, version), ...] пользователей, которым нужен расчёт."""
+    rows = FollowSuggestion.objects.order_by('pk')
+    if not everything:
+        rows = rows.filter(version__gt=F('computed_version'))
+    return rows.values_list('pk', 'version')
+
+
+def mark_changed(*user_ids):
+    """Помечает рекомендации устаревшими после фиксации транзакции."""
+    transaction.on_commit(
+        lambda: FollowSuggestion.objects.filter(pk__in=user_ids).update(
+            version=F('version') + 1))
+
+
+def for_user(user):
+    """Рекомендованные авторы без тех, на кого пользователь уже подписан."""
+    packed = FollowSuggestion.objects.filter(pk=user.pk).values_list(
+        'authors', flat=True).first()
+    if not packed:
+        return []
+    ids = array(TYPECODE)
+    ids.frombytes(packed)
+    followed = followed_ids(user.pk)
+    ids = [author_id for author_id in ids
+           if not _contains(followed, author_id)]
+    authors = User.objects.in_bulk(ids[:settings.FOLLOW_SUGGESTIONS])
+    return [authors[author_id] for author_id in ids if author_id in authors]
@@ -0,0 +1,22 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.filter
+def post_image_url(post):
+    """Адрес готовой миниатюры, а пока её нет — исходной картинки."""
+    if hasattr(post, 'thumbnail'):
+        thumbnail = post.thumbnail
+    else:
+        thumbnail = thumbnails.cached_thumbnail(post.image)
+    return (thumbnail or post.image).url
+
+
+@register.simple_tag
+def prefetch_thumbnails(posts):
+    """Разрешает миниатюры всех постов страницы одним пакетом."""
+    thumbnails.prefetch(posts)
+    return ''
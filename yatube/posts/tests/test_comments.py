@@ -1,10 +1,13 @@
 from http import HTTPStatus
 
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from core import fragment_cache
+
 from ..forms import CommentForm
-from ..models import Post, User
+from ..models import Comment, Post, User
 
 
 class CommentCreateFormTests(TestCase):
@@ -58,3 +61,77 @@ class CommentCreateFormTests(TestCase):
         )
         self.assertEqual(len(self.post.comments.all()), count_comments)
         self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+@override_settings(COMMENTS_PER_PAGE=2)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Вирусный пост')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Комментарий {i}')
+            for i in range(5)
+        )
+        cls.expected = list(
+            cls.post.comments.order_by('-created', '-pk')
+            .values_list('text', flat=True)
+        )
+
+    def setUp(self):
+        fragment_cache.flush()
+        cache.clear()
+
+    def test_post_detail_holds_first_page(self):
+        """На странице поста только первые комментарии и ссылка дальше."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.id,)))
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in comments], self.expected[:2])
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, 'data-comments-more')
+
+    def test_fragment_pages(self):
+        """HTML-фрагменты по курсору отдают все комментарии по разу."""
+        url = reverse('posts:post_comments', args=(self.post.id,))
+        texts = []
+        params = {}
+        while True:
+            response = self.client.get(url, params)
+            comments = response.context['comments']
+            texts += [comment.text for comment in comments]
+            if not comments.has_next():
+                break
+            params = {'after': comments.next_cursor}
+        self.assertEqual(texts, self.expected)
+        self.assertNotContains(response, 'data-comments-more')
+
+    def test_fragment_cache_per_view(self):
+        """Страница поста и HTML-фрагмент не делят кэш комментариев."""
+        self.client.get(reverse('posts:post_detail', args=(self.post.id,)))
+        url = reverse('posts:post_comments', args=(self.post.id,))
+        self.client.get(url)
+        self.assertEqual(
+            fragment_cache.stats()['comments'], {'hits': 0, 'misses': 2})
+        self.client.get(url)
+        self.assertEqual(
+            fragment_cache.stats()['comments'], {'hits': 1, 'misses': 2})
+
+    def test_json_pages(self):
+        """JSON-выдача содержит комментарии и адрес следующей порции."""
+        url = '{}?format=json'.format(
+            reverse('posts:post_comments', args=(self.post.id,)))
+        texts = []
+        while url:
+            data = self.client.get(url).json()
+            texts += [comment['text'] for comment in data['comments']]
+            url = data['next']
+        self.assertEqual(texts, self.expected)
+
+    def test_unknown_post(self):
+        """Для несуществующего поста фрагмент отвечает 404."""
+        response = self.client.get(
+            reverse('posts:post_comments', args=(self.post.id + 1,)))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
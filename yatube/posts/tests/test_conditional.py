@@ -0,0 +1,148 @@
+from http import HTTPStatus
+
+from unittest import mock
+
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import replicas
+
+from ..models import Comment, Group, Post, User
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Тестовый пост')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def revalidate(self, client, url):
+        """Повторный запрос с валидаторами из первого ответа."""
+        response = client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        headers = {'HTTP_IF_NONE_MATCH': response['ETag']}
+        if response.has_header('Last-Modified'):
+            headers['HTTP_IF_MODIFIED_SINCE'] = response['Last-Modified']
+        return response, headers
+
+    def test_not_modified_without_rendering(self):
+        """Неизменившаяся страница отвечает 304, шаблон не рендерится."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+            reverse('posts:post_detail', args=(self.post.id,)),
+        )
+        for client in (self.client, self.authorized_client):
+            for url in urls:
+                with self.subTest(url=url):
+                    _, headers = self.revalidate(client, url)
+                    response = client.get(url, **headers)
+                    self.assertEqual(
+                        response.status_code, HTTPStatus.NOT_MODIFIED)
+                    self.assertEqual(response.templates, [])
+
+    def test_last_modified_only_for_anonymous(self):
+        """Last-Modified получают только анонимы."""
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        self.assertTrue(response.has_header('Last-Modified'))
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        response = self.authorized_client.get(url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_validators_differ_between_users(self):
+        """ETag анонима не подходит авторизованному пользователю."""
+        url = reverse('posts:post_detail', args=(self.post.id,))
+        _, headers = self.revalidate(self.client, url)
+        response = self.authorized_client.get(
+            url, HTTP_IF_NONE_MATCH=headers['HTTP_IF_NONE_MATCH'])
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_missing_objects_still_404(self):
+        """Для несуществующих объектов проверка пропускается."""
+        response = self.client.get(reverse('posts:group_list', args=('no',)))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class FreshReadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def test_fresh_read_before_queries(self):
+        """Страницы без условного GET проверяют свежесть реплики до
+        запросов к постам."""
+        self.client.force_login(self.user)
+        urls = (
+            reverse('posts:follow_index'),
+            reverse('posts:post_comments', args=(self.post.pk,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                calls = []
+                with CaptureQueriesContext(connection) as queries:
+                    with mock.patch.object(
+                        replicas, 'read_fresh',
+                        side_effect=lambda scopes: calls.append(
+                            [query['sql'] for query in queries]),
+                    ):
+                        self.client.get(url)
+                self.assertFalse(
+                    [sql for sql in calls[0] if 'posts_' in sql])
+
+
+class ConditionalWritesTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(author=self.user, text='Тестовый пост')
+
+    def revalidate(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return response['ETag']
+
+    def test_writes_change_validators(self):
+        """Новый пост, комментарий или правка дают новую версию страниц."""
+        index = reverse('posts:index')
+        detail = reverse('posts:post_detail', args=(self.post.id,))
+        index_etag = self.revalidate(index)
+        detail_etag = self.revalidate(detail)
+        Comment.objects.create(post=self.post, author=self.user, text='Да')
+        response = self.client.get(detail, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'Да')
+        response = self.client.get(index, HTTP_IF_NONE_MATCH=index_etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный пост'
+        post.save()
+        response = self.client.get(index, HTTP_IF_NONE_MATCH=index_etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_group_edit_changes_profile_validators(self):
+        """Правка группы даёт новую версию профиля автора её постов."""
+        group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(author=self.user, text='В группе', group=group)
+        profile = reverse('posts:profile', args=(self.user.username,))
+        etag = self.revalidate(profile)
+        group.title = 'Переименованная группа'
+        group.save()
+        response = self.client.get(profile, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'Переименованная группа')
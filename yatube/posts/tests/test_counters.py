@@ -0,0 +1,99 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User, UserStats
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.user2 = User.objects.create_user(username='auth2')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='75',
+            description='Тестовое описание',
+        )
+        cls.group2 = Group.objects.create(
+            title='Новая группа',
+            slug='new-group',
+            description='Новое описание',
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_counters(self):
+        """Создание, перенос и удаление поста меняют счётчики."""
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Текст', 'group': self.group.id},
+        )
+        post = Post.objects.get()
+        self.assertEqual(self.stats(self.user).posts_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=(post.id,)),
+            data={'text': 'Текст', 'group': self.group2.id},
+        )
+        self.group.refresh_from_db()
+        self.group2.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.group2.posts_count, 1)
+        post.refresh_from_db()
+        post.delete()
+        self.group2.refresh_from_db()
+        self.assertEqual(self.stats(self.user).posts_count, 0)
+        self.assertEqual(self.group2.posts_count, 0)
+
+    def test_comment_counter(self):
+        """Комментарий увеличивает счётчик, а правка поста его не трёт."""
+        post = Post.objects.create(author=self.user, text='Текст')
+        self.authorized_client.post(
+            reverse('posts:add_comment', args=(post.id,)),
+            data={'text': 'Комментарий'},
+        )
+        post.text = 'Новый текст'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        Comment.objects.get().delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_follow_counters(self):
+        """Подписка и отписка меняют счётчики подписок и подписчиков."""
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=(self.user2.username,)))
+        self.assertEqual(self.stats(self.user).following_count, 1)
+        self.assertEqual(self.stats(self.user2).followers_count, 1)
+        response = self.client.get(
+            reverse('posts:profile', args=(self.user2.username,)))
+        self.assertEqual(response.context['stats'].followers_count, 1)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=(self.user2.username,)))
+        self.assertEqual(self.stats(self.user).following_count, 0)
+        self.assertEqual(self.stats(self.user2).followers_count, 0)
+
+    def test_recount_command(self):
+        """Команда recount_counters чинит расхождения."""
+        Post.objects.bulk_create(
+            [Post(author=self.user, text='Текст', group=self.group)] * 3)
+        Follow.objects.create(user=self.user2, author=self.user)
+        UserStats.objects.filter(user=self.user).update(followers_count=5)
+        UserStats.objects.filter(user=self.user2).delete()
+        call_command('recount_counters', chunk_size=1, stdout=StringIO())
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 3)
+        self.assertEqual(self.stats(self.user).posts_count, 3)
+        self.assertEqual(self.stats(self.user).followers_count, 1)
+        self.assertEqual(self.stats(self.user2).following_count, 1)
@@ -0,0 +1,75 @@
+import gzip
+import json
+import os
+import tempfile
+from http import HTTPStatus
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..export import iter_rows
+from ..models import Comment, Group, Post, User
+
+
+class ExportContentTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, group=cls.group, text=f'Пост {i}')
+            for i in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.user, text='Комментарий')
+
+    def test_keyset_reads(self):
+        """Строки читаются пачками по ключу, запрос на пачку."""
+        with self.assertNumQueries(3):
+            rows = list(iter_rows('posts', chunk_size=2))
+        self.assertEqual(
+            [row['id'] for row in rows], [post.pk for post in self.posts])
+        self.assertEqual(rows[0]['author'], 'auth')
+        self.assertEqual(rows[0]['group'], 'group')
+        self.assertEqual(rows[0]['pub_date'],
+                         self.posts[0].pub_date.isoformat())
+
+    def test_command(self):
+        """Команда пишет JSONL, который читается построчно."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'comments.jsonl.gz')
+            call_command('export_content', path, kind='comments', gzip=True,
+                         stderr=StringIO())
+            with gzip.open(path, 'rt', encoding='utf-8') as file:
+                rows = [json.loads(line) for line in file]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['text'], 'Комментарий')
+        self.assertEqual(rows[0]['post'], self.posts[0].pk)
+
+    def test_endpoint(self):
+        """Выгрузка по адресу доступна только персоналу и идёт потоком."""
+        url = reverse('posts:export', args=('posts',))
+        self.client.force_login(self.user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.client.force_login(self.staff)
+        response = self.client.get(url, {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            lines[0], 'id,author,group,text,image,pub_date,comments_count')
+        self.assertEqual(len(lines), 6)
+        response = self.client.get(url, {'format': 'csv', 'gzip': '1'})
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content))
+            .decode().splitlines(),
+            lines,
+        )
+        response = self.client.get(reverse('posts:export', args=('users',)))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
@@ -0,0 +1,111 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import feed
+from ..models import FeedItem, Follow, Post, User
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Старый пост',
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def feed(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_feed(self):
+        """Подписка добавляет в ленту уже опубликованные посты автора."""
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=(self.author.username,)))
+        self.assertTrue(FeedItem.objects.filter(
+            user=self.reader, post=self.old_post).exists())
+        self.assertEqual(self.feed(), [self.old_post])
+
+    def test_new_post_fans_out(self):
+        """Новый пост попадает в ленты подписчиков, но не остальных."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        stranger = User.objects.create_user(username='stranger')
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertTrue(FeedItem.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertFalse(FeedItem.objects.filter(user=stranger).exists())
+        self.assertEqual(self.feed(), [post, self.old_post])
+
+    def test_unfollow_trims_feed(self):
+        """Отписка убирает посты автора из ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=(self.author.username,)))
+        self.assertFalse(FeedItem.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(CURSOR_PAGINATION=True, NUMBER_OF_POSTS_IN_PAG=2)
+    def test_cursor_pages(self):
+        """Курсор листает ленту по дате и посту из записей ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+            for number in range(2)
+        ]
+        url = reverse('posts:follow_index')
+        page = self.authorized_client.get(url).context['page_obj']
+        self.assertEqual(list(page), posts[::-1])
+        page = self.authorized_client.get(
+            url, {'after': page.next_cursor}).context['page_obj']
+        self.assertEqual(list(page), [self.old_post])
+        self.assertFalse(page.has_next())
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=0)
+    def test_celebrity_posts_pulled_on_read(self):
+        """Посты популярных авторов не раскладываются, а читаются сразу."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(FeedItem.objects.exists())
+        self.assertEqual(self.feed(), [post, self.old_post])
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=1)
+    def test_author_stops_being_celebrity(self):
+        """Когда после отписки автор перестаёт быть популярным, его посты
+        раскладываются по лентам оставшихся подписчиков."""
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        follow = Follow.objects.create(user=other, author=self.author)
+        self.assertFalse(FeedItem.objects.exists())
+        self.assertEqual(self.feed(), [self.old_post])
+        follow.delete()
+        self.assertTrue(FeedItem.objects.filter(
+            user=self.reader, post=self.old_post).exists())
+        self.assertEqual(self.feed(), [self.old_post])
+
+    def test_backfill_pairs(self):
+        """Пачка подписок дозаполняет ленты одним запросом к постам,
+        пропуская популярных авторов."""
+        celebrity = User.objects.create_user(username='celebrity')
+        Post.objects.create(author=celebrity, text='Пост звезды')
+        pairs = [(self.reader.pk, self.author.pk),
+                 (self.reader.pk, celebrity.pk)]
+        for user_id, author_id in pairs:
+            Follow.objects.create(user_id=user_id, author_id=author_id)
+        with override_settings(FEED_FANOUT_MAX_FOLLOWERS=1):
+            Follow.objects.create(
+                user=User.objects.create_user(username='fan'),
+                author=celebrity,
+            )
+            FeedItem.objects.all().delete()
+            with self.assertNumQueries(2):
+                feed.backfill_pairs(pairs)
+        self.assertEqual(
+            list(FeedItem.objects.values_list('user', 'post')),
+            [(self.reader.pk, self.old_post.pk)],
+        )
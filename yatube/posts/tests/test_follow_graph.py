@@ -0,0 +1,106 @@
+from array import array
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from .. import feed, follow_graph
+from ..follow_graph import FOLLOW, TYPECODE, UNFOLLOW, FollowGraph
+from ..models import Follow, User
+
+
+def build(edges, size):
+    edges = sorted(edges)
+    return FollowGraph(
+        array(TYPECODE, [user for user, _ in edges]),
+        array(TYPECODE, [author for _, author in edges]),
+        size,
+    )
+
+
+class FollowGraphTests(SimpleTestCase):
+    def setUp(self):
+        self.graph = build([(1, 2), (1, 3), (2, 3), (4, 3)], 5)
+
+    def test_csr(self):
+        """Число подписок и подписчиков, проверка подписки и соседи."""
+        graph = self.graph
+        self.assertEqual(graph.following_count(1), 2)
+        self.assertEqual(graph.followers_count(3), 3)
+        self.assertEqual(graph.followers_count(1), 0)
+        self.assertEqual(list(graph.followers_of(3)), [1, 2, 4])
+        self.assertEqual(list(graph.followed(1)), [2, 3])
+        self.assertTrue(graph.is_following(2, 3))
+        self.assertFalse(graph.is_following(3, 2))
+
+    def test_changes(self):
+        """Подписки и отписки поверх CSR, повтор ничего не меняет,
+        новые пользователи за пределами массивов тоже учитываются."""
+        graph = self.graph
+        for _ in range(2):
+            graph.apply(UNFOLLOW, 1, 3)
+            graph.apply(FOLLOW, 7, 3)
+            graph.apply(FOLLOW, 1, 4)
+        self.assertEqual(graph.edges, 5)
+        self.assertEqual(graph.followers_count(3), 3)
+        self.assertEqual(sorted(graph.followers_of(3)), [2, 4, 7])
+        self.assertEqual(sorted(graph.followed(1)), [2, 4])
+        self.assertTrue(graph.is_following(7, 3))
+        self.assertFalse(graph.is_following(1, 3))
+        graph.apply(FOLLOW, 1, 3)
+        self.assertTrue(graph.is_following(1, 3))
+        self.assertEqual(graph.followers_count(3), 4)
+
+    def test_change_during_iteration(self):
+        """Обход соседей не ломается, если журнал применяется в это
+        время: обход идёт по копии изменений."""
+        graph = self.graph
+        graph.apply(FOLLOW, 3, 1)
+        graph.apply(FOLLOW, 3, 2)
+        followed = graph.followed(3)
+        first = next(followed)
+        graph.apply(FOLLOW, 3, 4)
+        self.assertEqual(sorted([first, *followed]), [1, 2])
+        self.assertEqual(sorted(graph.followed(3)), [1, 2, 4])
+
+
+class FollowGraphServiceTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [
+            User.objects.create_user(username=f'user{number}')
+            for number in range(4)
+        ]
+
+    def follow(self, user, author):
+        return Follow.objects.create(
+            user=self.users[user], author=self.users[author])
+
+    def test_other_process_catches_up(self):
+        """Граф, загруженный раньше, догоняет подписки и отписки по
+        журналу в кэше."""
+        self.follow(0, 1)
+        follow = self.follow(2, 1)
+        service = follow_graph._Service()
+        graph = service.load()
+        self.assertEqual(graph.followers_count(self.users[1].pk), 2)
+        self.follow(3, 1)
+        follow.delete()
+        with override_settings(FOLLOW_GRAPH=True):
+            self.assertIs(service.current(), graph)
+        self.assertEqual(
+            sorted(graph.followers_of(self.users[1].pk)),
+            [self.users[0].pk, self.users[3].pk])
+
+    def test_feed_celebrities(self):
+        """Популярных авторов ленты граф находит так же, как SQL."""
+        for user in (0, 1, 2):
+            self.follow(user, 3)
+        self.follow(0, 1)
+        follow_graph.load()
+        with override_settings(FEED_FANOUT_MAX_FOLLOWERS=1):
+            with override_settings(FOLLOW_GRAPH=False):
+                expected = list(feed.celebrities_followed_by(self.users[0]))
+            with self.assertNumQueries(0):
+                actual = list(feed.celebrities_followed_by(self.users[0]))
+        self.assertEqual(actual, expected)
+        self.assertEqual(actual, [self.users[3].pk])
@@ -0,0 +1,68 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import following
+from ..models import Follow, User
+
+
+class FollowingCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(4)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        for author in self.authors[2::-2]:
+            Follow.objects.create(user=self.user, author=author)
+
+    def test_followed_ids(self):
+        """Подписки читаются одним запросом и дальше берутся из кэша
+        отсортированным массивом."""
+        with self.assertNumQueries(1):
+            ids = following.followed_ids(self.user.pk)
+        self.assertEqual(
+            list(ids), [self.authors[0].pk, self.authors[2].pk])
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                following.followed_among(
+                    self.user, [author.pk for author in self.authors]),
+                {self.authors[0].pk, self.authors[2].pk})
+            self.assertTrue(
+                following.is_following(self.user, self.authors[2].pk))
+            self.assertFalse(
+                following.is_following(self.user, self.authors[1].pk))
+            self.assertFalse(
+                following.is_following(AnonymousUser(), self.authors[2].pk))
+
+    def test_follow_and_unfollow_invalidate(self):
+        """Подписка и отписка сбрасывают кэш подписок пользователя."""
+        following.followed_ids(self.user.pk)
+        client = Client()
+        client.force_login(self.user)
+        client.get(reverse(
+            'posts:profile_follow', args=(self.authors[1].username,)))
+        self.assertTrue(following.is_following(self.user, self.authors[1].pk))
+        client.get(reverse(
+            'posts:profile_unfollow', args=(self.authors[0].username,)))
+        self.assertFalse(
+            following.is_following(self.user, self.authors[0].pk))
+
+    def test_profile_button(self):
+        """Кнопка на странице профиля берёт состояние подписки из кэша."""
+        client = Client()
+        client.force_login(self.user)
+        url = reverse('posts:profile', args=(self.authors[0].username,))
+        response = client.get(url)
+        self.assertTrue(response.context['following'])
+        self.assertContains(response, 'Отписаться')
+        response = client.get(
+            reverse('posts:profile', args=(self.authors[1].username,)))
+        self.assertFalse(response.context['following'])
+        self.assertContains(response, 'Подписаться')
@@ -0,0 +1,133 @@
+import datetime as dt
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import Comment, FeedItem, Follow, Group, Post, User
+from ..search import filter_posts
+
+
+class ImportContentTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def write_jsonl(self, name, rows):
+        return self.write(
+            name, ''.join(json.dumps(row) + '\n' for row in rows))
+
+    def load(self, path, kind, **options):
+        call_command(
+            'import_content', path, kind=kind, stdout=StringIO(), **options)
+
+    def test_posts_keep_side_effects(self):
+        """Импорт постов обновляет счётчики, ленты и поиск, хранит даты."""
+        rows = [
+            {'author': 'author', 'text': 'Перенесённый енот',
+             'group': 'zoo', 'pub_date': '2015-03-01T10:00:00'},
+            {'author': 'nobody', 'text': 'Неизвестный автор'},
+        ]
+        self.load(self.write_jsonl('strict.jsonl', rows), 'posts')
+        self.assertFalse(Post.objects.exists())
+        rows.append({'author': 'author', 'text': 'Второй пост'})
+        self.load(
+            self.write_jsonl('posts.jsonl', rows), 'posts',
+            create_missing=True, fast=True,
+        )
+        self.assertEqual(Post.objects.count(), 3)
+        post = Post.objects.get(text='Перенесённый енот')
+        self.assertEqual(
+            post.pub_date,
+            timezone.make_aware(dt.datetime(2015, 3, 1, 10)),
+        )
+        self.assertEqual(post.group, Group.objects.get(slug='zoo'))
+        self.assertEqual(Group.objects.get(slug='zoo').posts_count, 1)
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).stats.posts_count, 2)
+        self.assertFalse(
+            User.objects.get(username='nobody').has_usable_password())
+        self.assertEqual(
+            FeedItem.objects.filter(user=self.reader).count(), 2)
+        self.assertEqual(
+            list(filter_posts(Post.objects.all(), 'енот')), [post])
+
+    def test_comments_and_follows_csv(self):
+        """Комментарии и подписки загружаются из CSV; строки с битым id
+        поста пропускаются, повторные подписки не меняют счётчики."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        comments = self.write(
+            'comments.csv',
+            'post,author,text,created\n'
+            f'{post.pk},reader,Первый,2020-01-01T00:00:00\n'
+            f'{post.pk + 1},reader,К несуществующему посту,\n'
+            'abc,reader,Битый id,\n'
+            ',reader,Без поста,\n',
+        )
+        self.load(comments, 'comments')
+        self.assertEqual(Comment.objects.get().text, 'Первый')
+        self.assertEqual(
+            Post.objects.get(pk=post.pk).comments_count, 1)
+        follows = self.write(
+            'follows.csv',
+            'user,author\nauthor,reader\nauthor,author\nauthor,reader\n',
+        )
+        self.load(follows, 'follows')
+        self.load(follows, 'follows')
+        self.assertTrue(
+            Follow.objects.filter(user=self.author, author=self.reader)
+            .exists())
+        self.assertEqual(Follow.objects.count(), 2)
+        self.assertEqual(
+            User.objects.get(pk=self.reader.pk).stats.followers_count, 1)
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).stats.following_count, 1)
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=1)
+    def test_follows_cross_fanout_threshold(self):
+        """Пачка подписок, перескочившая порог, убирает посты автора
+        из лент."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.assertTrue(FeedItem.objects.filter(post=post).exists())
+        for username in ('fan1', 'fan2'):
+            User.objects.create_user(username=username)
+        follows = self.write(
+            'follows.csv', 'user,author\nfan1,author\nfan2,author\n')
+        self.load(follows, 'follows')
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).stats.followers_count, 3)
+        self.assertFalse(FeedItem.objects.filter(post=post).exists())
+
+    def test_resume_from_checkpoint(self):
+        """После сбоя загрузка продолжается с контрольной точки."""
+        path = self.write_jsonl('posts.jsonl', [
+            {'author': 'author', 'text': f'Пост {i}'} for i in range(5)
+        ])
+        with open(f'{path}.checkpoint', 'w') as file:
+            json.dump({'rows': 3}, file)
+        self.load(path, 'posts', chunk_size=1)
+        self.assertCountEqual(
+            Post.objects.values_list('text', flat=True),
+            ['Пост 3', 'Пост 4'],
+        )
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
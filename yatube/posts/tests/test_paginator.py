@@ -0,0 +1,101 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Group, Post, User
+from ..utils import (CursorPage, cursor_paginator, decode_cursor,
+                     encode_cursor)
+
+TOTAL_NUMBER_POSTS = 13
+
+
+@override_settings(CURSOR_PAGINATION=True)
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.user2 = User.objects.create_user(username='subscr')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='75',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            [Post(author=cls.user,
+                  text=f'{index}',
+                  group=cls.group) for index in range(TOTAL_NUMBER_POSTS)]
+        )
+        Follow.objects.create(user=cls.user2, author=cls.user)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user2)
+        cache.clear()
+
+    def test_cursor_pages(self):
+        """Курсорная пагинация листает вперёд и назад без пропусков."""
+        reverse_names = (
+            ('posts:index', None),
+            ('posts:follow_index', None),
+            ('posts:group_list', (self.group.slug,)),
+            ('posts:profile', (self.user.username,)),
+        )
+        expected = list(Post.objects.order_by('-pub_date', '-pk'))
+        for name, args in reverse_names:
+            with self.subTest(name=name):
+                url = reverse(name, args=args)
+                first = self.authorized_client.get(url).context['page_obj']
+                self.assertIsInstance(first, CursorPage)
+                self.assertEqual(len(first), settings.NUMBER_OF_POSTS_IN_PAG)
+                self.assertFalse(first.has_previous())
+                self.assertTrue(first.has_next())
+                second = self.authorized_client.get(
+                    url, {'after': first.next_cursor}).context['page_obj']
+                self.assertEqual(
+                    len(second),
+                    TOTAL_NUMBER_POSTS - settings.NUMBER_OF_POSTS_IN_PAG
+                )
+                self.assertFalse(second.has_next())
+                self.assertEqual(list(first) + list(second), expected)
+                back = self.authorized_client.get(
+                    url, {'before': second.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+                self.assertFalse(back.has_previous())
+
+    def test_same_token_both_directions(self):
+        """Страницы до и после одного токена не делят кэш фрагментов."""
+        url = reverse('posts:index')
+        middle = Post.objects.order_by('-pub_date', '-pk')[5]
+        token = encode_cursor(middle)
+        after = self.client.get(url, {'after': token}).context['page_obj']
+        before = self.client.get(url, {'before': token}).context['page_obj']
+        self.assertNotEqual(after.number, before.number)
+        self.assertTrue(set(after).isdisjoint(before))
+        response = self.client.get(url, {'before': token})
+        for post in after:
+            self.assertNotContains(
+                response, reverse('posts:post_detail', args=(post.pk,)))
+
+    def test_explicit_cursor_columns(self):
+        """Колонки курсора задаёт вызывающий, а не порядок queryset."""
+        request = RequestFactory().get('/')
+        expected = list(Post.objects.order_by('-pub_date', '-pk'))
+        for ordering in (('pk',), ('group', '-pub_date', 'pk')):
+            with self.subTest(ordering=ordering):
+                page = cursor_paginator(
+                    request, Post.objects.order_by(*ordering))
+                self.assertEqual(
+                    list(page), expected[:settings.NUMBER_OF_POSTS_IN_PAG])
+
+    def test_broken_cursor(self):
+        """Битый токен отдаёт первую страницу."""
+        self.assertIsNone(decode_cursor('не-токен'))
+        response = self.client.get(
+            reverse('posts:index'), {'after': 'не-токен'})
+        self.assertEqual(
+            len(response.context['page_obj']),
+            settings.NUMBER_OF_POSTS_IN_PAG
+        )
@@ -0,0 +1,68 @@
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from .. import feed
+from ..models import FeedItem, Follow, Post, User
+from ..urls import urlpatterns
+
+# Больше записей, чем помещается в несколько пачек вставки ленты.
+MANY = 3 * feed.BATCH_SIZE + 1
+
+
+class QueryBudgetTests(SimpleTestCase):
+    def test_views_declare_budgets(self):
+        """У каждого view приложения объявлен бюджет запросов.
+
+        Бюджет проверяет middleware: в тестах превышение роняет
+        запрос (core.testing), и тест любой страницы падает на N+1.
+        """
+        for pattern in urlpatterns:
+            with self.subTest(view=pattern.name):
+                self.assertIsInstance(
+                    getattr(pattern.callback, 'query_budget', None), int)
+
+
+@override_settings(QUERY_BUDGETS_STRICT=True)
+class FanOutBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_post_create_with_many_followers(self):
+        """Раскладка поста на несколько пачек лент не выбивает
+        создание поста из бюджета."""
+        User.objects.bulk_create(
+            User(username=f'fan{number}')
+            for number in range(MANY)
+        )
+        Follow.objects.bulk_create(
+            Follow(user_id=user_id, author=self.author)
+            for user_id in User.objects.filter(
+                username__startswith='fan').values_list('pk', flat=True)
+        )
+        self.client.force_login(self.author)
+        self.client.post(reverse('posts:post_create'), {'text': 'Пост'})
+        self.assertEqual(
+            FeedItem.objects.filter(post__author=self.author).count(),
+            MANY,
+        )
+
+    def test_follow_with_many_posts(self):
+        """Подписка на автора с постами на несколько пачек
+        укладывается в бюджет."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {number}')
+            for number in range(MANY)
+        )
+        self.client.force_login(self.reader)
+        self.client.get(
+            reverse('posts:profile_follow', args=(self.author.username,)))
+        self.assertEqual(
+            FeedItem.objects.filter(user=self.reader).count(),
+            MANY,
+        )
@@ -0,0 +1,101 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+FULL_SCAN_RE = re.compile(r'\bSCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class QueryPlanTests(TestCase):
+    """Запросы страниц идут по индексам, без полных проходов и сортировок.
+
+    Для каждого адреса собираются все SELECT, которые выполнила
+    страница, и для каждого проверяется EXPLAIN QUERY PLAN.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.users = User.objects.bulk_create(
+            User(username=f'user{i}') for i in range(20))
+        cls.users = list(User.objects.order_by('pk'))
+        cls.user = cls.users[0]
+        cls.groups = [
+            Group.objects.create(
+                title=f'Группа {i}', slug=f'group{i}', description='')
+            for i in range(3)
+        ]
+        for i in range(60):
+            Post.objects.create(
+                author=cls.users[i % 10],
+                group=cls.groups[i % 3] if i % 4 else None,
+                text=f'Пост {i}',
+            )
+        cls.post = Post.objects.first()
+        for user in cls.users[2:]:
+            Follow.objects.create(user=cls.user, author=user)
+            Follow.objects.create(user=user, author=cls.users[1])
+        for i in range(30):
+            Comment.objects.create(
+                post=cls.post, author=cls.users[i % 20], text=f'Ответ {i}')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def assertIndexedQueries(self, name, args=(), query=''):
+        url = reverse(name, args=args) + query
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url)
+        for captured in queries:
+            sql = captured['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            for step in query_plan(sql):
+                with self.subTest(url=url, sql=sql, step=step):
+                    self.assertNotIn(TEMP_SORT, step)
+                    self.assertIsNone(FULL_SCAN_RE.search(step))
+
+    def check_pages(self):
+        self.assertIndexedQueries('posts:index')
+        self.assertIndexedQueries('posts:index', query='?page=2')
+        self.assertIndexedQueries(
+            'posts:group_list', (self.groups[0].slug,))
+        self.assertIndexedQueries('posts:profile', (self.users[1].username,))
+        self.assertIndexedQueries('posts:post_detail', (self.post.pk,))
+        self.assertIndexedQueries('posts:post_comments', (self.post.pk,))
+        self.assertIndexedQueries('posts:follow_index')
+
+    def test_pages(self):
+        """Страницы с постраничной навигацией по номеру."""
+        self.check_pages()
+
+    @override_settings(CURSOR_PAGINATION=True)
+    def test_cursor_pages(self):
+        """Страницы с курсорной навигацией."""
+        self.check_pages()
+        response = self.client.get(reverse('posts:index'))
+        self.assertIndexedQueries(
+            'posts:index',
+            query=f'?after={response.context["page_obj"].next_cursor}',
+        )
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertIndexedQueries(
+            'posts:follow_index',
+            query=f'?after={response.context["page_obj"].next_cursor}',
+        )
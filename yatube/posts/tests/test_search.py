@@ -0,0 +1,65 @@
+from unittest import mock
+
+from django.contrib.admin.sites import site
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Post, User
+from ..search import fts_available
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.cats = Post.objects.create(
+            author=cls.user, text='Кошки любят рыбу')
+        cls.dogs = Post.objects.create(
+            author=cls.user, text='Собаки любят кости')
+
+    def search(self, query):
+        response = self.client.get(reverse('posts:search'), {'q': query})
+        return list(response.context['page_obj'])
+
+    def test_index_is_used(self):
+        """Поиск идёт через индекс FTS5."""
+        self.assertTrue(fts_available())
+
+    def test_missing_index_is_remembered(self):
+        """Отсутствие индекса тоже запоминается до следующих миграций."""
+        search.forget_fts()
+        try:
+            with mock.patch.object(search, 'FTS_TABLE', 'missing_fts'):
+                self.assertFalse(fts_available())
+                with self.assertNumQueries(0):
+                    self.assertFalse(fts_available())
+        finally:
+            search.forget_fts()
+        self.assertTrue(fts_available())
+
+    def test_search(self):
+        """Находятся посты со всеми словами, последнее — по префиксу."""
+        self.assertCountEqual(self.search('любят'), [self.cats, self.dogs])
+        self.assertEqual(self.search('рыбу кош'), [self.cats])
+        self.assertEqual(self.search('") OR ('), [])
+        self.assertEqual(self.search('енот'), [])
+
+    def test_index_follows_writes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        cats = Post.objects.get(pk=self.cats.pk)
+        cats.text = 'Еноты любят всё'
+        cats.save()
+        self.assertEqual(self.search('енот'), [cats])
+        self.assertEqual(self.search('рыбу'), [])
+        Post.objects.filter(pk=self.dogs.pk).delete()
+        self.assertEqual(self.search('любят'), [cats])
+
+    def test_admin_search(self):
+        """Поиск в админке использует тот же индекс."""
+        request = RequestFactory().get('/')
+        queryset, has_duplicates = site._registry[Post].get_search_results(
+            request, Post.objects.all(), 'кости')
+        self.assertEqual(list(queryset), [self.dogs])
+        self.assertFalse(has_duplicates)
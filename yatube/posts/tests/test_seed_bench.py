@@ -0,0 +1,45 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Comment, Follow, Group, Post, User, UserStats
+
+
+class SeedBenchTests(TestCase):
+    def seed(self, **options):
+        call_command(
+            'seed_bench', users=200, groups=3, posts=400, comments=1200,
+            follows=10, chunk_size=150, stdout=StringIO(), **options)
+
+    def test_dataset(self):
+        """Создаются все пользователи, посты и примерно нужное число
+        комментариев; счётчики согласованы с данными."""
+        self.seed()
+        self.assertEqual(User.objects.count(), 200)
+        self.assertEqual(Post.objects.count(), 400)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertTrue(400 < Comment.objects.count() < 4000)
+        post = Post.objects.order_by('-comments_count').first()
+        self.assertEqual(post.comments_count, post.comments.count())
+        self.assertTrue(Follow.objects.exists())
+
+    def test_skewed_followers(self):
+        """У самых популярных авторов подписчиков на порядок больше,
+        чем у медианного."""
+        self.seed()
+        followers = list(UserStats.objects.order_by(
+            '-followers_count').values_list('followers_count', flat=True))
+        followers += [0] * (200 - len(followers))
+        self.assertGreater(followers[0], 10 * max(followers[100], 1))
+
+    def test_deterministic(self):
+        """Один и тот же seed даёт одни и те же данные."""
+        self.seed(seed=7)
+        first = list(Post.objects.order_by('pk').values_list(
+            'author__username', 'text'))
+        Post.objects.all().delete()
+        self.seed(seed=7)
+        second = list(Post.objects.order_by('pk').values_list(
+            'author__username', 'text'))
+        self.assertEqual(first, second)
@@ -0,0 +1,69 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, TransactionTestCase
+from django.urls import reverse
+
+from .. import suggestions
+from ..models import Follow, FollowSuggestion, User
+from .test_follow_graph import build
+
+
+class TopAuthorsTests(SimpleTestCase):
+    def test_friends_of_friends(self):
+        """Вес — сколько подписок пользователя читают автора; свои
+        подписки и сам пользователь не предлагаются, недостающие
+        берутся из популярных."""
+        graph = build([
+            (1, 2), (1, 3),
+            (2, 4), (2, 5), (2, 1),
+            (3, 5), (3, 2),
+        ], 7)
+        self.assertEqual(
+            list(suggestions.top_authors(graph, 1, [2, 6, 5], 3)),
+            [5, 4, 6])
+        self.assertEqual(
+            list(suggestions.top_authors(graph, 6, [2, 6, 5], 3)), [2, 5])
+
+
+class SuggestionsTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [
+            User.objects.create_user(username=f'user{number}')
+            for number in range(5)
+        ]
+        for user, author in ((0, 1), (0, 2), (1, 3), (2, 3), (2, 4)):
+            Follow.objects.create(
+                user=self.users[user], author=self.users[author])
+
+    def build(self, *args):
+        call_command('build_suggestions', '--workers=0', *args,
+                     stdout=StringIO())
+
+    def test_incremental_refresh(self):
+        """Команда считает всех без строки, потом только тех, чьи
+        подписки изменились."""
+        self.build()
+        reader = self.users[0]
+        self.assertEqual(
+            suggestions.for_user(reader), [self.users[3], self.users[4]])
+        self.assertEqual(list(suggestions.pending()), [])
+        Follow.objects.create(user=reader, author=self.users[3])
+        self.assertEqual(
+            list(suggestions.pending()),
+            [(reader.pk, FollowSuggestion.objects.get(pk=reader.pk).version)])
+        self.assertEqual(suggestions.for_user(reader), [self.users[4]])
+        self.build()
+        self.assertEqual(list(suggestions.pending()), [])
+
+    def test_follow_index_sidebar(self):
+        """Блок «Кого почитать» в ленте подписок."""
+        self.build()
+        client = Client()
+        client.force_login(self.users[0])
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            response.context['suggestions'], [self.users[3], self.users[4]])
+        self.assertContains(response, 'Кого почитать')
@@ -0,0 +1,113 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .. import thumbnails
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=SMALL_GIF,
+                content_type='image/gif'
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_fallback_to_original(self):
+        """Пока миниатюры нет, страница показывает исходную картинку."""
+        self.assertIsNone(thumbnails.cached_thumbnail(self.post.image))
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.id,)))
+        self.assertContains(response, self.post.image.url)
+
+    def test_generated_thumbnail_is_used(self):
+        """После генерации страница показывает миниатюру."""
+        call_command('generate_thumbnails', workers=0, stdout=StringIO())
+        thumbnail = thumbnails.cached_thumbnail(self.post.image)
+        self.assertIsNotNone(thumbnail)
+        for url in (reverse('posts:post_detail', args=(self.post.id,)),
+                    reverse('posts:index')):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, thumbnail.url)
+                self.assertNotContains(response, self.post.image.url)
+
+    def test_prefetch_batches_lookups(self):
+        """Миниатюры страницы ищутся одним запросом на все промахи кэша."""
+        Post.objects.bulk_create(
+            [Post(author=self.user, text='Копия', image=self.post.image)] * 3)
+        thumbnails.generate([self.post.pk])
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(0):
+            thumbnails.prefetch(posts)
+        cache.clear()
+        with self.assertNumQueries(1):
+            thumbnails.prefetch(posts)
+        self.assertEqual(len(posts), 4)
+        for post in posts:
+            self.assertEqual(
+                post.thumbnail.url,
+                thumbnails.cached_thumbnail(post.image).url
+            )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailCacheTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=User.objects.create_user(username='auth'),
+            text='Пост с картинкой',
+        )
+
+    def test_generation_resets_cached_pages(self):
+        """Готовая миниатюра сбрасывает закэшированные страницы."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        # Картинка появляется в обход сигналов, кэш страницы остаётся.
+        self.post.image.save('small.gif', ContentFile(SMALL_GIF), save=False)
+        Post.objects.filter(pk=self.post.pk).update(image=self.post.image)
+        thumbnails.generate([self.post.pk])
+        self.assertContains(
+            self.client.get(url),
+            thumbnails.cached_thumbnail(self.post.image).url)
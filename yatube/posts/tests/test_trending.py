@@ -0,0 +1,73 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import trending
+from ..models import Post, TrendingPost, User
+
+HOUR = 60 * 60
+
+
+@override_settings(TRENDING_HALF_LIFE=HOUR)
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        TrendingPost.objects.all().delete()
+
+    def test_decay(self):
+        """Вес затухает вдвое за период, новые события складываются
+        с затухшей оценкой."""
+        post = self.posts[0]
+        trending.record(post.pk, 1.0, now=0)
+        trending.record(post.pk, 1.0, now=HOUR)
+        score = TrendingPost.objects.get(pk=post.pk)
+        self.assertAlmostEqual(score.score, 1.5)
+        self.assertEqual(score.updated, HOUR)
+
+    def test_ranking_and_compaction(self):
+        """Свежая активность обгоняет старую; сжатие оставляет
+        TRENDING_KEEP лучших и обновляет список для страницы."""
+        old, fresh, quiet = self.posts
+        for _ in range(3):
+            trending.record(old.pk, 1.0, now=0)
+        trending.record(fresh.pk, 1.0, now=3 * HOUR)
+        trending.record(quiet.pk, 0.1, now=3 * HOUR)
+        with override_settings(TRENDING_KEEP=2):
+            top = trending.compact(now=3 * HOUR)
+        self.assertEqual(top, [fresh.pk, old.pk])
+        self.assertEqual(
+            sorted(TrendingPost.objects.values_list('pk', flat=True)),
+            sorted([fresh.pk, old.pk]))
+        self.assertEqual(trending.top_ids(), [fresh.pk, old.pk])
+
+    def test_view(self):
+        """Комментарий поднимает пост в «Популярном»; страница собирает
+        устаревший список одним запросом, а дальше читает только посты.
+        Пользователю страница обходится ещё в сессию и его запись."""
+        client = Client()
+        client.force_login(self.user)
+        post = self.posts[1]
+        client.post(
+            reverse('posts:add_comment', args=(post.pk,)),
+            data={'text': 'Комментарий'},
+        )
+        with self.assertNumQueries(2):
+            Client().get(reverse('posts:trending'))
+        self.assertEqual(trending.top_ids()[0], post.pk)
+        with self.assertNumQueries(1):
+            response = Client().get(reverse('posts:trending'))
+        self.assertEqual(response.context['posts'][0], post)
+        self.assertContains(response, 'Популярное сейчас')
+        cache.delete(trending.TOP_KEY)
+        with self.assertNumQueries(4):
+            response = client.get(reverse('posts:trending'))
+        self.assertEqual(response.context['posts'][0], post)
@@ -5,10 +5,13 @@ from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
-from django.test import Client, TestCase, override_settings
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
 from django.urls import reverse
 from django import forms
 
+from core import fragment_cache
+
 from ..models import Follow, Post, Group, User
 from posts.forms import PostForm
 
@@ -182,7 +185,7 @@ class PaginatorViewsTest(TestCase):
                                          number)
 
 
-class CacheViewTest(TestCase):
+class CacheViewTest(TransactionTestCase):
     def setUp(self):
         self.user = User.objects.create_user(username='auth')
         self.post = Post.objects.create(
@@ -190,13 +193,63 @@ class CacheViewTest(TestCase):
             text='This is a test post'
         )
         self.url = reverse('posts:index')
+        fragment_cache.flush()
         cache.clear()
 
     def test_cache(self):
+        """Лента берётся из кэша, пока нет записей в посты."""
         response1 = self.client.get(self.url)
-        Post.objects.filter(pk=self.post.pk).delete()
         response2 = self.client.get(self.url)
         self.assertEqual(response1.content, response2.content)
-        cache.clear()
+        self.assertEqual(
+            fragment_cache.stats()['index'], {'hits': 1, 'misses': 1})
+        Post.objects.filter(pk=self.post.pk).delete()
         response3 = self.client.get(self.url)
         self.assertNotEqual(response1.content, response3.content)
+
+    def test_user_rename(self):
+        """Смена имени автора сбрасывает кэш карточек его постов."""
+        self.client.get(self.url)
+        self.user.first_name = 'Лев'
+        self.user.last_name = 'Толстой'
+        self.user.save()
+        self.assertContains(self.client.get(self.url), 'Лев Толстой')
+
+    def test_group_rename(self):
+        """Правка и удаление группы сбрасывают кэш профилей авторов
+        её постов."""
+        group = Group.objects.create(
+            title='Старое название',
+            slug='old',
+            description='Тестовое описание',
+        )
+        Post.objects.create(author=self.user, text='Пост в группе',
+                            group=group)
+        url = reverse('posts:profile', args=(self.user.username,))
+        self.assertContains(self.client.get(url), 'Старое название')
+        group.title = 'Новое название'
+        group.slug = 'new'
+        group.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Новое название')
+        self.assertContains(
+            response, reverse('posts:group_list', args=('new',)))
+        self.assertNotContains(
+            response, reverse('posts:group_list', args=('old',)))
+        group.delete()
+        self.assertNotContains(self.client.get(url), 'Новое название')
+
+    def test_cache_scopes(self):
+        """Запись в группу не сбрасывает кэш профиля чужого автора."""
+        user2 = User.objects.create_user(username='auth2')
+        url = reverse('posts:profile', args=(self.user.username,))
+        self.client.get(url)
+        group = Group.objects.create(
+            title='Тестовая группа',
+            slug='75',
+            description='Тестовое описание',
+        )
+        Post.objects.create(author=user2, text='Чужой пост', group=group)
+        self.client.get(url)
+        self.assertEqual(
+            fragment_cache.stats()['profile'], {'hits': 1, 'misses': 1})
@@ -0,0 +1,132 @@
+"""Фоновая подготовка миниатюр картинок постов.
+
+Миниатюры создаются после сохранения поста в пуле процессов, а шаблоны
+только ищут готовую миниатюру в хранилище sorl-thumbnail и, пока её нет,
+показывают исходную картинку.
+"""
+from django.conf import settings
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults, settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as CachedDBStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core import workers
+from core.fragment_cache import bump, scope
+
+GEOMETRY = '960x339'
+OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+class LookupBackend(ThumbnailBackend):
+    """Бэкенд sorl, который умеет искать миниатюру, не создавая её."""
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        # Повторяет подготовку параметров из ThumbnailBackend.get_thumbnail,
+        # чтобы имя миниатюры совпало с тем, что создаст sorl.
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def get_cached(self, file_, geometry_string, **options):
+        thumbnail = self.thumbnail_file(file_, geometry_string, **options)
+        return default.kvstore.get(thumbnail)
+
+
+backend = LookupBackend()
+
+
+def cached_thumbnail(image):
+    """Готовая миниатюра картинки поста или None."""
+    if not image:
+        return None
+    return backend.get_cached(image, GEOMETRY, **OPTIONS)
+
+
+def _get_many_raw(keys):
+    """Пакетный аналог KVStore._get_raw для хранилища cached_db.
+
+    Один get_many в кэш и один запрос в БД на все промахи вместо
+    отдельного похода за каждой миниатюрой.
+    """
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(KVStoreModel.objects.filter(
+            key__in=missing).values_list('key', 'value'))
+        fetched = {key: found.get(key, EMPTY_VALUE) for key in missing}
+        kvstore.cache.set_many(
+            fetched, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(fetched)
+    return {
+        key: value for key, value in values.items()
+        if value is not None and value != EMPTY_VALUE
+    }
+
+
+def prefetch(posts):
+    """Находит готовые миниатюры для всех постов страницы разом.
+
+    Результат сохраняется в post.thumbnail (ImageFile или None).
+    """
+    keys = {}
+    for post in posts:
+        post.thumbnail = None
+        if post.image:
+            thumbnail = backend.thumbnail_file(
+                post.image, GEOMETRY, **OPTIONS)
+            keys.setdefault(add_prefix(thumbnail.key), []).append(post)
+    if not keys:
+        return
+    for key, value in _get_many_raw(list(keys)).items():
+        thumbnail = deserialize_image_file(value)
+        for post in keys[key]:
+            post.thumbnail = thumbnail
+
+
+def generate(post_ids, force=False):
+    """Создаёт миниатюры для постов; выполняется в воркере.
+
+    Страницы с этими постами закэшированы с исходной картинкой, поэтому
+    после генерации их области сбрасываются.
+    """
+    from .models import Post
+
+    scopes = {scope('global')}
+    for post in Post.objects.filter(pk__in=post_ids).exclude(image=''):
+        if force:
+            default.kvstore.delete_thumbnails(ImageFile(post.image))
+        get_thumbnail(post.image, GEOMETRY, **OPTIONS)
+        scopes.update((scope('post', post.pk),
+                       scope('author', post.author_id)))
+        if post.group_id is not None:
+            scopes.add(scope('group', post.group_id))
+    bump(*scopes)
+    return len(post_ids)
+
+
+def schedule(post_ids):
+    """Ставит посты в очередь на создание миниатюр.
+
+    При THUMBNAIL_WORKERS = 0 миниатюры создаются сразу в текущем процессе.
+    """
+    post_ids = list(post_ids)
+    if not settings.THUMBNAIL_WORKERS:
+        generate(post_ids)
+        return
+    workers.submit('thumbnails', settings.THUMBNAIL_WORKERS,
+                   generate, post_ids)
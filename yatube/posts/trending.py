@@ -0,0 +1,97 @@
+"""«Популярное сейчас»: посты с наибольшей затухающей активностью.
+
+Публикация поста и каждый комментарий добавляют посту вес, а вес со
+временем затухает вдвое за TRENDING_HALF_LIFE секунд. Оценка хранится
+в TrendingPost вместе с моментом, на который она посчитана, и
+обновляется одним UPDATE: score = score * 0.5 ** (прошло / период) + вес.
+Пересчитывать весь posts_comment при каждом открытии страницы не нужно.
+
+Раз в TRENDING_REFRESH_SECONDS первая зафиксированная запись в этом
+интервале отдаёт в фоновый процесс сжатие таблицы: оценки приводятся к
+текущему моменту, остаются TRENDING_KEEP лучших, а id TRENDING_SIZE
+лучших постов кладутся в общий кэш. Страница /trending/ читает этот
+список и сами посты одним запросом по ключам, сколько бы ни было постов
+и комментариев; если список в кэше устарел, он собирается заново из
+ограниченной по размеру таблицы.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Power
+
+from core import workers
+
+from .models import TrendingPost
+
+POST_WEIGHT = 1.0
+COMMENT_WEIGHT = 1.0
+# Оценки ниже этой — пост уже не популярен, строка удаляется.
+MIN_SCORE = 0.01
+TOP_KEY = 'trending:top'
+COMPACT_KEY = 'trending:compacted'
+
+
+def _decayed(now):
+    """Оценка, приведённая к моменту now."""
+    return F('score') * Power(
+        Value(0.5), (Value(now) - F('updated'))
+        / Value(float(settings.TRENDING_HALF_LIFE)))
+
+
+def record(post_id, weight, now=None):
+    """Добавляет посту вес; раз в интервал ставит сжатие таблицы."""
+    now = time.time() if now is None else now
+    if not TrendingPost.objects.filter(pk=post_id).update(
+            score=_decayed(now) + Value(weight), updated=now):
+        TrendingPost.objects.bulk_create(
+            [TrendingPost(post_id=post_id, score=weight, updated=now)],
+            ignore_conflicts=True,
+        )
+    transaction.on_commit(schedule_compaction)
+
+
+def schedule_compaction():
+    """Сжатие в фоновом процессе, не чаще раза в
+    TRENDING_REFRESH_SECONDS; базу в памяти другой процесс не видит,
+    её сжимаем на месте."""
+    if not cache.add(COMPACT_KEY, True, settings.TRENDING_REFRESH_SECONDS):
+        return
+    if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+        compact()
+        return
+    workers.submit('trending', 1, compact)
+
+
+def compact(now=None):
+    """Приводит оценки к now, оставляет TRENDING_KEEP лучших и
+    обновляет список для страницы."""
+    now = time.time() if now is None else now
+    TrendingPost.objects.update(score=_decayed(now), updated=now)
+    scores = TrendingPost.objects.order_by('-score').values_list(
+        'score', flat=True)
+    threshold = scores[settings.TRENDING_KEEP - 1:].first()
+    TrendingPost.objects.filter(
+        score__lt=max(threshold or 0, MIN_SCORE)).delete()
+    return refresh(now)
+
+
+def refresh(now=None):
+    """Кладёт в кэш id TRENDING_SIZE лучших постов."""
+    now = time.time() if now is None else now
+    top = list(
+        TrendingPost.objects.annotate(current=_decayed(now))
+        .order_by('-current', '-pk')
+        .values_list('pk', flat=True)[:settings.TRENDING_SIZE]
+    )
+    cache.set(TOP_KEY, top, settings.TRENDING_REFRESH_SECONDS)
+    return top
+
+
+def top_ids():
+    top = cache.get(TOP_KEY)
+    if top is None:
+        top = refresh()
+    return top
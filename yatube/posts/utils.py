@@ -1,8 +1,154 @@
+import base64
+import binascii
+
 from django.core.paginator import Paginator
 from django.conf import settings
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+
+
+CURSOR_DATE = 'cursor_date'
+CURSOR_KEY = 'cursor_key'
+
+
+def encode_cursor(obj, field='pub_date', key='pk'):
+    """Кодирует позицию записи (дата, id) в непрозрачный токен."""
+    raw = f'{getattr(obj, field).isoformat()}|{getattr(obj, key)}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (дата, id) из токена или None, если токен битый."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        pub_date, pk = raw.decode().split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk
+
+
+class CursorPage:
+    """Страница курсорной пагинации.
+
+    Повторяет ту часть интерфейса django.core.paginator.Page,
+    которой пользуются шаблоны, но не знает ни общего числа записей,
+    ни номера страницы.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, has_next, has_previous, token=None,
+                 field='pub_date', key='pk', direction='after'):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        # Номер входит в ключ кэша фрагментов, поэтому страницы «после» и
+        # «до» одного и того же токена должны различаться.
+        self.number = f'{direction}:{token}' if token else 1
+        self.field = field
+        self.key = key
+
+    def __repr__(self):
+        return f'<CursorPage {self.number}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __contains__(self, item):
+        return item in self.object_list
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return encode_cursor(self.object_list[-1], self.field, self.key)
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return encode_cursor(self.object_list[0], self.field, self.key)
+        return None
+
+
+def cursor_paginator(request, posts_list, per_page=None, field='pub_date',
+                     key='pk'):
+    """Пагинация по ключу (field, key) без COUNT и OFFSET.
+
+    Записи идут от новых к старым. Следующая страница запрашивается
+    через ?after=<token>, предыдущая — через ?before=<token>. Наличие
+    следующей страницы определяется выборкой на одну запись больше,
+    чем нужно.
+
+    Колонки курсора могут лежать в связанной таблице
+    ('feed_items__pub_date'): тогда они добавляются в выборку
+    аннотациями, и лента подписок листается по колонкам записей ленты,
+    а не постов.
+    """
+    per_page = per_page or settings.NUMBER_OF_POSTS_IN_PAG
+    if '__' in field or '__' in key:
+        posts_list = posts_list.annotate(
+            **{CURSOR_DATE: F(field), CURSOR_KEY: F(key)})
+        field, key = CURSOR_DATE, CURSOR_KEY
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    after_position = decode_cursor(after)
+    before_position = decode_cursor(before)
+    if after_position:
+        date, pk = after_position
+        posts = list(posts_list.filter(
+            Q(**{f'{field}__lt': date}) | Q(**{field: date, f'{key}__lt': pk})
+        ).order_by(f'-{field}', f'-{key}')[:per_page + 1])
+        return CursorPage(
+            posts[:per_page], len(posts) > per_page, True, after, field, key,
+            direction='after',
+        )
+    if not before_position:
+        posts = list(
+            posts_list.order_by(f'-{field}', f'-{key}')[:per_page + 1])
+        return CursorPage(
+            posts[:per_page], len(posts) > per_page, False,
+            field=field, key=key,
+        )
+    date, pk = before_position
+    posts = list(posts_list.filter(
+        Q(**{f'{field}__gt': date}) | Q(**{field: date, f'{key}__gt': pk})
+    ).order_by(field, key)[:per_page + 1])
+    return CursorPage(
+        posts[:per_page][::-1], True, len(posts) > per_page, before, field,
+        key, direction='before',
+    )
 
 
-def paginator(request, posts_list):
+def paginator(request, posts_list, cursor=None, field='pub_date', key='pk'):
+    if cursor is None:
+        cursor = (
+            settings.CURSOR_PAGINATION
+            or 'after' in request.GET
+            or 'before' in request.GET
+        )
+    if cursor:
+        return cursor_paginator(
+            request, posts_list, field=field, key=key)
     page = Paginator(posts_list, settings.NUMBER_OF_POSTS_IN_PAG)
     page_number = request.GET.get('page')
     return page.get_page(page_number)
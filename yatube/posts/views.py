@@ -1,67 +1,222 @@
-from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils.http import urlencode
 
+from core import replicas, writer
+from core.conditional import conditional_page
+from core.fragment_cache import scope
+from core.instrumentation import query_budget
+
+from . import export, queries, suggestions
+from .counters import stats_for
+from .following import is_following
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import paginator
+from .models import Comment, Follow, Group, Post, User
+from .search import search_posts
+from .trending import top_ids
+from .utils import cursor_paginator, paginator
+
+
+def index_scopes(request):
+    return (scope('global'),), ()
+
+
+def group_scopes(request, slug):
+    group_id = Group.objects.filter(
+        slug=slug).values_list('pk', flat=True).first()
+    if group_id is None:
+        return None
+    return (scope('group', group_id),), ()
 
 
+def profile_scopes(request, username):
+    author = User.objects.filter(username=username).values_list(
+        'pk', 'stats__followers_count', 'stats__following_count').first()
+    if author is None:
+        return None
+    author_id, *counts = author
+    # Правка группы тоже сдвигает область автора: её название и ссылка
+    # есть на карточках постов в профиле.
+    scopes = [scope('author', author_id)]
+    if request.user.is_authenticated:
+        scopes.append(scope('follows', request.user.pk))
+    return scopes, counts
+
+
+def post_scopes(request, post_id):
+    post = Post.objects.filter(
+        pk=post_id).values_list('author_id', 'group_id').first()
+    if post is None:
+        return None
+    author_id, group_id = post
+    scopes = [scope('post', post_id), scope('author', author_id)]
+    if group_id is not None:
+        scopes.append(scope('group', group_id))
+    return scopes, ()
+
+
+@query_budget(6)
+@conditional_page(index_scopes)
 def index(request):
-    posts_list = Post.objects.select_related('author', 'group').all()
+    posts_list = queries.index_posts()
     page_obj = paginator(request, posts_list)
     context = {
         'page_obj': page_obj,
+        'cache_scopes': (scope('global'),),
     }
     return render(request, 'posts/index.html', context)
 
 
+@query_budget(6)
+def trending(request):
+    """Популярное сейчас: готовый список id из кэша и посты по ключам."""
+    post_ids = top_ids()
+    posts = Post.objects.select_related('author', 'group').in_bulk(post_ids)
+    context = {
+        'posts': [posts[post_id] for post_id in post_ids
+                  if post_id in posts],
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+@query_budget(8)
+@conditional_page(group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts_list = group.posts.select_related('author').all()
+    posts_list = queries.group_posts(group)
     page_obj = paginator(request, posts_list)
     context = {
         'page_obj': page_obj,
         'group': group,
+        'cache_scopes': (scope('group', group.pk),),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@query_budget(14)
+@conditional_page(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(get_user_model(), username=username)
-    posts_list = author.posts.select_related('group').all()
-    count = posts_list.count()
-    page_obj = paginator(request, posts_list)
-    following = (
-        request.user.is_authenticated
-        and not request.user == author
-        and Follow.objects.filter(user=request.user, author=author)
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username
     )
+    posts_list = queries.profile_posts(author)
+    stats = stats_for(author)
+    page_obj = paginator(request, posts_list)
+    following = is_following(request.user, author.pk)
     context = {
         'author': author,
         'page_obj': page_obj,
-        'count': count,
+        'count': stats.posts_count,
+        'stats': stats,
         'following': following,
+        'cache_scopes': (scope('author', author.pk),),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@query_budget(8)
+def search(request):
+    query = request.GET.get('q', '')
+    posts_list = search_posts(
+        query, Post.objects.select_related('author', 'group'))
+    page_obj = paginator(request, posts_list, cursor=False)
+    context = {
+        'page_obj': page_obj,
+        'query': query,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def comments_page(request, post_id):
+    """Срез комментариев поста от новых к старым по курсору (created, id)."""
+    return cursor_paginator(
+        request,
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        settings.COMMENTS_PER_PAGE,
+        field='created',
+    )
+
+
+@query_budget(8)
+@conditional_page(post_scopes)
 def post_detail(request, post_id):
     post = get_object_or_404(
-        Post.objects.select_related(
-            'author'
-        ).prefetch_related('comments__author'),
+        Post.objects.select_related('author__stats'),
         pk=post_id
     )
     form = CommentForm()
     context = {
         'post': post,
         'form': form,
-        'comments': post.comments.all(),
+        'comments': comments_page(request, post.pk),
+        'comments_view': 'detail',
+        'cache_scopes': (scope('post', post.pk),),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@query_budget(4)
+def post_comments(request, post_id):
+    """Следующая порция комментариев для бесконечной прокрутки.
+
+    Отдаёт HTML-фрагмент, а с ?format=json — список комментариев
+    и адрес следующей порции.
+    """
+    # Без условного GET свежесть реплики проверяется до запросов.
+    cache_scopes = (scope('post', post_id),)
+    replicas.read_fresh(cache_scopes)
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = comments_page(request, post.pk)
+    if request.GET.get('format') != 'json':
+        context = {
+            'post': post,
+            'comments': comments,
+            'comments_view': 'fragment',
+            'cache_scopes': cache_scopes,
+        }
+        return render(request, 'posts/includes/comment_list.html', context)
+    next_url = None
+    if comments.has_next():
+        next_url = '{}?{}'.format(
+            reverse('posts:post_comments', args=(post.pk,)),
+            urlencode({'after': comments.next_cursor, 'format': 'json'}),
+        )
+    return JsonResponse({
+        'comments': [
+            {
+                'id': comment.pk,
+                'author': comment.author.username,
+                'text': comment.text,
+                'created': comment.created.isoformat(),
+            }
+            for comment in comments
+        ],
+        'next': next_url,
+    })
+
+
+def save_post(form, author):
+    post = form.save(commit=False)
+    post.author = author
+    post.save()
+    return post
+
+
+def save_comment(form, author, post):
+    comment = form.save(commit=False)
+    comment.author = author
+    comment.post = post
+    comment.save()
+    return comment
+
+
+@query_budget(20)
 @login_required
 def post_create(request):
     form = PostForm(
@@ -70,12 +225,11 @@ def post_create(request):
     )
     if not form.is_valid():
         return render(request, 'posts/post_create.html', {'form': form})
-    post = form.save(commit=False)
-    post.author = request.user
-    post.save()
+    post = writer.submit(save_post, form, request.user)
     return redirect('posts:profile', post.author)
 
 
+@query_budget(16)
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
@@ -87,7 +241,7 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        writer.submit(form.save)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'post': post,
@@ -96,42 +250,70 @@ def post_edit(request, post_id):
     return render(request, 'posts/post_create.html', context)
 
 
+@query_budget(10)
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
-        comment = form.save(commit=False)
-        comment.author = request.user
-        comment.post = post
-        comment.save()
+        writer.submit(save_comment, form, request.user, post)
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(8)
 @login_required
 def follow_index(request):
-    posts_list = Post.objects.select_related('author').filter(
-        author__following__user=request.user)
-    page_obj = paginator(request, posts_list)
+    # Без условного GET свежесть реплики проверяется до запросов.
+    cache_scopes = (scope('global'), scope('follows', request.user.pk))
+    replicas.read_fresh(cache_scopes)
+    posts_list, cursor = queries.follow_posts(request.user)
+    page_obj = paginator(request, posts_list, **cursor)
     context = {
         'page_obj': page_obj,
+        'suggestions': suggestions.for_user(request.user),
+        'cache_scopes': cache_scopes,
     }
     return render(request, 'posts/follow.html', context)
 
 
+@query_budget(16)
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
-        Follow.objects.get_or_create(user=request.user, author=author)
+        writer.submit(
+            Follow.objects.get_or_create, user=request.user, author=author)
     return redirect('posts:profile', author)
 
 
+@query_budget(12)
 @login_required
 def profile_unfollow(request, username):
-    get_object_or_404(
+    follow = get_object_or_404(
         Follow,
         user=request.user,
         author__username=username
-    ).delete()
+    )
+    writer.submit(follow.delete)
     return redirect('posts:profile', username)
+
+
+@query_budget(4)
+@staff_member_required
+def export_content(request, kind):
+    """Потоковая выгрузка таблицы: ?format=jsonl|csv, ?gzip=1."""
+    file_format = request.GET.get('format', 'jsonl')
+    if kind not in export.KINDS or file_format not in export.FORMATS:
+        raise Http404
+    gzip = request.GET.get('gzip') == '1'
+    filename = f'{kind}.{file_format}' + ('.gz' if gzip else '')
+    response = StreamingHttpResponse(
+        export.export_stream(kind, file_format, gzip),
+        content_type=(
+            'application/gzip' if gzip
+            else 'text/csv' if file_format == 'csv'
+            else 'application/x-ndjson'
+        ),
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
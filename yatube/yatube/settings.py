@@ -25,15 +25,18 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.SQLInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.replicas.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -64,9 +67,56 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Подключение живёт между запросами: PRAGMA из SQLITE_PRAGMAS
+        # выполняются раз на поток, а не на каждый запрос.
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# Реплики только для чтения: ленты и посты читаются с них (см.
+# core.replicas). Их число задаёт переменная окружения YATUBE_REPLICAS;
+# локально реплики — копии db.sqlite3, которые обновляет
+# manage.py sync_replicas.
+DATABASE_REPLICAS = [
+    f'replica{number}'
+    for number in range(1, int(os.environ.get('YATUBE_REPLICAS', 0)) + 1)
+]
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': 'file:{}?mode=ro'.format(
+            os.path.join(BASE_DIR, f'db.{alias}.sqlite3')),
+        # sync_replicas подменяет файл целиком; новое подключение на
+        # каждый запрос сразу видит свежий снимок.
+        'CONN_MAX_AGE': 0,
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+# Сколько секунд после записи пользователь читает только с основной
+# базы, чтобы сразу видеть свои посты и комментарии.
+READ_YOUR_WRITES_SECONDS = 10
+
+# Записи view идут через поток-писатель процесса и фиксируются
+# пачками (см. core.writer); False — каждая view пишет сама.
+WRITE_QUEUE = True
+# Сколько записей из очереди писатель берёт в одну транзакцию.
+WRITE_QUEUE_MAX_BATCH = 64
+# Сколько секунд запрос ждёт свою запись, прежде чем сдаться.
+WRITE_QUEUE_TIMEOUT = 30
+
+# PRAGMA каждого нового подключения к SQLite (см. core.sqlite): WAL,
+# чтобы читатели не ждали писателя, ожидание блокировки вместо ошибки
+# database is locked, 64 МБ кэша страниц и 256 МБ mmap.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -117,10 +167,62 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 NUMBER_OF_POSTS_IN_PAG = 10
 
+# Курсорная пагинация лент по (pub_date, id) вместо COUNT + OFFSET.
+CURSOR_PAGINATION = False
+
+# Комментариев на странице поста; остальные подгружаются по курсору.
+COMMENTS_PER_PAGE = 20
+
+# Посты авторов с большим числом подписчиков не раскладываются
+# по лентам при публикации, а подтягиваются при чтении ленты.
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+
+# Граф подписок в памяти каждого процесса (см. posts.follow_graph):
+# лента подписок узнаёт популярных авторов без агрегата по posts_follow.
+FOLLOW_GRAPH = True
+
+# Сколько авторов показывать в блоке «Кого почитать» (см.
+# posts.suggestions и manage.py build_suggestions).
+FOLLOW_SUGGESTIONS = 5
+
+# «Популярное сейчас» (см. posts.trending): за сколько секунд вес
+# поста и комментария затухает вдвое, сколько постов показывать, сколько
+# лучших оценок хранить и как часто сжимать таблицу и обновлять список.
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_SIZE = 20
+TRENDING_KEEP = 1000
+TRENDING_REFRESH_SECONDS = 60
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Процессов для фоновой подготовки миниатюр; 0 — создавать сразу.
+THUMBNAIL_WORKERS = 2
+
+# Потоков, в которых ASGI-вход (yatube.asgi) выполняет view; приём и
+# отдача данных клиенту их не занимают.
+ASGI_THREADS = 8
+
+# Превышение бюджета запросов view роняет запрос, а не только
+# пишется в лог: так N+1 ловится при разработке и в тестах.
+QUERY_BUDGETS_STRICT = DEBUG
+
+# Фрагменты лент живут долго: записи сбрасывают их через поколения.
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Как часто процесс переносит счётчики попаданий фрагментов в общий кэш.
+FRAGMENT_CACHE_STATS_FLUSH = 10
+
+# Тесты чистят кэш, поэтому прогон тестов получает свой временный
+# файл кэша и строгие бюджеты запросов (см. core.testing).
+TEST_RUNNER = 'core.testing.TestRunner'
+
+# Общий для всех воркеров хоста кэш в SQLite-файле (см. core.cache).
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
     }
 }
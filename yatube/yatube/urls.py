@@ -3,11 +3,17 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
+from core.views import fragment_cache_stats, health, writer_stats
+
 handler404 = 'core.views.page_not_found'
 handler403 = 'core.views.csrf_failure'
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('cache-stats/', fragment_cache_stats, name='fragment_cache_stats'),
+    path('writer-stats/', writer_stats, name='writer_stats'),
+    path('health/', health, name='health'),
+    path('api/', include('api.urls', namespace='api')),
     path('auth/', include('users.urls', namespace='users')),
     path('', include('posts.urls', namespace='posts')),
     path('about/', include('about.urls', namespace='about')),